@@ -0,0 +1,56 @@
+"""
+Compare the OHLC dataframe conversion against the previous DataFrame(results) path.
+
+    python benchmarks/bench_ohlc_decode.py [bars]
+"""
+
+import sys
+import time
+from datetime import datetime, timezone
+
+from pandas import DataFrame, to_datetime
+
+from lemon_markets.market_data import _results_to_df
+
+
+def _previous(results: list, ordering: str = None) -> DataFrame:
+    from_tz = timezone.utc
+    to_tz = datetime.now().astimezone().tzinfo
+    df = DataFrame(results)
+    df['t'] = to_datetime(df['t'], unit='s').dt.tz_localize(from_tz).dt.tz_convert(to_tz)
+    df.set_index('t', inplace=True)
+    if ordering == '-date':
+        df.sort_index(ascending=False, inplace=True)
+    else:
+        df.sort_index(ascending=True, inplace=True)
+    return df
+
+
+def _measure(convert, results: list, repeat: int = 5) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        convert(results)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(n: int = 200000):       # noqa
+    start = 1622505600
+    results = [{'o': 600.0 + i % 7, 'h': 610.5, 'l': 590.25, 'c': 605.0 + i % 3, 't': start + 60 * i}
+               for i in range(n)]
+    expected, actual = _previous(results), _results_to_df(results)
+    assert (expected.index == actual.index).all() and (expected.values == actual.values).all()
+
+    print('bars:                    %d' % n)
+    for name, data in (('ordered', results), ('unordered', results[::-1])):
+        previous = _measure(_previous, data)
+        current = _measure(_results_to_df, data)
+        float32 = _measure(lambda r: _results_to_df(r, dtype='float32'), data)
+        print('%-9s DataFrame(results): %7.1f ms' % (name, previous * 1e3))
+        print('%-9s columnar float64:   %7.1f ms (%.1fx)' % (name, current * 1e3, previous / current))
+        print('%-9s columnar float32:   %7.1f ms (%.1fx)' % (name, float32 * 1e3, previous / float32))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
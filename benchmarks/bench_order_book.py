@@ -0,0 +1,113 @@
+"""
+Compare syncing orders into the OrderBook against the previous Orders.fetch_orders update path.
+
+    python benchmarks/bench_order_book.py [orders]
+
+The previous path compares every fetched uuid with lists of all known uuids,
+so syncing known orders takes minutes for 100k orders. It is measured once.
+"""
+
+import sys
+import time
+
+from lemon_markets.instrument import Instrument
+from lemon_markets.order import Order, OrderBook, OrderStatus
+
+STATUSES = list(OrderStatus)
+
+
+def _previous(orders: dict, results: list):
+    # fetch_orders before the order book, without the requests
+    inactive_uuids = list(orders['INACTIVE'])
+    active_uuids = list(orders['ACTIVATED'])
+    in_progress_uuids = list(orders['IN_PROGRESS'])
+    executed_uuids = list(orders['EXECUTED'])
+    deleted_uuids = list(orders['DELETED'])
+    expired_uuids = list(orders['EXPIRED'])
+
+    for order in results:
+        uuid = order.uuid
+        if uuid in inactive_uuids:
+            orders['INACTIVE'].pop(uuid)
+        if uuid in active_uuids:
+            orders['ACTIVATED'].pop(uuid)
+        if uuid in in_progress_uuids:
+            orders['IN_PROGRESS'].pop(uuid)
+        if uuid in executed_uuids:
+            orders['EXECUTED'].pop(uuid)
+        if uuid in deleted_uuids:
+            orders['DELETED'].pop(uuid)
+        if uuid in expired_uuids:
+            orders['EXPIRED'].pop(uuid)
+        orders[order.status.name].update({order.uuid: order})
+
+
+def _previous_lookups(orders: dict, uuids: list, isin: str):
+    # there was no lookup by uuid or isin, the status dicts were searched
+    for uuid in uuids:
+        next(bucket[uuid] for bucket in orders.values() if uuid in bucket)
+    return [o for bucket in orders.values() for o in bucket.values() if o.instrument.isin == isin]
+
+
+def _current(book: OrderBook, results: list):
+    book.add_many(results)
+
+
+def _current_lookups(book: OrderBook, uuids: list, isin: str):
+    for uuid in uuids:
+        book.get(uuid)
+    return book.with_isin(isin)
+
+
+def _measure(setup, run, repeat: int = 5) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        state = setup()
+        start = time.perf_counter()
+        run(state)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(n: int = 100000):       # noqa
+    instruments = [Instrument(isin='DE%010d' % i) for i in range(500)]
+    results = [Order(instrument=instruments[i % len(instruments)], quantity=1, side=('buy', 'sell')[i % 2],
+                     uuid='order_%d' % i, status=STATUSES[i % len(STATUSES)]) for i in range(n)]
+    changed = [Order(instrument=o.instrument, quantity=1, side=o.side, uuid=o.uuid,
+                     status=STATUSES[(i + 1) % len(STATUSES)]) for i, o in enumerate(results)]
+    uuids = [o.uuid for o in results[::97]]
+    isin = instruments[0].isin
+
+    def empty_dict():
+        return {status.name: {} for status in OrderStatus}
+
+    def full_dict():
+        orders = empty_dict()
+        _previous(orders, results)
+        return orders
+
+    def full_book():
+        book = OrderBook()
+        book.add_many(results)
+        return book
+
+    timings = (
+        ('sync new orders', empty_dict, lambda o: _previous(o, results), OrderBook, lambda b: _current(b, results)),
+        ('sync unchanged orders', full_dict, lambda o: _previous(o, results), full_book, lambda b: _current(b, results)),
+        ('sync status changes', full_dict, lambda o: _previous(o, changed), full_book, lambda b: _current(b, changed)),
+        ('lookups by uuid and isin', full_dict, lambda o: _previous_lookups(o, uuids, isin),
+         full_book, lambda b: _current_lookups(b, uuids, isin)),
+    )
+    print('orders:                   %d' % n)
+    for name, previous_setup, previous_run, book_setup, book_run in timings:
+        previous, current = _measure(previous_setup, previous_run, repeat=1), _measure(book_setup, book_run)
+        print('%-24s  previous: %10.1f ms  order book: %8.1f ms (%.1fx)'
+              % (name, previous * 1e3, current * 1e3, previous / current), flush=True)
+
+    orders, book = full_dict(), full_book()
+    assert len(book) == sum(len(bucket) for bucket in orders.values()) == n
+    assert {o.uuid for o in book.with_isin(isin)} == {o.uuid for o in _previous_lookups(orders, uuids, isin)}
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
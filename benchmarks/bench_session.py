@@ -0,0 +1,43 @@
+"""
+Compare one-shot requests against the pooled session.
+
+Runs against a local stand-in server, so the numbers show the cost of
+connection setup rather than network latency. Against the real API the
+difference grows with the TLS handshake and the round trip time.
+
+    python benchmarks/bench_session.py [requests]
+"""
+
+import sys
+import time
+
+import requests
+
+from lemon_markets.helpers.session import get_session
+from lemon_markets.tests.stand_in_server import StandInServer
+
+
+def _measure(get, url: str, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        get(url).raise_for_status()
+    return (time.perf_counter() - start) / n
+
+
+def main(n: int = 500):       # noqa
+    with StandInServer() as server:
+        server.json('GET', '/state/', {'state': {'balance': '100000.00'}})
+        url = server.url + 'state/'
+        get_session().get(url)      # warm up
+        one_shot = _measure(requests.get, url, n)
+        pooled = _measure(get_session().get, url, n)
+
+    print('requests per run:  %d' % n)
+    print('one-shot requests: %8.1f us/request' % (one_shot * 1e6))
+    print('pooled session:    %8.1f us/request' % (pooled * 1e6))
+    print('saved:             %8.1f us/request (%.0f%%)' % (
+        (one_shot - pooled) * 1e6, 100 * (one_shot - pooled) / one_shot))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -1,14 +1,31 @@
 """The entry point of all your scripts."""
 
+import hashlib
+import os
+import threading
 import time
-import requests
 import json
+import weakref
 
 from lemon_markets.config import DEFAULT_AUTH_API_URL, \
     DEFAULT_PAPER_REST_API_URL, DEFAULT_PAPER_DATA_REST_API_URL, \
-    DEFAULT_MONEY_REST_API_URL, DEFAULT_MONEY_DATA_REST_API_URL
+    DEFAULT_MONEY_REST_API_URL, DEFAULT_MONEY_DATA_REST_API_URL, \
+    DEFAULT_INSTRUMENT_CACHE_SIZE, DEFAULT_INSTRUMENT_CACHE_TTL, \
+    DEFAULT_TOKEN_REFRESH_AHEAD, DEFAULT_TOKEN_RETRY_INTERVAL, \
+    DEFAULT_RATE_LIMIT, DEFAULT_RATE_BURST, DEFAULT_MAX_RETRIES, DEFAULT_RESPONSE_CACHE_BYTES
 
 from lemon_markets.exceptions import LemonTokenException
+from lemon_markets.helpers.cache import ResponseCache, SingleFlight, TTLCache
+from lemon_markets.helpers.metrics import LatencyHistogram
+from lemon_markets.helpers.rate_limit import RateLimiter
+from lemon_markets.helpers.session import get_session
+
+
+def _refresh_in_background(account_ref: weakref.ref):
+    # the timer only holds a weak reference, so it does not keep the account alive
+    account = account_ref()
+    if account is not None:
+        account._refresh_access_token()
 
 
 class Account:
@@ -21,6 +38,21 @@ class Account:
         A currently valid access token
     access_token_type : str
         Type of the access token. Currently only `bearer`
+    token_refresh_latency : LatencyHistogram
+        The durations of the token requests
+    token_refresh_errors : int
+        The number of failed token requests
+    rate_limiter : RateLimiter
+        Limits the requests of all clients of the account. `rate_limiter.budget()`
+        tells how many requests can be sent within the next second without waiting.
+    max_retries : int
+        How often a request is retried after a response with status 429 or 5xx
+    request_coalescing : SingleFlight
+        Identical GET requests sent concurrently by clients of the account share one
+        HTTP request. `request_coalescing.joined` is the number of requests saved.
+    response_cache : ResponseCache
+        GET responses with an ETag or Last-Modified header. They are requested
+        conditionally and served from the cache if they did not change.
 
     Raises
     ------
@@ -41,12 +73,30 @@ class Account:
 
     _DEFAULT_API_URL: str
     _DATA_API_URL: str
+    _AUTH_API_URL: str
+
+    # instruments by isin, shared by all clients of the account
+    _instrument_cache: TTLCache
+
+    token_refresh_latency: LatencyHistogram
+    token_refresh_errors: int
+
+    rate_limiter: RateLimiter
+    max_retries: int
+    request_coalescing: SingleFlight
+    response_cache: ResponseCache
 
     def __init__(self, client_id: str, client_secret: str,
-                 trading_type: str = 'paper'):
+                 trading_type: str = 'paper', refresh_token_in_background: bool = True,
+                 token_cache: str = None, rate_limit: float = DEFAULT_RATE_LIMIT,
+                 rate_burst: int = DEFAULT_RATE_BURST, max_retries: int = DEFAULT_MAX_RETRIES,
+                 response_cache_bytes: int = DEFAULT_RESPONSE_CACHE_BYTES):
         """
         Initialize with client_id and client_secret.
 
+        No request is sent here, the access token is requested with the
+        first API call.
+
         Parameters
         ----------
         client_id : str
@@ -55,6 +105,21 @@ class Account:
             The secret of your client
         trading_type : str, optional
             The type of trading to use, by default `paper`
+        refresh_token_in_background : bool, optional
+            Renew the access token in a background thread shortly before it expires,
+            so requests never wait for it, by default True
+        token_cache : str, optional
+            The path of a file to keep access tokens in, readable only by the current user.
+            A new process reuses a token from this file while it is valid. By default, tokens are not stored.
+        rate_limit : float, optional
+            The maximum number of requests per second of all clients of the account, by default 20
+        rate_burst : int, optional
+            The number of requests which may be sent at once, by default 40
+        max_retries : int, optional
+            How often a request is retried after a response with status 429 or 5xx, by default 3.
+            Requests which are not idempotent (POST, PATCH) are only retried after status 429.
+        response_cache_bytes : int, optional
+            The maximum size of the cached GET responses, by default 32 MiB. 0 disables the cache.
 
         Raises
         ------
@@ -64,6 +129,24 @@ class Account:
         """
         self._client_ID = client_id
         self._client_secret = client_secret
+        self._AUTH_API_URL = DEFAULT_AUTH_API_URL
+        self._instrument_cache = TTLCache(
+            maxsize=DEFAULT_INSTRUMENT_CACHE_SIZE, ttl=DEFAULT_INSTRUMENT_CACHE_TTL)
+        self._refresh_token_in_background = refresh_token_in_background
+        self._token_lock = threading.Lock()
+        self._token_timer = None
+        self.token_refresh_latency = LatencyHistogram()
+        self.token_refresh_errors = 0
+        self.rate_limiter = RateLimiter(rate_limit, rate_burst)
+        self.max_retries = max_retries
+        self.request_coalescing = SingleFlight()
+        self.response_cache = ResponseCache(response_cache_bytes)
+        self._token_cache = None if token_cache is None else os.path.expanduser(token_cache)
+        self._access_token = None
+        self._access_token_type = None
+        self._access_token_expires = 0
+        # built once per token instead of once per request
+        self._authorization_header = None
 
         if trading_type.lower() == 'paper':
             self._DEFAULT_API_URL = DEFAULT_PAPER_REST_API_URL
@@ -73,23 +156,115 @@ class Account:
             self.DEFAULT_API_URL = DEFAULT_MONEY_REST_API_URL
             self._DATA_API_URL = DEFAULT_MONEY_DATA_REST_API_URL
 
-        self._request_access_token()
-
-    def _request_access_token(self):
-        data = {"client_id": self._client_ID,
+    def _token_request_data(self) -> dict:
+        return {"client_id": self._client_ID,
                 "client_secret": self._client_secret,
                 "grant_type": "client_credentials"}
-        response = requests.post(url=DEFAULT_AUTH_API_URL, data=data)
-        response.raise_for_status()
-
-        data = json.loads(response.content)
 
+    def _request_access_token(self):
+        start = time.perf_counter()
+        try:
+            response = get_session().post(url=self._AUTH_API_URL, data=self._token_request_data())
+            response.raise_for_status()
+        except Exception:
+            self.token_refresh_errors += 1
+            raise
+        finally:
+            self.token_refresh_latency.record(time.perf_counter() - start)
+
+        self._set_access_token(json.loads(response.content))
+
+    def _set_access_token(self, data: dict, store: bool = True):
         self._access_token = data.get("access_token")
         self._access_token_type = data.get("token_type")
         if self._access_token_type not in ["bearer"]:
             raise LemonTokenException("The access token is not from type bearer.")
+        self._authorization_header = {"Authorization": "Bearer " + self._access_token}
+        expires_in = data.get("expires_in")
         self._access_token_expires = int(
-            time.time()) + data.get("expires_in") - 60
+            time.time()) + expires_in - 60
+        if store:
+            self._store_token()
+        # renew ahead of time, but not before half of the lifetime has passed
+        lifetime = expires_in - 60
+        self._schedule_token_refresh(max(lifetime - DEFAULT_TOKEN_REFRESH_AHEAD, lifetime / 2, 1))
+
+    def _schedule_token_refresh(self, delay: float):
+        if not self._refresh_token_in_background:
+            return
+        if self._token_timer is not None:
+            self._token_timer.cancel()
+        self._token_timer = threading.Timer(delay, _refresh_in_background, args=(weakref.ref(self),))
+        self._token_timer.daemon = True
+        self._token_timer.start()
+
+    def _refresh_access_token(self):
+        # runs on the timer thread, requests keep using the current token meanwhile
+        try:
+            with self._token_lock:
+                self._request_access_token()
+        except Exception:
+            self._schedule_token_refresh(DEFAULT_TOKEN_RETRY_INTERVAL)
+
+    def _ensure_access_token(self):
+        # only waits for the first token, or if the token expired because background refreshes failed
+        if self._access_token_expired:
+            with self._token_lock:
+                if self._access_token_expired and not self._load_token():
+                    self._request_access_token()
+
+    @property
+    def _token_cache_key(self) -> str:
+        return hashlib.sha256(f"{self._AUTH_API_URL} {self._client_ID}".encode()).hexdigest()
+
+    def _read_token_cache(self) -> dict:
+        try:
+            # a file others can read may have been tampered with
+            if os.name == 'posix' and os.stat(self._token_cache).st_mode & 0o077:
+                return {}
+            with open(self._token_cache) as file:
+                entries = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def _load_token(self) -> bool:
+        if self._token_cache is None:
+            return False
+        entry = self._read_token_cache().get(self._token_cache_key)
+        if not entry or entry.get("expires_at", 0) - 60 <= time.time():
+            return False
+        self._set_access_token({"access_token": entry.get("access_token"), "token_type": entry.get("token_type"),
+                                "expires_in": int(entry["expires_at"] - time.time())}, store=False)
+        return True
+
+    def _store_token(self):
+        if self._token_cache is None:
+            return
+        now = time.time()
+        entries = {key: entry for key, entry in self._read_token_cache().items()
+                   if isinstance(entry, dict) and entry.get("expires_at", 0) > now}
+        entries[self._token_cache_key] = {"access_token": self._access_token, "token_type": self._access_token_type,
+                                          "expires_at": self._access_token_expires + 60}
+        path = "%s.%d.tmp" % (self._token_cache, os.getpid())
+        try:
+            with os.fdopen(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as file:
+                json.dump(entries, file)
+            os.replace(path, self._token_cache)
+        except OSError:
+            # the cache is optional, a token which is not stored is requested again by the next process
+            pass
+
+    def stop_token_refresh(self):
+        """Stop renewing the access token in the background, e.g. before discarding the account."""
+        self._refresh_token_in_background = False
+        if self._token_timer is not None:
+            self._token_timer.cancel()
+            self._token_timer = None
+
+    @property
+    def _access_token_expired(self) -> bool:
+        return time.time() > self._access_token_expires
 
     @property
     def access_token(self) -> str:
@@ -102,9 +277,7 @@ class Account:
             The access token
 
         """
-        if time.time() > self._access_token_expires:
-            self._request_access_token()
-
+        self._ensure_access_token()
         return self._access_token
 
     @property
@@ -118,9 +291,7 @@ class Account:
             The type. Currently only `bearer`
 
         """
-        if time.time() > self._access_token_expires:
-            self._request_access_token()
-
+        self._ensure_access_token()
         return self._access_token_type
 
     @property
@@ -134,9 +305,8 @@ class Account:
             The authorization dict (currently only of type `bearer)`: {"Authorization": "Bearer " + self.access_token}
 
         """
-        if self._access_token_type == "bearer":
-            token_string = "Bearer " + self.access_token
-        else:
+        self._ensure_access_token()
+        if self._access_token_type != "bearer":
             raise LemonTokenException("The access token is not from type bearer.")
 
-        return {"Authorization": token_string}
+        return self._authorization_header
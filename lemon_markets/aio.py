@@ -0,0 +1,640 @@
+"""
+Asyncio counterparts of the API clients.
+
+The async clients mirror the blocking ones, but every method that talks to
+the API is a coroutine. All clients running on one event loop share a
+single connection pool, so many requests can be in flight without a
+thread each. Requires `aiohttp` (`pip install lemon_markets[async]`).
+"""
+
+import asyncio
+import json
+import time
+import weakref
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Tuple, Union
+
+from pandas import DataFrame
+
+from lemon_markets.account import Account
+from lemon_markets.config import DEFAULT_PAGE_WORKERS, DEFAULT_BACKOFF_BASE, DEFAULT_BACKOFF_MAX
+from lemon_markets.exceptions import LemonConnectionException, LemonAPIException
+from lemon_markets.helpers.api_client import _IDEMPOTENT_METHODS, _RETRY_STATUSES
+from lemon_markets.helpers.paging import predict_page_urls
+from lemon_markets.helpers.rate_limit import backoff, retry_after
+from lemon_markets.helpers.session import get_async_session
+from lemon_markets.helpers.time_helper import current_time
+from lemon_markets.instrument import Instrument
+from lemon_markets.market_data import _ohlc_request, _results_to_df
+from lemon_markets.order import Order, OrderBook, OrderStatus, _OrdersByStatus, _order_data, _fetch_params
+from lemon_markets.portfolio import Position
+from lemon_markets.space import Space
+from lemon_markets.trading_venue import TradingCalendar, TradingVenue
+
+# one lock per event loop and account, so concurrent requests wait for a single token refresh.
+# asyncio locks are bound to the loop they are first used in, like the sessions.
+_token_locks = weakref.WeakKeyDictionary()
+
+
+def _token_lock(account: Account) -> asyncio.Lock:
+    loop = asyncio.get_running_loop()
+    locks = _token_locks.get(loop)
+    if locks is None:
+        locks = _token_locks[loop] = weakref.WeakKeyDictionary()
+    lock = locks.get(account)
+    if lock is None:
+        lock = locks[account] = asyncio.Lock()
+    return lock
+
+
+class _AsyncApiClient:
+
+    # maximum number of pages requested concurrently by _request_paged
+    _page_workers: int = DEFAULT_PAGE_WORKERS
+
+    def __init__(
+            self, account: Account, endpoint: str = None, is_data: bool = False):
+        self._account = account
+        ep = self._account._DATA_API_URL if is_data else self._account._DEFAULT_API_URL
+        self._endpoint = endpoint or ep
+
+    async def _authorization(self) -> dict:
+        account = self._account
+        if account._access_token_expired:
+            async with _token_lock(account):
+                if account._access_token_expired and not account._load_token():
+                    await self._request_access_token()
+        return account._authorization
+
+    async def _request_access_token(self):
+        account = self._account
+        start = time.perf_counter()
+        try:
+            async with get_async_session().post(
+                    account._AUTH_API_URL, data=account._token_request_data()) as response:
+                if response.status > 399:
+                    raise LemonAPIException(
+                        status=response.status, errormessage=response.reason)
+                data = json.loads(await response.read())
+        except asyncio.TimeoutError:
+            account.token_refresh_errors += 1
+            raise LemonConnectionException(
+                "Network Timeout on url: %s" % account._AUTH_API_URL)
+        except Exception:
+            account.token_refresh_errors += 1
+            raise
+        finally:
+            account.token_refresh_latency.record(time.perf_counter() - start)
+        account._set_access_token(data)
+
+    async def _request_paged(self, endpoint, data_=None, params=None, max_workers: int = None) -> List[dict]:
+        max_workers = max(max_workers or self._page_workers, 1)
+        data = await self._request(endpoint, data=data_, params=params)
+        results = data['results']
+
+        urls = predict_page_urls(data) if max_workers > 1 else None
+        if urls is not None:
+            semaphore = asyncio.Semaphore(max_workers)
+
+            async def fetch(url):
+                async with semaphore:
+                    return await self._request(url, data=data_, url_prefix=False)
+
+            for page in await asyncio.gather(*(fetch(url) for url in urls)):
+                results += page['results']
+            return results
+
+        # Keep requesting until there are no more pages
+        next = None
+        while data['next'] is not None and data['next'] != next:
+            next = data['next']
+            data = await self._request(next, data=data_, url_prefix=False)
+            results += data['results']
+
+        return results
+
+    async def _request(
+            self, endpoint, method='GET', data=None, params=None,
+            url_prefix=True) -> dict:
+        method = method.upper()
+        if method not in ('GET', 'POST', 'PUT', 'PATCH', 'DELETE'):
+            raise ValueError('Unknown method: %r' % method)
+        url = self._endpoint+endpoint if url_prefix else endpoint
+        headers = await self._authorization()
+        if params is not None:
+            # aiohttp only accepts strings, requests drops None values
+            params = {key: str(value) for key, value in params.items() if value is not None}
+
+        limiter = self._account.rate_limiter
+
+        attempt = 0
+        while True:
+            wait = limiter.reserve()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                async with get_async_session().request(
+                        method, url, data=data, params=params, headers=headers) as response:
+                    status = response.status
+                    if (attempt < self._account.max_retries and status in _RETRY_STATUSES
+                            and (status == 429 or method.lower() in _IDEMPOTENT_METHODS)):
+                        delay = backoff(attempt, DEFAULT_BACKOFF_BASE, DEFAULT_BACKOFF_MAX,
+                                        retry_after(response.headers))
+                    elif status > 399:
+                        raise LemonAPIException(
+                            status=response.status, errormessage=response.reason)
+                    else:
+                        if method != 'DELETE':
+                            data = json.loads(await response.read())
+                        return data
+            except asyncio.TimeoutError:
+                raise LemonConnectionException("Network Timeout on url: %s" % url)
+
+            if status == 429:
+                limiter.pause(delay)
+            else:
+                await asyncio.sleep(delay)
+            attempt += 1
+
+
+class AsyncInstruments(_AsyncApiClient):
+    """
+    Async counterpart of :class:`lemon_markets.instrument.Instruments`.
+
+    Parameters
+    ----------
+    account: Account
+        The account object
+
+    """
+
+    def __init__(self, account: Account):       # noqa
+        super().__init__(account=account, is_data=True)
+
+    async def list_instruments(self, *args, **kwargs) -> List[Instrument]:
+        """
+        List all instruments with matching criteria.
+
+        Parameters
+        ----------
+        tradable : bool, optional
+            Search for tradable instruments.
+        search : str, optional
+            A search term
+        currency : str, optional
+            A specific currency
+        type : str, optional
+            A type (`stock`, `bond`, `fund` or `warrant`)
+
+        Returns
+        -------
+        List[Instrument]
+            List of instruments matching your query
+
+        """
+        assert not args, 'Please supply the arguments with a keyword i.e. `tradable=True` instead of a positional `True`.'
+        result_pages = await self._request_paged('instruments/', params=kwargs)
+        return [Instrument._from_response(self._account, res) for res in result_pages]
+
+    async def get_instrument(self, isin: str) -> Instrument:
+        """
+        Get a single instrument by isin, using the instrument cache of the account.
+
+        See :meth:`lemon_markets.instrument.Instruments.get_instrument`.
+
+        Returns
+        -------
+        Instrument
+            The instrument
+
+        """
+        instrument = self._account._instrument_cache.get(isin)
+        if instrument is None:
+            instrument = await self._search_isin(isin)
+        return instrument
+
+    async def get_instruments(self, isins: Iterable[str]) -> Dict[str, Instrument]:
+        """
+        Get several instruments by isin, requesting uncached ones concurrently.
+
+        See :meth:`lemon_markets.instrument.Instruments.get_instruments`.
+
+        Returns
+        -------
+        Dict[str, Instrument]
+            The instruments by isin
+
+        """
+        isins = list(dict.fromkeys(isins))
+        found = await asyncio.gather(*(self.get_instrument(isin) for isin in isins))
+        return dict(zip(isins, found))
+
+    async def _search_isin(self, isin: str) -> Instrument:
+        found = await self.list_instruments(search=isin)
+        instrument = next((i for i in found if i.isin == isin), None)
+        if instrument is None:
+            raise ValueError('No instrument found with isin: %r' % isin)
+        self._account._instrument_cache.set(isin, instrument)
+        return instrument
+
+
+class AsyncOHLC(_AsyncApiClient):
+    """
+    Async counterpart of :class:`lemon_markets.market_data.OHLC`.
+
+    Parameters
+    ----------
+    account : Account
+        The account object containing your credentials
+
+    """
+
+    def __init__(self, account: Account):       # noqa
+        super().__init__(account=account)
+
+    async def get_data(
+            self, instrument: Instrument, venue: TradingVenue, x1: str,
+            ordering: str = None, date_from: datetime = None,
+            date_until: datetime = None, as_df: bool = True, dtype: str = 'float64') -> Union[dict, DataFrame, None]:
+        """
+        Get OHLC data on the specified instrument.
+
+        See :meth:`lemon_markets.market_data.OHLC.get_data` for the parameters.
+
+        Returns
+        -------
+        Union[dict, pandas.DataFrame, None]
+            Either the raw response json data (as dict) or a pandas dataframe.
+            If the response is empty (no data available) None is returned.
+
+        """
+        endpoint, params = _ohlc_request(instrument, venue, x1, ordering, date_from, date_until)
+        results = await self._request_paged(endpoint=endpoint, params=params)
+
+        if len(results) == 0:
+            return None
+
+        if not as_df:
+            return results
+        else:
+            return _results_to_df(results, ordering, dtype)
+
+
+class AsyncOrders(_AsyncApiClient):
+    """
+    Async counterpart of :class:`lemon_markets.order.Orders`.
+
+    Parameters
+    ----------
+    account : Account
+        The account object
+    space : Space
+        The space object
+
+    Attributes
+    ----------
+    book : OrderBook
+        The created and retrieved orders, indexed by uuid, status, ISIN and side
+    orders : Mapping[str, Mapping[str, Order]]
+        The orders. In a read-only dict grouped by state and uuid.
+
+    """
+
+    _space: Space
+
+    def __init__(self, account: Account, space: Space):     # noqa
+        self._space = space
+        super().__init__(account=account)
+        self.book = OrderBook()
+        self.orders = _OrdersByStatus(self.book)
+
+    async def create_order(self,
+                           instrument: Instrument,
+                           valid_until: datetime,
+                           side: str,
+                           quantity: int,
+                           stop_price: Union[int, float] = None,
+                           limit_price: Union[int, float] = None) -> Order:
+        """
+        Create an order.
+
+        See :meth:`lemon_markets.order.Orders.create_order` for the parameters.
+
+        Returns
+        -------
+        Order
+            The order created
+
+        """
+        endpoint = f"spaces/{self._space.uuid}/orders/"
+        data = _order_data(instrument, valid_until, side, quantity, stop_price, limit_price)
+        data = await self._request(endpoint=endpoint, method="POST", data=data)
+        return self.book.add(Order._from_response(instrument, data))
+
+    async def update_order(self, order: Order) -> Tuple[bool, OrderStatus]:
+        """
+        Update the order status.
+
+        Parameters
+        ----------
+        order : Order
+            The order to update
+
+        Returns
+        -------
+        Tuple[bool, OrderStatus]
+            Whether the status has changed and the new OrderStatus
+
+        """
+        old_status = await self._update_order_data(order, '/', "GET")
+        return old_status != order.status, order.status
+
+    async def activate_order(self, order: Order) -> bool:
+        """
+        Activate an order.
+
+        Parameters
+        ----------
+        order : Order
+            The order to activate
+
+        Returns
+        -------
+        bool
+            `True` if the order was successfully activated
+
+        """
+        await self._update_order_data(order, '/activate/', "PUT")
+        return order.status == OrderStatus.ACTIVATED
+
+    async def _update_order_data(self, order, arg1, method) -> OrderStatus:
+        endpoint = f'spaces/{self._space.uuid}/orders/{order.uuid}{arg1}'
+        data = await self._request(endpoint=endpoint, method=method)
+        return self.book.update(order, data)
+
+    async def delete_order(self, order: Order) -> Tuple[bool, OrderStatus]:
+        """
+        Delete specified order.
+
+        Parameters
+        ----------
+        order : Order
+            The order to delete
+
+        Returns
+        -------
+        Tuple[bool, OrderStatus]
+            Tuple in which the bool indicates success,
+            and the OrderStatus is the new status of the order
+
+        """
+        endpoint = f"spaces/{self._space.uuid}/orders/{order.uuid}/"
+        await self._request(endpoint=endpoint, method="DELETE")
+        return await self.update_order(order)
+
+    async def fetch_orders(self,
+                           created_at_until: datetime = None,
+                           created_at_from: datetime = None,
+                           side: str = None,
+                           type: str = None,
+                           status: str = None) -> List[Order]:
+        """
+        Fetch orders by criteria and add them to the orders dict.
+
+        See :meth:`lemon_markets.order.Orders.fetch_orders` for the parameters.
+
+        Returns
+        -------
+        List[Order]
+            The fetched orders
+
+        """
+        endpoint = f"spaces/{self._space.uuid}/orders/"
+        params = _fetch_params(created_at_until, created_at_from, side, type, status)
+        results = await self._request_paged(endpoint=endpoint, params=params)
+        instruments = await AsyncInstruments(self._account).get_instruments(
+            o["instrument"].get("isin") for o in results)
+
+        return self.book.add_many(Order._from_response(instruments[o["instrument"].get("isin")], o)
+                                  for o in results)
+
+
+class AsyncPortfolio(_AsyncApiClient):
+    """
+    Async counterpart of :class:`lemon_markets.portfolio.Portfolio`.
+
+    Attributes
+    ----------
+    positions : list
+            The positions based on the last call of update_positions().
+
+    Parameters
+    ----------
+    account : Account
+        The account
+    space : Space
+        The space
+
+    """
+
+    _space: Space
+
+    def __init__(self, account: Account, space: Space):     # noqa
+        self._space = space
+        super().__init__(account=account)
+        self.positions = []
+
+    async def update_positions(self) -> List[Position]:
+        """Update non-static portfolio data and return the positions."""
+        endpoint = f"spaces/{self._space.uuid}/portfolio/"
+        data_rows = await self._request_paged(endpoint=endpoint)
+        instruments = await AsyncInstruments(self._account).get_instruments(
+            data["instrument"].get("isin") for data in data_rows)
+
+        self.positions = [
+            Position._from_response(instrument=instruments[data["instrument"].get("isin")], data=data)
+            for data in data_rows]
+        return self.positions
+
+
+class AsyncState(_AsyncApiClient):
+    """
+    Async counterpart of :class:`lemon_markets.state.State`.
+
+    Parameters
+    ----------
+    account : Account
+        The account with your space's credentials.
+    cash_time_in_seconds : int
+        Optional: The time requested data is cashed. Default is 10 seconds.
+
+    """
+
+    def __init__(self, account: Account, cash_time_in_seconds: int = 10):       # noqa
+        super().__init__(account)
+        self._cash_storage_time = cash_time_in_seconds
+        self._state = None
+        self._balance = None
+        self._spaces = None
+        self._state_updated = 0.0
+        self._spaces_updated = 0.0
+
+    async def get_state(self) -> dict:
+        """
+        Get the state of the account, requesting it if the cashed data is too old.
+
+        Returns
+        -------
+        dict
+            The state
+
+        """
+        if time.monotonic() - self._state_updated > self._cash_storage_time or self._state is None:
+            data = await self._request(endpoint='state/')
+            self._balance = float(data.get('state').get('balance'))
+            self._state = data
+            self._state_updated = time.monotonic()
+        return self._state
+
+    async def get_balance(self) -> float:
+        """
+        Get the balance of the account.
+
+        Returns
+        -------
+        float
+            The balance of the account
+
+        """
+        await self.get_state()
+        return self._balance
+
+    async def get_spaces(self) -> List[Space]:
+        """
+        Get the spaces of your account.
+
+        Returns
+        -------
+        List of Spaces
+            List of your spaces
+
+        """
+        if time.monotonic() - self._spaces_updated > self._cash_storage_time or self._spaces is None:
+            data_rows = await self._request_paged('spaces/')
+            self._spaces = [Space._from_response(
+                self._account, data) for data in data_rows]
+            self._spaces_updated = time.monotonic()
+        return self._spaces
+
+    async def update_space(self, space: Space) -> Space:
+        """
+        Update the state of a space, e.g. its balance and cash to invest.
+
+        Parameters
+        ----------
+        space : Space
+            The space to update
+
+        Returns
+        -------
+        Space
+            The updated space
+
+        """
+        space.update_values(await self._request(f"spaces/{space.uuid}/"))
+        return space
+
+    def change_cash_time(self, new_cash_time_in_seconds: int):
+        """
+        Change the time request results are cashed by multiple calls.
+
+        Parameters
+        ----------
+        new_cash_time_in_seconds : int
+            The wished time data is cashed.
+
+        """
+        self._cash_storage_time = new_cash_time_in_seconds
+
+
+class AsyncTradingVenues(_AsyncApiClient):
+    """
+    Async counterpart of :class:`lemon_markets.trading_venue.TradingVenues`.
+
+    Also answers the opening questions of a
+    :class:`lemon_markets.trading_venue.TradingVenue` without blocking.
+
+    Attributes
+    ----------
+    trading_venues : list[TradingVenue]
+        A list of all Trading venues.
+
+    Parameters
+    ----------
+    account : Account
+        Your auth data
+
+    """
+
+    trading_venues = None
+
+    def __init__(self, account: Account):       # noqa
+        super().__init__(account=account, is_data=True)
+
+    async def get_venues(self) -> List[TradingVenue]:
+        """Load the list of trading venues."""
+        data = await self._request(endpoint='venues/')
+        self.trading_venues = [TradingVenue._from_response(
+            self._account, data) for data in data.get("results")]
+        return self.trading_venues
+
+    async def update_opening_days(self, venue: TradingVenue):
+        """Update the opening_days property of the venue."""
+        venue.opening_days = (await self._request(
+            endpoint=f"venues/{venue.mic}/opening-days")).get("results")
+        calendar = TradingCalendar.of(venue)
+        calendar.update(venue.opening_days)
+        # keeps the calendar from updating itself synchronously right away
+        calendar.mark_refreshed()
+
+    async def _calendar(self, venue: TradingVenue) -> TradingCalendar:
+        calendar = TradingCalendar.of(venue)
+        if calendar.horizon is None or calendar.horizon < current_time().date():
+            await self.update_opening_days(venue)
+        return calendar
+
+    async def is_open(self, venue: TradingVenue) -> bool:
+        """
+        Check if the venue is open.
+
+        Returns
+        -------
+        bool
+            True if the venue is open, False otherwise
+
+        """
+        return (await self._calendar(venue)).is_open()
+
+    async def time_until_close(self, venue: TradingVenue) -> timedelta:
+        """
+        Get time until close of the venue.
+
+        Returns
+        -------
+        timedelta
+            Returns the time until close. Uninitialized if not available
+
+        """
+        return (await self._calendar(venue)).time_until_close()
+
+    async def time_until_open(self, venue: TradingVenue) -> timedelta:
+        """
+        Get time until the market opens.
+
+        Returns
+        -------
+        timedelta
+            Returns the time until open. Uninitialized if not available
+
+        """
+        return (await self._calendar(venue)).time_until_open()
@@ -0,0 +1,270 @@
+"""Module for keeping a local snapshot of the instrument universe."""
+
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+from lemon_markets.account import Account
+from lemon_markets.config import DEFAULT_CATALOG_MAX_AGE
+from lemon_markets.instrument import Instrument, Instruments, InstrumentType
+from lemon_markets.search_index import InstrumentIndex
+from lemon_markets.trading_venue import TradingVenue
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS instruments (
+    isin TEXT PRIMARY KEY, wkn TEXT, name TEXT, title TEXT, type TEXT,
+    symbol TEXT, currency TEXT, tradable INTEGER, mics TEXT);
+CREATE TABLE IF NOT EXISTS venues (
+    mic TEXT PRIMARY KEY, name TEXT, title TEXT, currency TEXT);
+"""
+
+
+def _instrument_row(data: dict) -> tuple:
+    mics = ' '.join(venue.get('mic') for venue in data.get('venues') or [])
+    tradable = data.get('tradable')
+    return (data.get('isin'), data.get('wkn'), data.get('name'), data.get('title'), data.get('type'),
+            data.get('symbol'), data.get('currency'), None if tradable is None else int(tradable), mics)
+
+
+def _venue_row(data: dict) -> tuple:
+    return data.get('mic'), data.get('name'), data.get('title'), data.get('currency')
+
+
+class InstrumentCatalog:
+    """
+    A local snapshot of the instrument universe stored in a SQLite file.
+
+    On creation the snapshot is loaded from disk, which only takes a few
+    milliseconds, and lookups are answered from it without any request.
+    If the snapshot is older than `max_age`, it is refreshed in the background.
+    A refresh only rebuilds instruments which changed since the last one.
+
+    Parameters
+    ----------
+    account : Account
+        The account used for refreshing
+    path : str
+        The path of the catalog file. It is created if it does not exist.
+    max_age : float, optional
+        The age in seconds after which the snapshot is stale, by default one day
+    auto_refresh : bool, optional
+        Refresh a stale snapshot in the background, by default True
+    use_as_cache : bool, optional
+        Fill the instrument cache of the account with the snapshot, so
+        `Instruments.get_instrument` and the order and portfolio clients
+        resolve instruments offline, by default True
+
+    Attributes
+    ----------
+    updated_at : float
+        Unix timestamp of the last refresh, 0 if the catalog was never refreshed
+
+    """
+
+    def __init__(self, account: Account, path: str, max_age: float = DEFAULT_CATALOG_MAX_AGE,       # noqa
+                 auto_refresh: bool = True, use_as_cache: bool = True):
+        self._account = account
+        self.path = path
+        self.max_age = max_age
+        self.auto_refresh = auto_refresh
+        self.use_as_cache = use_as_cache
+        self.updated_at = 0.0
+        self._instruments: Dict[str, Instrument] = {}
+        self._rows: Dict[str, tuple] = {}
+        self._venues: Dict[str, TradingVenue] = {}
+        self._lock = threading.Lock()
+        self._refresh_thread: Optional[threading.Thread] = None
+        self._index: Optional[InstrumentIndex] = None
+
+        with self._connect() as connection:
+            connection.executescript(_SCHEMA)
+        self.load()
+        if self.auto_refresh and self.is_stale:
+            self.refresh(background=True)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        connection = sqlite3.connect(self.path)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    @property
+    def age(self) -> float:
+        """Seconds since the last refresh."""
+        return time.time() - self.updated_at
+
+    @property
+    def is_stale(self) -> bool:
+        """Whether the snapshot is older than `max_age`."""
+        return self.age > self.max_age
+
+    def load(self):
+        """Load the snapshot from disk."""
+        with self._connect() as connection:
+            meta = dict(connection.execute("SELECT key, value FROM meta"))
+            venue_rows = connection.execute("SELECT mic, name, title, currency FROM venues").fetchall()
+            rows = connection.execute(
+                "SELECT isin, wkn, name, title, type, symbol, currency, tradable, mics FROM instruments").fetchall()
+
+        venues = {row[0]: self._venue(row) for row in venue_rows}
+        instruments = {row[0]: self._instrument(row, venues) for row in rows}
+        with self._lock:
+            self._venues = venues
+            self._rows = {row[0]: row for row in rows}
+            self._instruments = instruments
+            self._index = None
+            self.updated_at = float(meta.get('updated_at', 0))
+        self._fill_cache(instruments.values())
+
+    def _venue(self, row: tuple) -> TradingVenue:
+        mic, name, title, currency = row
+        return TradingVenue(_account=self._account, name=name, title=title, mic=mic, currency=currency)
+
+    def _instrument(self, row: tuple, venues: Dict[str, TradingVenue]) -> Instrument:
+        isin, wkn, name, title, type_, symbol, currency, tradable, mics = row
+        return Instrument(
+            isin=isin, wkn=wkn, name=name, title=title, type=InstrumentType(type_), symbol=symbol,
+            currency=currency, tradable=None if tradable is None else bool(tradable),
+            trading_venues=[venues[mic] for mic in mics.split()])
+
+    def _fill_cache(self, instruments):
+        if self.use_as_cache:
+            cache = self._account._instrument_cache
+            for instrument in instruments:
+                cache.set(instrument.isin, instrument, ttl=self.max_age)
+
+    def refresh(self, background: bool = False) -> Optional[Tuple[int, int, int]]:
+        """
+        Download the instrument universe and update the snapshot.
+
+        Only added or changed instruments are rebuilt and written to disk.
+
+        Parameters
+        ----------
+        background : bool, optional
+            Refresh in a background thread and return immediately, by default False.
+            If a background refresh is already running, no second one is started.
+
+        Returns
+        -------
+        Optional[Tuple[int, int, int]]
+            The number of added, changed and removed instruments,
+            or None for a background refresh
+
+        """
+        if background:
+            with self._lock:
+                if self._refresh_thread is None or not self._refresh_thread.is_alive():
+                    self._refresh_thread = threading.Thread(target=self.refresh, daemon=True)
+                    self._refresh_thread.start()
+            return None
+
+        with self._lock:
+            old_rows = self._rows
+            venues = dict(self._venues)
+        rows = {}
+        changed = {}
+        changed_venues = []
+        for data in Instruments(self._account)._iter_raw_instruments():
+            row = _instrument_row(data)
+            rows[row[0]] = row
+            for venue_data in data.get('venues') or []:
+                mic = venue_data.get('mic')
+                if mic not in venues or _venue_row(venue_data) != self._venue_tuple(venues[mic]):
+                    venues[mic] = self._venue(_venue_row(venue_data))
+                    changed_venues.append(_venue_row(venue_data))
+            if old_rows.get(row[0]) != row:
+                changed[row[0]] = row
+        removed = [isin for isin in old_rows if isin not in rows]
+        added = sum(1 for isin in changed if isin not in old_rows)
+        counts = added, len(changed) - added, len(removed)
+        updated_at = time.time()
+
+        with self._connect() as connection:
+            connection.executemany("INSERT OR REPLACE INTO venues VALUES (?, ?, ?, ?)", changed_venues)
+            connection.executemany(
+                "INSERT OR REPLACE INTO instruments VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", changed.values())
+            connection.executemany("DELETE FROM instruments WHERE isin = ?", ((isin,) for isin in removed))
+            connection.execute("INSERT OR REPLACE INTO meta VALUES ('updated_at', ?)", (repr(updated_at),))
+
+        with self._lock:
+            instruments = dict(self._instruments)
+            for isin in removed:
+                instruments.pop(isin, None)
+            if changed_venues:
+                # venues are shared by the instruments, so rebuild them all
+                changed = rows
+            new = {isin: self._instrument(row, venues) for isin, row in changed.items()}
+            instruments.update(new)
+            self._venues = venues
+            self._rows = rows
+            self._instruments = instruments
+            self._index = None
+            self.updated_at = updated_at
+        self._fill_cache(new.values())
+        return counts
+
+    @staticmethod
+    def _venue_tuple(venue: TradingVenue) -> tuple:
+        return venue.mic, venue.name, venue.title, venue.currency
+
+    def wait(self, timeout: float = None):
+        """Wait for a running background refresh to finish."""
+        thread = self._refresh_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    @property
+    def index(self) -> InstrumentIndex:
+        """
+        A search index over the snapshot.
+
+        It is built on first use and rebuilt after a refresh. Searches
+        without local results fall back to the server.
+
+        Returns
+        -------
+        InstrumentIndex
+            The search index
+
+        """
+        index = self._index
+        if index is None:
+            index = self._index = InstrumentIndex(self, fallback=Instruments(self._account))
+        return index
+
+    def get(self, isin: str) -> Optional[Instrument]:
+        """
+        Look up an instrument in the snapshot.
+
+        Parameters
+        ----------
+        isin : str
+            The isin of the instrument
+
+        Returns
+        -------
+        Optional[Instrument]
+            The instrument, or None if it is not in the snapshot
+
+        """
+        return self._instruments.get(isin)
+
+    def venue(self, mic: str) -> Optional[TradingVenue]:
+        """Look up a trading venue in the snapshot by its mic."""
+        return self._venues.get(mic)
+
+    def __contains__(self, isin: str) -> bool:       # noqa
+        return isin in self._instruments
+
+    def __len__(self) -> int:       # noqa
+        return len(self._instruments)
+
+    def __iter__(self) -> Iterator[Instrument]:       # noqa
+        return iter(list(self._instruments.values()))
@@ -4,3 +4,25 @@ DEFAULT_PAPER_DATA_REST_API_URL: str = "https://paper-data.lemon.markets/v1/"
 DEFAULT_MONEY_REST_API_URL: str = ""
 DEFAULT_MONEY_DATA_REST_API_URL: str = ""
 DEFAULT_AUTH_API_URL: str = "https://auth.lemon.markets/oauth2/token"
+DEFAULT_PAGE_WORKERS: int = 4
+DEFAULT_INSTRUMENT_CACHE_SIZE: int = 10000
+DEFAULT_INSTRUMENT_CACHE_TTL: int = 3600
+DEFAULT_LOOKUP_WORKERS: int = 8
+DEFAULT_CATALOG_MAX_AGE: int = 86400
+DEFAULT_HISTORY_WORKERS: int = 8
+DEFAULT_OHLC_STORE_MAX_BYTES: int = 1024 ** 3
+DEFAULT_BATCH_WORKERS: int = 8
+DEFAULT_CALENDAR_REFRESH_DAYS: int = 2
+DEFAULT_CALENDAR_RETRY_INTERVAL: int = 60
+DEFAULT_TOKEN_REFRESH_AHEAD: int = 300
+DEFAULT_TOKEN_RETRY_INTERVAL: int = 10
+DEFAULT_RATE_LIMIT: float = 20
+DEFAULT_RATE_BURST: int = 40
+DEFAULT_MAX_RETRIES: int = 3
+DEFAULT_BACKOFF_BASE: float = 0.5
+DEFAULT_BACKOFF_MAX: float = 30
+DEFAULT_RESPONSE_CACHE_BYTES: int = 32 * 1024 ** 2
+DEFAULT_POLL_MIN_INTERVAL: float = 1
+DEFAULT_POLL_MAX_INTERVAL: float = 60
+DEFAULT_POLL_CLOSED_INTERVAL: float = 300
+DEFAULT_ORDER_WORKERS: int = 20
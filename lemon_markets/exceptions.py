@@ -25,3 +25,22 @@ class LemonTokenException(LemonException):
     """Raised when the account token is of the wrong type."""
 
     pass
+
+
+class LemonBatchException(LemonException):
+    """
+    Raised when some requests of a batch failed.
+
+    Attributes
+    ----------
+    results : list
+        The result per item of the batch, None for failed items
+    errors : Dict[int, Exception]
+        The exception per index of the failed items
+
+    """
+
+    def __init__(self, results, errors):       # noqa
+        self.results = results
+        self.errors = errors
+        super().__init__('%d of %d requests failed' % (len(errors), len(results)))
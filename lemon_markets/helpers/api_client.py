@@ -1,69 +1,104 @@
 # undocumented on rtd
 
 import json
+import time
 import requests
-from typing import List
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Iterator, List, Tuple
 
 from lemon_markets.account import Account
+from lemon_markets.config import DEFAULT_PAGE_WORKERS, DEFAULT_BACKOFF_BASE, DEFAULT_BACKOFF_MAX
 from lemon_markets.exceptions import LemonConnectionException, LemonAPIException
+from lemon_markets.helpers.paging import predict_page_urls
+from lemon_markets.helpers.rate_limit import backoff, retry_after
+from lemon_markets.helpers.session import get_session
+
+# statuses after which a request is retried, 429 for all methods, the others only for idempotent ones
+_RETRY_STATUSES = (429, 500, 502, 503, 504)
+_IDEMPOTENT_METHODS = ('get', 'put', 'delete')
 
 
 class _ApiClient:
 
+    # maximum number of pages requested concurrently by _request_paged
+    _page_workers: int = DEFAULT_PAGE_WORKERS
+
     def __init__(
             self, account: Account, endpoint: str = None, is_data: bool = False):
         self._account = account
         ep = self._account._DATA_API_URL if is_data else self._account._DEFAULT_API_URL
         self._endpoint = endpoint or ep
 
-    def _request_paged(self, endpoint, data_=None, params=None) -> List[dict]:
+    def _request_paged(self, endpoint, data_=None, params=None, max_workers: int = None) -> List[dict]:
 
-        # Keep requesting until there are no more pages
-        next = None
         results = []
 
         try:
-
-            while True:
-
-                if next is not None:
-                    data = self._request(next, data=data_, url_prefix=False)
-                else:
-                    data = self._request(endpoint, data=data_, params=params)
-
-                results += data['results']
-
-                if data['next'] is None or data['next'] == next:
-                    break
-                else:
-                    next = data['next']
+            for page in self._iter_pages(endpoint, data_=data_, params=params, max_workers=max_workers):
+                results += page
         except requests.Timeout:
             raise LemonConnectionException(
                 "Network Timeout on url: %s" % endpoint)
 
         return results
 
-    def _request(
-            self, endpoint, method='GET', data=None, params=None,
-            url_prefix=True) -> dict:
-        method = method.lower()
-        url = self._endpoint+endpoint if url_prefix else endpoint
-        headers = self._account._authorization
-
+    def _iter_pages(self, endpoint, data_=None, params=None, max_workers: int = None) -> Iterator[List[dict]]:
+        # Yields the results of every page in order. If the urls of the following pages can be predicted
+        # from the first one, up to `max_workers` pages are requested concurrently. Otherwise the next
+        # page is requested while the current one is handed to the caller.
+        max_workers = max(max_workers or self._page_workers, 1)
+        data = self._request(endpoint, data=data_, params=params)
+        if data['next'] is None:
+            yield data['results']
+            return
+
+        urls = predict_page_urls(data) if max_workers > 1 else None
+        pending = deque()
+        pool = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            if urls is not None:
+                urls = iter(urls)
+                for url in islice(urls, max_workers):
+                    pending.append(pool.submit(self._request, url, data=data_, url_prefix=False))
+                yield data['results']
+                while pending:
+                    data = pending.popleft().result()
+                    for url in islice(urls, 1):
+                        pending.append(pool.submit(self._request, url, data=data_, url_prefix=False))
+                    yield data['results']
+            else:
+                next = None
+                while True:
+                    if data['next'] is not None and data['next'] != next:
+                        next = data['next']
+                        pending.append(pool.submit(self._request, next, data=data_, url_prefix=False))
+                    yield data['results']
+                    if not pending:
+                        break
+                    data = pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+            pool.shutdown(wait=False)
+
+    @staticmethod
+    def _send(session, method, url, data, params, headers):
         try:
             if method == 'get':
-                response = requests.get(
+                response = session.get(
                     url=url, params=params, headers=headers)
             elif method == 'post':
-                response = requests.post(
+                response = session.post(
                     url=url, data=data, params=params, headers=headers)
             elif method == 'put':
-                response = requests.put(url=url, headers=headers)
+                response = session.put(url=url, headers=headers)
             elif method == 'patch':
-                response = requests.patch(
+                response = session.patch(
                     url=url, data=data, params=params, headers=headers)
             elif method == 'delete':
-                response = requests.delete(
+                response = session.delete(
                     url=url, params=params, headers=headers)
             else:
                 raise ValueError('Unknown method: %r' % method)
@@ -71,6 +106,74 @@ class _ApiClient:
         except requests.Timeout:
             raise LemonConnectionException("Network Timeout on url: %s" % url)
 
+        return response
+
+    def _fetch(self, method, url, data, params, headers=None):
+        headers = {**self._account._authorization, **(headers or {})}
+        session = get_session()
+        limiter = self._account.rate_limiter
+
+        attempt = 0
+        while True:
+            limiter.acquire()
+            response = self._send(session, method, url, data, params, headers)
+            status = response.status_code
+            if (attempt >= self._account.max_retries or status not in _RETRY_STATUSES
+                    or (status != 429 and method not in _IDEMPOTENT_METHODS)):
+                break
+            delay = backoff(attempt, DEFAULT_BACKOFF_BASE, DEFAULT_BACKOFF_MAX, retry_after(response.headers))
+            if status == 429:
+                # all clients of the account slow down, not only this request
+                limiter.pause(delay)
+            else:
+                time.sleep(delay)
+            attempt += 1
+
+        # reads the body, so the response can be shared between threads
+        response.content
+        return response
+
+    def _get(self, url, params) -> Tuple[requests.Response, Any]:
+        # Identical GETs in flight share one request. Responses with validators are cached and
+        # requested conditionally, a 304 returns the cached body. Every caller decodes the body
+        # itself, so callers never share a value.
+        key = (url, json.dumps(params, sort_keys=True, default=str))
+        cache = self._account.response_cache
+
+        def get():
+            entry = cache.get(key) if cache.max_bytes > 0 else None
+            headers = {}
+            if entry is not None:
+                etag, last_modified, body = entry
+                if etag is not None:
+                    headers['If-None-Match'] = etag
+                if last_modified is not None:
+                    headers['If-Modified-Since'] = last_modified
+            response = self._fetch('get', url, None, params, headers)
+            if response.status_code == 304 and entry is not None:
+                cache.hit()
+                return response, body
+            etag, last_modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
+            if response.status_code == 200 and cache.max_bytes > 0 and (etag or last_modified):
+                cache.set(key, etag, last_modified, response.content, len(response.content))
+                return response, None
+            if entry is not None:
+                cache.pop(key)
+            return response, None
+
+        return self._account.request_coalescing.do(key, get)
+
+    def _request(
+            self, endpoint, method='GET', data=None, params=None,
+            url_prefix=True) -> dict:
+        method = method.lower()
+        url = self._endpoint+endpoint if url_prefix else endpoint
+        body = None
+        if method == 'get':
+            response, body = self._get(url, params)
+        else:
+            response = self._fetch(method, url, data, params)
+
         response.raise_for_status()
 
         if response.status_code > 399:      # will this ever be triggered? raise_for_status takes care of this case, or not?
@@ -78,5 +181,5 @@ class _ApiClient:
                 status=response.status_code, errormessage=response.reason)
 
         if method != 'delete':
-            data = json.loads(response.content)
+            data = json.loads(response.content if body is None else body)
         return data
@@ -0,0 +1,321 @@
+# undocumented on rtd
+"""Thread-safe in-memory caches."""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """
+    A size-bounded cache whose entries expire after a time to live.
+
+    When the cache is full, the least recently used entry is evicted.
+    All methods are thread-safe.
+
+    Parameters
+    ----------
+    maxsize : int
+        The maximum number of entries
+    ttl : float
+        The default time to live of an entry in seconds
+
+    """
+
+    def __init__(self, maxsize: int, ttl: float):      # noqa
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the value of an unexpired entry, or default."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: float = None):
+        """Store a value, optionally with its own time to live."""
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove an entry and return its value, or default."""
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:       # noqa
+        with self._lock:
+            return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:       # noqa
+        return self.get(key, _MISSING) is not _MISSING
+
+
+_MISSING = object()
+
+
+class ResponseCache:
+    """
+    Response bodies with their validators (ETag, Last-Modified), bounded in bytes.
+
+    The size of an entry is the size of the response body. When the cache
+    is full, the least recently used entries are evicted. All methods are
+    thread-safe.
+
+    Parameters
+    ----------
+    max_bytes : int
+        The maximum total size of the cached responses
+
+    Attributes
+    ----------
+    hits : int
+        The number of responses served from the cache after a 304 (Not Modified)
+
+    """
+
+    def __init__(self, max_bytes: int):      # noqa
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self._size = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Tuple[Optional[str], Optional[str], Any]]:
+        """Return (etag, last_modified, value) of an entry, or None."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            self._data.move_to_end(key)
+            return entry[:3]
+
+    def set(self, key: Hashable, etag: Optional[str], last_modified: Optional[str], value: Any, size: int):
+        """Store a response body of `size` bytes with its validators."""
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._size -= old[3]
+            if size > self.max_bytes:
+                return
+            self._data[key] = (etag, last_modified, value, size)
+            self._size += size
+            while self._size > self.max_bytes:
+                self._size -= self._data.popitem(last=False)[1][3]
+
+    def pop(self, key: Hashable):
+        """Remove an entry."""
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._size -= old[3]
+
+    def hit(self):
+        """Count a response served from the cache."""
+        with self._lock:
+            self.hits += 1
+
+    @property
+    def size(self) -> int:
+        """The total size of the cached responses in bytes."""
+        return self._size
+
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._data.clear()
+            self._size = 0
+
+    def __len__(self) -> int:       # noqa
+        with self._lock:
+            return len(self._data)
+
+
+class _Flight:
+    # a load in progress, shared by all callers waiting for the same key
+    def __init__(self):     # noqa
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Runs a function only once for all concurrent callers with the same key.
+
+    Callers arriving while the function runs wait for it and receive the
+    same result, or the same exception. All methods are thread-safe.
+
+    Attributes
+    ----------
+    started : int
+        The number of times the function was run
+    joined : int
+        The number of callers which received the result of a run started by another caller
+
+    """
+
+    def __init__(self):     # noqa
+        self.started = 0
+        self.joined = 0
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, function: Callable[[], Any]) -> Any:
+        """Return the result of `function()`, shared with the concurrent callers with the same key."""
+        with self._lock:
+            flight = self._flights.get(key)
+            owner = flight is None
+            if owner:
+                flight = self._flights[key] = _Flight()
+                self.started += 1
+            else:
+                self.joined += 1
+        if owner:
+            try:
+                flight.value = function()
+            except BaseException as e:
+                flight.error = e
+            finally:
+                with self._lock:
+                    del self._flights[key]
+                flight.done.set()
+        else:
+            flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+
+class LoadingCache:
+    """
+    A cache which loads missing entries itself and refreshes expired ones in the background.
+
+    An entry older than its time to live is still returned right away,
+    while a new value is loaded in a separate thread (stale-while-revalidate).
+    Only missing entries block the caller. Concurrent callers of the same key
+    share one load. All methods are thread-safe.
+
+    Parameters
+    ----------
+    load : Callable[[Hashable], Any]
+        Called with a key to load its value
+    ttl : float
+        The default time to live of an entry in seconds. Can be changed at any time.
+
+    """
+
+    def __init__(self, load: Callable[[Hashable], Any], ttl: float):      # noqa
+        self.ttl = ttl
+        self._load = load
+        self._data: Dict[Hashable, Tuple[Any, float, Optional[float]]] = {}
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable = None) -> Any:
+        """
+        Return the value of an entry.
+
+        A missing entry is loaded first. An expired entry is returned as it
+        is and refreshed in the background.
+
+        Parameters
+        ----------
+        key : Hashable, optional
+            The key, by default None
+
+        Returns
+        -------
+        Any
+            The value
+
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, loaded, ttl = entry
+                if time.monotonic() - loaded > (self.ttl if ttl is None else ttl) and key not in self._flights:
+                    flight = self._flights[key] = _Flight()
+                    threading.Thread(target=self._run, args=(key, flight), daemon=True).start()
+                return value
+        return self.refresh(key)
+
+    def refresh(self, key: Hashable = None) -> Any:
+        """Load an entry now, sharing a load already in progress, and return its value."""
+        with self._lock:
+            flight = self._flights.get(key)
+            owner = flight is None
+            if owner:
+                flight = self._flights[key] = _Flight()
+        if owner:
+            self._run(key, flight)
+        else:
+            flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    def _run(self, key: Hashable, flight: _Flight):
+        try:
+            flight.value = self._load(key)
+        except Exception as e:
+            # an expired value is kept, the next get tries again
+            flight.error = e
+        else:
+            with self._lock:
+                # a reloaded entry keeps its own time to live
+                entry = self._data.get(key)
+                self._data[key] = (flight.value, time.monotonic(), None if entry is None else entry[2])
+        finally:
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            flight.done.set()
+
+    def set(self, key: Hashable, value: Any, ttl: float = None):
+        """Store a value, optionally with its own time to live."""
+        with self._lock:
+            self._data[key] = (value, time.monotonic(), ttl)
+
+    def peek(self, key: Hashable = None, default: Any = None) -> Any:
+        """Return the value of an entry, even if expired, or default without loading it."""
+        with self._lock:
+            entry = self._data.get(key)
+        return default if entry is None else entry[0]
+
+    def invalidate(self, key: Hashable = None):
+        """Mark an entry as expired, so the next get refreshes it in the background."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data[key] = (entry[0], float('-inf'), entry[2])
+
+    def pop(self, key: Hashable = None, default: Any = None) -> Any:
+        """Remove an entry and return its value, or default."""
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._data.clear()
@@ -0,0 +1,70 @@
+# undocumented on rtd
+"""Lightweight, thread-safe latency metrics."""
+
+import threading
+from collections import deque
+
+
+class LatencyHistogram:
+    """
+    Collects durations and reports count, mean and percentiles.
+
+    Percentiles are computed over the most recent `window` samples,
+    count and mean over all samples.
+
+    Parameters
+    ----------
+    window : int, optional
+        The number of recent samples kept for percentiles, by default 1024
+
+    """
+
+    def __init__(self, window: int = 1024):     # noqa
+        self._samples = deque(maxlen=window)
+        self._count = 0
+        self._total = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        """Add a duration in seconds."""
+        with self._lock:
+            self._samples.append(seconds)
+            self._count += 1
+            self._total += seconds
+
+    @property
+    def count(self) -> int:
+        """The number of recorded durations."""
+        return self._count
+
+    @property
+    def mean(self) -> float:
+        """The mean duration in seconds, 0 without samples."""
+        with self._lock:
+            return self._total / self._count if self._count else 0.0
+
+    def _sorted(self) -> list:
+        with self._lock:
+            return sorted(self._samples)
+
+    @staticmethod
+    def _percentile(samples: list, p: float) -> float:
+        if not samples:
+            return 0.0
+        return samples[min(len(samples) - 1, int(round(p / 100 * (len(samples) - 1))))]
+
+    def percentile(self, p: float) -> float:
+        """Return the percentile p, from 0 to 100, of the recent durations in seconds, 0 without samples."""
+        return self._percentile(self._sorted(), p)
+
+    def snapshot(self) -> dict:
+        """Return count, mean, p50, p90, p99 and max as a dict."""
+        samples = self._sorted()
+        return {
+            'count': self._count,
+            'mean': self.mean,
+            'p50': self._percentile(samples, 50),
+            'p90': self._percentile(samples, 90),
+            'p99': self._percentile(samples, 99),
+            'max': samples[-1] if samples else 0.0,
+        }
@@ -0,0 +1,139 @@
+# undocumented on rtd
+"""Helpers for walking paginated responses."""
+
+from collections.abc import Sequence
+from typing import Any, Callable, List, Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qs, urlencode
+
+
+def predict_page_urls(data: dict) -> Optional[List[str]]:
+    """
+    Predict the urls of all remaining pages from the first page.
+
+    This works for limit/offset pagination when the response contains the
+    total `count` and its `next` link carries `limit` and `offset`.
+
+    Parameters
+    ----------
+    data : dict
+        The decoded first page
+
+    Returns
+    -------
+    Optional[List[str]]
+        The urls of the remaining pages in order, or None if they can not be predicted
+
+    """
+    next_ = data.get('next')
+    count = data.get('count')
+    if next_ is None or not isinstance(count, int):
+        return None
+
+    parts = urlsplit(next_)
+    query = parse_qs(parts.query, keep_blank_values=True)
+    try:
+        limit = int(query['limit'][0])
+        offset = int(query['offset'][0])
+    except (KeyError, ValueError, IndexError):
+        return None
+    if limit <= 0:
+        return None
+
+    urls = []
+    for page_offset in range(offset, count, limit):
+        query['offset'] = [str(page_offset)]
+        urls.append(urlunsplit(parts._replace(query=urlencode(query, doseq=True))))
+    return urls
+
+
+class PagedList(Sequence):
+    """
+    A read-only list over a paginated endpoint that requests pages on demand.
+
+    The first page is requested when the list is first used. `len` is
+    answered from the total count of the first page, indexing requests only
+    the page containing the item. Requested pages are kept.
+
+    Parameters
+    ----------
+    client : _ApiClient
+        The client used for requests
+    endpoint : str
+        The endpoint of the paginated resource
+    params : dict, optional
+        The query parameters
+    convert : Callable[[dict], Any], optional
+        Converts each result, e.g. to a model object
+
+    """
+
+    def __init__(self, client, endpoint: str, params: dict = None, convert: Callable[[dict], Any] = None):      # noqa
+        self._client = client
+        self._endpoint = endpoint
+        self._params = params
+        self._convert = convert or (lambda data: data)
+        self._pages = None
+        self._count = None
+        self._page_size = None
+        self._urls = None
+        self._next = None
+
+    def _load_first(self):
+        if self._pages is not None:
+            return
+        data = self._client._request(self._endpoint, params=self._params)
+        self._urls = predict_page_urls(data)
+        self._page_size = len(data['results'])
+        self._next = data['next']
+        if self._urls is not None:
+            self._count = data['count']
+            self._pages = {0: [self._convert(result) for result in data['results']]}
+        else:
+            self._pages = [[self._convert(result) for result in data['results']]]
+            if self._next is None:
+                self._count = self._page_size
+
+    def _walk(self):
+        # request the next page when the urls can not be predicted
+        previous = self._next
+        data = self._client._request(previous, url_prefix=False)
+        self._pages.append([self._convert(result) for result in data['results']])
+        self._next = data['next'] if data['next'] != previous else None
+        if self._next is None:
+            self._count = sum(len(page) for page in self._pages)
+
+    def _item(self, index: int):
+        if self._urls is not None:
+            number, position = divmod(index, self._page_size)
+            page = self._pages.get(number)
+            if page is None:
+                data = self._client._request(self._urls[number - 1], url_prefix=False)
+                page = self._pages[number] = [self._convert(result) for result in data['results']]
+            return page[position]
+
+        for page in self._pages:
+            if index < len(page):
+                return page[index]
+            index -= len(page)
+        while self._next is not None:
+            self._walk()
+            if index < len(self._pages[-1]):
+                return self._pages[-1][index]
+            index -= len(self._pages[-1])
+        raise IndexError('list index out of range')
+
+    def __len__(self) -> int:       # noqa
+        self._load_first()
+        while self._count is None:
+            self._walk()
+        return self._count
+
+    def __getitem__(self, index):       # noqa
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        self._load_first()
+        if index < 0:
+            index += len(self)
+        if index < 0 or (self._count is not None and index >= self._count):
+            raise IndexError('list index out of range')
+        return self._item(index)
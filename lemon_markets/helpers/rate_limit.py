@@ -0,0 +1,114 @@
+# undocumented on rtd
+"""Client-side rate limiting and retry backoff."""
+
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Mapping, Optional
+
+
+class RateLimiter:
+    """
+    A thread-safe token bucket.
+
+    Every request takes one token. Tokens are refilled at `rate` per second
+    up to `burst`. A request without a token waits until its token is
+    refilled, so waiting requests are spaced evenly instead of all firing
+    at once.
+
+    Parameters
+    ----------
+    rate : float
+        The number of requests per second
+    burst : int
+        The number of requests which may be sent at once
+
+    """
+
+    def __init__(self, rate: float, burst: int):       # noqa
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> float:
+        now = time.monotonic()
+        self._tokens = min(float(self.burst), self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        return now
+
+    def reserve(self, tokens: int = 1) -> float:
+        """
+        Take tokens and return the number of seconds to wait before using them.
+
+        Tokens which are not refilled yet are borrowed, later callers wait for them too.
+        """
+        with self._lock:
+            self._refill()
+            self._tokens -= tokens
+            return max(0.0, -self._tokens / self.rate)
+
+    def acquire(self, tokens: int = 1) -> float:
+        """Take tokens, waiting until they are available, and return the time waited in seconds."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def pause(self, seconds: float):
+        """Let no request through for the next `seconds`, e.g. after a response with status 429."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+    @property
+    def available(self) -> int:
+        """The number of requests which can be sent right now without waiting."""
+        with self._lock:
+            self._refill()
+            return max(0, int(self._tokens))
+
+    def budget(self, seconds: float = 1.0) -> int:
+        """
+        Return the number of requests which can be sent within the next `seconds` without waiting.
+
+        Batch jobs can use it to send as many requests as possible without being throttled.
+        """
+        with self._lock:
+            self._refill()
+            return max(0, int(self._tokens + seconds * self.rate))
+
+
+def retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """Return the delay requested by a `Retry-After` header in seconds, or None."""
+    value = headers.get('Retry-After')
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return max(0.0, (date - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff(attempt: int, base: float, cap: float, requested: float = None) -> float:
+    """
+    Return the delay before retry number `attempt` (starting at 0) in seconds.
+
+    The delay is drawn uniformly up to an exponentially growing limit ("full jitter"),
+    so clients failing at the same time do not retry at the same time. A delay
+    requested by the server is never undercut.
+    """
+    delay = random.uniform(0, min(cap, base * 2 ** attempt))
+    if requested is not None:
+        delay = requested + delay / 4
+    return delay
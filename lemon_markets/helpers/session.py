@@ -0,0 +1,154 @@
+# undocumented on rtd
+"""Process-wide pooled HTTP session shared by all API clients."""
+
+import asyncio
+import threading
+import weakref
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import aiohttp
+except ImportError:     # optional, only needed by lemon_markets.aio
+    aiohttp = None
+
+DEFAULT_POOL_CONNECTIONS: int = 10
+DEFAULT_POOL_MAXSIZE: int = 32
+DEFAULT_ASYNC_LIMIT: int = 100
+DEFAULT_ASYNC_LIMIT_PER_HOST: int = 0
+
+_lock = threading.Lock()
+_session: requests.Session = None
+_pool_connections: int = DEFAULT_POOL_CONNECTIONS
+_pool_maxsize: int = DEFAULT_POOL_MAXSIZE
+
+# aiohttp sessions are bound to their event loop, so there is one per loop
+_async_sessions = weakref.WeakKeyDictionary()
+_async_limit: int = DEFAULT_ASYNC_LIMIT
+_async_limit_per_host: int = DEFAULT_ASYNC_LIMIT_PER_HOST
+
+
+def _new_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=_pool_connections, pool_maxsize=_pool_maxsize,
+        pool_block=False)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """
+    Return the shared session, creating it on first use.
+
+    The session keeps connections alive between requests, so only the
+    first request to a host pays for the TCP and TLS handshake.
+    The connection pool of the underlying adapter is thread-safe.
+
+    Returns
+    -------
+    requests.Session
+        The shared session
+
+    """
+    global _session
+    session = _session
+    if session is None:
+        with _lock:
+            if _session is None:
+                _session = _new_session()
+            session = _session
+    return session
+
+
+def configure_session(pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+                      pool_maxsize: int = DEFAULT_POOL_MAXSIZE):
+    """
+    Change the pool sizes of the shared session.
+
+    Open connections of the previous session are closed, the next request
+    creates a new session with the given sizes.
+
+    Parameters
+    ----------
+    pool_connections : int, optional
+        The number of hosts to keep a connection pool for
+    pool_maxsize : int, optional
+        The maximum number of connections kept alive per host.
+        Should be at least the number of threads sending requests.
+
+    """
+    global _session, _pool_connections, _pool_maxsize
+    with _lock:
+        _pool_connections = pool_connections
+        _pool_maxsize = pool_maxsize
+        old, _session = _session, None
+    if old is not None:
+        old.close()
+
+
+def close_session():
+    """Close all pooled connections of the shared session."""
+    global _session
+    with _lock:
+        old, _session = _session, None
+    if old is not None:
+        old.close()
+
+
+def get_async_session() -> 'aiohttp.ClientSession':
+    """
+    Return the shared aiohttp session of the running event loop.
+
+    All async clients of the loop share its connection pool.
+
+    Returns
+    -------
+    aiohttp.ClientSession
+        The shared session
+
+    Raises
+    ------
+    ImportError
+        Raised if aiohttp is not installed
+
+    """
+    if aiohttp is None:
+        raise ImportError(
+            "The async client requires aiohttp. Install it with `pip install lemon_markets[async]`.")
+    loop = asyncio.get_event_loop()
+    session = _async_sessions.get(loop)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=_async_limit, limit_per_host=_async_limit_per_host)
+        session = aiohttp.ClientSession(connector=connector)
+        _async_sessions[loop] = session
+    return session
+
+
+def configure_async_session(limit: int = DEFAULT_ASYNC_LIMIT,
+                            limit_per_host: int = DEFAULT_ASYNC_LIMIT_PER_HOST):
+    """
+    Change the connection limits of async sessions created from now on.
+
+    Parameters
+    ----------
+    limit : int, optional
+        The maximum number of simultaneous connections. Requests above the
+        limit wait for a free connection instead of opening a new one.
+    limit_per_host : int, optional
+        The maximum number of simultaneous connections per host, 0 for no limit
+
+    """
+    global _async_limit, _async_limit_per_host
+    _async_limit = limit
+    _async_limit_per_host = limit_per_host
+
+
+async def close_async_session():
+    """Close the shared session of the running event loop."""
+    session = _async_sessions.pop(asyncio.get_event_loop(), None)
+    if session is not None:
+        await session.close()
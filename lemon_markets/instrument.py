@@ -1,12 +1,15 @@
 """Module for working with instruments."""
 
+from lemon_markets.config import DEFAULT_LOOKUP_WORKERS
 from lemon_markets.helpers.api_client import _ApiClient
+from lemon_markets.helpers.paging import PagedList
 from lemon_markets.account import Account
 from lemon_markets.trading_venue import TradingVenue
 
 from enum import Enum
 from dataclasses import dataclass
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List
 
 
 class InstrumentType(Enum):
@@ -132,3 +135,120 @@ class Instruments(_ApiClient):
         assert not args, 'Please supply the arguments with a keyword i.e. `tradable=True` instead of a positional `True`.'
         result_pages = self._request_paged('instruments/', params=kwargs)
         return [Instrument._from_response(self._account, res) for res in result_pages]
+
+    def iter_instruments(self, *args, **kwargs) -> Iterator[Instrument]:
+        """
+        Iterate over all instruments with matching criteria, page by page.
+
+        Only the current page is kept in memory while the next one is requested,
+        so the first instruments are available before the whole list is loaded.
+        Takes the same arguments as `list_instruments`.
+
+        Yields
+        ------
+        Instrument
+            The instruments matching your query
+
+        """
+        assert not args, 'Please supply the arguments with a keyword i.e. `tradable=True` instead of a positional `True`.'
+        for res in self._iter_raw_instruments(max_workers=1, **kwargs):
+            yield Instrument._from_response(self._account, res)
+
+    def _iter_raw_instruments(self, max_workers: int = None, **kwargs) -> Iterator[dict]:
+        for page in self._iter_pages('instruments/', params=kwargs, max_workers=max_workers):
+            yield from page
+
+    def lazy_instruments(self, *args, **kwargs) -> PagedList:
+        """
+        List all instruments with matching criteria, requesting pages on demand.
+
+        Takes the same arguments as `list_instruments`.
+
+        Returns
+        -------
+        PagedList
+            A read-only list of instruments supporting `len` and indexing,
+            which only requests the pages you access
+
+        """
+        assert not args, 'Please supply the arguments with a keyword i.e. `tradable=True` instead of a positional `True`.'
+        return PagedList(self, 'instruments/', params=kwargs,
+                         convert=lambda res: Instrument._from_response(self._account, res))
+
+    def get_instrument(self, isin: str) -> Instrument:
+        """
+        Get a single instrument by isin.
+
+        Instruments are cached per account, so repeated lookups of the same
+        isin do not send a request until the cache entry expires.
+
+        Parameters
+        ----------
+        isin : str
+            The isin of the instrument
+
+        Returns
+        -------
+        Instrument
+            The instrument
+
+        Raises
+        ------
+        ValueError
+            Raised if there is no instrument with this isin
+
+        """
+        instrument = self._account._instrument_cache.get(isin)
+        if instrument is None:
+            instrument = self._search_isin(isin)
+        return instrument
+
+    def get_instruments(self, isins: Iterable[str], max_workers: int = DEFAULT_LOOKUP_WORKERS) -> Dict[str, Instrument]:
+        """
+        Get several instruments by isin.
+
+        Duplicate isins are looked up once and isins missing in the cache are
+        requested concurrently.
+
+        Parameters
+        ----------
+        isins : Iterable[str]
+            The isins of the instruments
+        max_workers : int, optional
+            The maximum number of concurrent requests
+
+        Returns
+        -------
+        Dict[str, Instrument]
+            The instruments by isin
+
+        Raises
+        ------
+        ValueError
+            Raised if there is no instrument with one of the isins
+
+        """
+        cache = self._account._instrument_cache
+        instruments = {}
+        missing = []
+        for isin in dict.fromkeys(isins):
+            instrument = cache.get(isin)
+            if instrument is None:
+                missing.append(isin)
+            else:
+                instruments[isin] = instrument
+
+        if len(missing) == 1:
+            instruments[missing[0]] = self._search_isin(missing[0])
+        elif missing:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(missing))) as pool:
+                instruments.update(zip(missing, pool.map(self._search_isin, missing)))
+        return instruments
+
+    def _search_isin(self, isin: str) -> Instrument:
+        found = self.list_instruments(search=isin)
+        instrument = next((i for i in found if i.isin == isin), None)
+        if instrument is None:
+            raise ValueError('No instrument found with isin: %r' % isin)
+        self._account._instrument_cache.set(isin, instrument)
+        return instrument
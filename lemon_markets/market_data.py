@@ -1,17 +1,82 @@
 """Module for accessing market data."""
 
-from dataclasses import dataclass
-from datetime import datetime, timezone
-from pandas import DataFrame as DataFrame, to_datetime
-from typing import Union
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+import numpy as np
+from pandas import DataFrame as DataFrame, concat, to_datetime
+from typing import Dict, Iterable, List, Tuple, Union
 
 from lemon_markets.helpers.api_client import _ApiClient
 from lemon_markets.account import Account
-from lemon_markets.helpers.time_helper import datetime_to_timestamp_seconds
+from lemon_markets.config import DEFAULT_BATCH_WORKERS, DEFAULT_HISTORY_WORKERS
+from lemon_markets.helpers.time_helper import datetime_to_timestamp_seconds, current_time
 from lemon_markets.instrument import Instrument
 from lemon_markets.trading_venue import TradingVenue
 
 
+_PRICE_FIELDS = ('o', 'h', 'l', 'c')
+
+# time span requested at once by OHLC.get_history, per granularity
+_HISTORY_WINDOWS = {
+    'M1': timedelta(days=1),
+    'H1': timedelta(days=30),
+    'D1': timedelta(days=365),
+}
+
+
+@dataclass()
+class OHLCBatch:
+    """
+    The result of `OHLC.get_data_many`.
+
+    Attributes
+    ----------
+    frames : Dict[str, pandas.DataFrame]
+        The data per isin, instruments without data are left out
+    errors : Dict[str, Exception]
+        The exception raised per isin, for instruments whose request failed
+
+    """
+
+    frames: Dict[str, DataFrame] = field(default_factory=dict)
+    errors: Dict[str, Exception] = field(default_factory=dict)
+
+    def panel(self) -> Union[DataFrame, None]:
+        """
+        Combine all frames into one dataframe.
+
+        Returns
+        -------
+        Union[pandas.DataFrame, None]
+            A dataframe indexed by (`instrument`, `t`), or None if there is no data
+
+        """
+        if not self.frames:
+            return None
+        return concat(self.frames, names=['instrument'])
+
+    def aligned(self) -> Dict[str, DataFrame]:
+        """
+        Return the frames reindexed to the same timestamps.
+
+        Returns
+        -------
+        Dict[str, pandas.DataFrame]
+            The data per isin. Bars missing for an instrument are NaN.
+
+        """
+        if not self.frames:
+            return {}
+        frames = list(self.frames.values())
+        index = frames[0].index
+        for frame in frames[1:]:
+            index = index.union(frame.index)
+        if index.equals(frames[0].index) and all(index.equals(frame.index) for frame in frames):
+            return dict(self.frames)
+        return {isin: frame.reindex(index) for isin, frame in self.frames.items()}
+
+
 @dataclass()
 class OHLC(_ApiClient):
     """
@@ -30,7 +95,7 @@ class OHLC(_ApiClient):
     def get_data(
             self, instrument: Instrument, venue: TradingVenue, x1: str,
             ordering: str = None, date_from: datetime = None,
-            date_until: datetime = None, as_df: bool = True) -> Union[dict, DataFrame, None]:
+            date_until: datetime = None, as_df: bool = True, dtype: str = 'float64') -> Union[dict, DataFrame, None]:
         """
         Get OHLC data on the specified instrument.
 
@@ -50,6 +115,8 @@ class OHLC(_ApiClient):
             Limit the data to before this point in time
         as_df : bool, optional
             Return the data as a pandas dataframe, by default True
+        dtype : str, optional
+            The type of the price columns of the dataframe, `float64` (default) or `float32`
 
         Returns
         -------
@@ -58,15 +125,8 @@ class OHLC(_ApiClient):
             If the response is empty (no data available) None is returned.
 
         """
-        endpoint = f"trading-venues/{venue.mic}/instruments/{instrument.isin}/data/ohlc/{x1}/"
-        params = {}
-        if ordering is not None:
-            params['ordering'] = ordering
-        if date_from is not None:
-            params['date_from'] = int(datetime_to_timestamp_seconds(date_from))
-        if date_until is not None:
-            params['date_until'] = int(datetime_to_timestamp_seconds(date_until))
-        results = self._request(endpoint=endpoint, params=params)['results']       # TODO make it _request_paged
+        endpoint, params = _ohlc_request(instrument, venue, x1, ordering, date_from, date_until)
+        results = self._request_paged(endpoint=endpoint, params=params)
 
         if len(results) == 0:
             return None
@@ -74,14 +134,179 @@ class OHLC(_ApiClient):
         if not as_df:
             return results
         else:
-            from_tz = timezone.utc
-            to_tz = datetime.now().astimezone().tzinfo
-            df = DataFrame(results)
-            df['t'] = to_datetime(df['t'], unit='s').dt.tz_localize(from_tz).dt.tz_convert(to_tz)
-            df.set_index('t', inplace=True)
-            if ordering == '-date':
-                df.sort_index(ascending=False, inplace=True)
-            else:
-                df.sort_index(ascending=True, inplace=True)
-
-            return df
+            return _results_to_df(results, ordering, dtype)
+
+    def get_data_many(
+            self, instruments: Iterable[Instrument], venue: TradingVenue, x1: str,
+            ordering: str = None, date_from: datetime = None, date_until: datetime = None,
+            max_workers: int = DEFAULT_BATCH_WORKERS, dtype: str = 'float64') -> OHLCBatch:
+        """
+        Get OHLC data on several instruments at once.
+
+        The series are requested concurrently. A failed request does not
+        abort the batch, its exception is reported in `OHLCBatch.errors`.
+
+        Parameters
+        ----------
+        instruments : Iterable[Instrument]
+            The instruments to get data on
+        venue : TradingVenue
+            The trading venue
+        x1 : str
+            The granularity of the data. Either `M1`, `H1` or `D1`
+        ordering : str, optional
+            By default, the data is not ordered. Choose between "date" (oldest to newest) or "-date" (newest to oldest).
+        date_from : datetime, optional
+            Limit the data to after this point in time
+        date_until : datetime, optional
+            Limit the data to before this point in time
+        max_workers : int, optional
+            The maximum number of series requested concurrently
+        dtype : str, optional
+            The type of the price columns of the dataframes, `float64` (default) or `float32`
+
+        Returns
+        -------
+        OHLCBatch
+            The dataframes and errors per isin. Use `OHLCBatch.panel` for a
+            single dataframe indexed by (`instrument`, `t`).
+
+        """
+        instruments = list({instrument.isin: instrument for instrument in instruments}.values())
+        batch = OHLCBatch()
+        if not instruments:
+            return batch
+
+        def fetch(instrument):
+            return self.get_data(instrument, venue, x1, ordering=ordering, date_from=date_from,
+                                 date_until=date_until, dtype=dtype)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(instruments)))) as pool:
+            futures = [(instrument.isin, pool.submit(fetch, instrument)) for instrument in instruments]
+            for isin, future in futures:
+                try:
+                    df = future.result()
+                except Exception as e:
+                    batch.errors[isin] = e
+                    continue
+                if df is not None:
+                    batch.frames[isin] = df
+        return batch
+
+    def get_history(
+            self, instrument: Instrument, venue: TradingVenue, x1: str,
+            date_from: datetime, date_until: datetime = None, ordering: str = None,
+            as_df: bool = True, max_workers: int = DEFAULT_HISTORY_WORKERS,
+            dtype: str = 'float64') -> Union[List[dict], DataFrame, None]:
+        """
+        Get OHLC data over a long period of time.
+
+        The period is split into windows which are requested concurrently,
+        so long ranges of minute data are neither truncated nor loaded one
+        page after another. Overlapping bars are removed.
+
+        Parameters
+        ----------
+        instrument : Instrument
+            The instrument to get data on
+        venue : TradingVenue
+            The trading venue
+        x1 : str
+            The granularity of the data. Either `M1`, `H1` or `D1`
+        date_from : datetime
+            The start of the period, in local time if naive
+        date_until : datetime, optional
+            The end of the period, by default now, in local time if naive
+        ordering : str, optional
+            "date" (oldest to newest, the default) or "-date" (newest to oldest)
+        as_df : bool, optional
+            Return the data as a pandas dataframe, by default True
+        max_workers : int, optional
+            The maximum number of windows requested concurrently
+        dtype : str, optional
+            The type of the price columns of the dataframe, `float64` (default) or `float32`
+
+        Returns
+        -------
+        Union[List[dict], pandas.DataFrame, None]
+            Either the raw bars (as list of dicts) or a pandas dataframe.
+            If there is no data, None is returned.
+
+        """
+        # naive datetimes are local times, as in get_data
+        date_from = date_from.astimezone()
+        date_until = (date_until or current_time()).astimezone()
+        windows = _split_period(date_from, date_until, _HISTORY_WINDOWS.get(x1, _HISTORY_WINDOWS['D1']))
+
+        def fetch(window):
+            endpoint, params = _ohlc_request(instrument, venue, x1, 'date', *window)
+            return self._request_paged(endpoint=endpoint, params=params, max_workers=1)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(windows)))) as pool:
+            pages = list(pool.map(fetch, windows))
+
+        # bars at window borders are returned twice, keep one per timestamp
+        bars = {}
+        for page in pages:
+            for bar in page:
+                bars[bar['t']] = bar
+        if not bars:
+            return None
+        results = sorted(bars.values(), key=lambda bar: bar['t'], reverse=(ordering == '-date'))
+
+        if not as_df:
+            return results
+        else:
+            return _results_to_df(results, ordering, dtype)
+
+
+def _split_period(date_from: datetime, date_until: datetime, window: timedelta) -> List[Tuple[datetime, datetime]]:
+    windows = []
+    start = date_from
+    while start < date_until:
+        end = min(start + window, date_until)
+        windows.append((start, end))
+        start = end
+    return windows
+
+
+def _ohlc_request(instrument, venue, x1, ordering, date_from, date_until):
+    endpoint = f"trading-venues/{venue.mic}/instruments/{instrument.isin}/data/ohlc/{x1}/"
+    params = {}
+    if ordering is not None:
+        params['ordering'] = ordering
+    if date_from is not None:
+        params['date_from'] = int(datetime_to_timestamp_seconds(date_from))
+    if date_until is not None:
+        params['date_until'] = int(datetime_to_timestamp_seconds(date_until))
+    return endpoint, params
+
+
+def _results_to_df(results: list, ordering: str = None, dtype: str = 'float64') -> DataFrame:
+    # Builds typed columns straight from the bars instead of going through
+    # DataFrame(results), and only sorts if the bars are not ordered yet.
+    n = len(results)
+    t = np.fromiter((bar['t'] for bar in results), dtype=np.int64, count=n)
+    descending = ordering == '-date'
+    steps = np.diff(t)
+    order = None
+    if (steps > 0).any() if descending else (steps < 0).any():
+        order = np.argsort(t, kind='stable')
+        if descending:
+            order = order[::-1]
+        t = t[order]
+
+    columns = {}
+    for name in results[0]:
+        if name == 't':
+            continue
+        if name in _PRICE_FIELDS:
+            column = np.fromiter((bar[name] for bar in results), dtype=dtype, count=n)
+            columns[name] = column if order is None else column[order]
+        else:
+            column = [bar.get(name) for bar in results]
+            columns[name] = column if order is None else [column[i] for i in order]
+
+    to_tz = datetime.now().astimezone().tzinfo
+    index = to_datetime(t, unit='s', utc=True).tz_convert(to_tz).rename('t')
+    return DataFrame(columns, index=index)
@@ -0,0 +1,330 @@
+"""Module for storing OHLC data locally."""
+
+import glob
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+from pandas import DataFrame, to_datetime
+
+from lemon_markets.config import DEFAULT_OHLC_STORE_MAX_BYTES
+from lemon_markets.helpers.time_helper import current_time, datetime_to_timestamp_seconds
+from lemon_markets.instrument import Instrument
+from lemon_markets.market_data import OHLC
+from lemon_markets.trading_venue import TradingVenue
+
+BAR_DTYPE = np.dtype([('t', '<i8'), ('o', '<f8'), ('h', '<f8'), ('l', '<f8'), ('c', '<f8')])
+
+_SECONDS = {'M1': 60, 'H1': 60 * 60, 'D1': 24 * 60 * 60}
+
+
+def _bars_to_array(bars: List[dict]) -> np.ndarray:
+    array = np.empty(len(bars), dtype=BAR_DTYPE)
+    for field in BAR_DTYPE.names:
+        array[field] = np.fromiter((bar[field] for bar in bars), dtype=BAR_DTYPE[field], count=len(bars))
+    return np.sort(array, order='t')
+
+
+def _array_to_df(array: np.ndarray) -> DataFrame:
+    to_tz = datetime.now().astimezone().tzinfo
+    index = to_datetime(array['t'], unit='s', utc=True).tz_convert(to_tz).rename('t')
+    return DataFrame({field: array[field] for field in BAR_DTYPE.names[1:]}, index=index)
+
+
+def _deduplicate(array: np.ndarray) -> np.ndarray:
+    # sorts by time, for equal times the bar stored last wins
+    array = array[np.argsort(array['t'], kind='stable')]
+    keep = np.ones(len(array), dtype=bool)
+    keep[:-1] = array['t'][:-1] != array['t'][1:]
+    return array[keep]
+
+
+def _merge(ranges: List[List[int]]) -> List[List[int]]:
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def _gaps(covered: List[List[int]], start: int, end: int) -> List[Tuple[int, int]]:
+    gaps = []
+    for covered_start, covered_end in covered:
+        if covered_end < start:
+            continue
+        if covered_start > end:
+            break
+        if covered_start > start:
+            gaps.append((start, covered_start - 1))
+        start = max(start, covered_end + 1)
+    if start <= end:
+        gaps.append((start, end))
+    return gaps
+
+
+def _to_datetime(seconds: int) -> datetime:
+    return datetime.fromtimestamp(seconds, tz=timezone.utc)
+
+
+class OHLCStore:
+    """
+    A persistent store of OHLC bars per trading venue, instrument and granularity.
+
+    Bars are kept in memory-mapped NumPy files. The store remembers which
+    periods it already covers, so a query only requests the missing parts
+    and repeated queries are answered from disk. Every download is written
+    as a new segment; `compact` merges the segments of a series. When a
+    download makes the store grow beyond `max_bytes`, the least recently
+    used series are removed. The size and last access of every series are
+    kept in memory, so reading stored bars only touches the files of the
+    series read. Access times of reads without download are not written to
+    disk, after a restart the series are ordered by their last download.
+
+    Parameters
+    ----------
+    ohlc : OHLC
+        The client used to request missing data
+    directory : str
+        The directory of the store. It is created if it does not exist.
+    max_bytes : int, optional
+        The maximum size of the store on disk, by default 1 GiB
+
+    """
+
+    def __init__(self, ohlc: OHLC, directory: str, max_bytes: int = DEFAULT_OHLC_STORE_MAX_BYTES):       # noqa
+        self._ohlc = ohlc
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._series_locks: Dict[str, threading.Lock] = {}
+        # size in bytes and last access per series, loaded from disk on first use
+        self._index: Dict[str, List[float]] = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _load_index(self) -> Dict[str, List[float]]:
+        # only called while holding self._lock
+        if self._index is None:
+            index = {}
+            for key in self._keys():
+                meta = self._load_meta(key)
+                index[key] = [self._series_size(key, meta), meta['last_access']]
+            self._index = index
+        return self._index
+
+    def _touch(self, key: str, size: int = None, last_access: float = None):
+        # updates the size and last access of a series in the index
+        with self._lock:
+            entry = self._load_index().setdefault(key, [0, 0])
+            if size is not None:
+                entry[0] = size
+            if last_access is not None:
+                entry[1] = last_access
+
+    def _series_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._series_locks.setdefault(key, threading.Lock())
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.directory, '%s.%s' % (key, suffix))
+
+    def _load_meta(self, key: str) -> dict:
+        try:
+            with open(self._path(key, 'json')) as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {'covered': [], 'segments': [], 'last_access': 0}
+
+    def _save_meta(self, key: str, meta: dict):
+        path = self._path(key, 'json')
+        with open(path + '.tmp', 'w') as file:
+            json.dump(meta, file)
+        os.replace(path + '.tmp', path)
+
+    def _write_segment(self, key: str, meta: dict, array: np.ndarray):
+        segment = max(meta['segments'], default=-1) + 1
+        path = self._path(key, '%d.npy' % segment)
+        with open(path + '.tmp', 'wb') as file:
+            np.save(file, array)
+        os.replace(path + '.tmp', path)
+        meta['segments'].append(segment)
+
+    def _read(self, key: str, meta: dict, start: int = None, end: int = None) -> np.ndarray:
+        parts = []
+        for segment in meta['segments']:
+            array = np.load(self._path(key, '%d.npy' % segment), mmap_mode='r')
+            i = 0 if start is None else np.searchsorted(array['t'], start, side='left')
+            j = len(array) if end is None else np.searchsorted(array['t'], end, side='right')
+            if j > i:
+                parts.append(np.array(array[i:j]))
+        if not parts:
+            return np.empty(0, dtype=BAR_DTYPE)
+        return _deduplicate(np.concatenate(parts)) if len(parts) > 1 else parts[0]
+
+    @staticmethod
+    def _key(instrument: Instrument, venue: TradingVenue, x1: str) -> str:
+        return '%s_%s_%s' % (venue.mic, instrument.isin, x1)
+
+    def missing(self, instrument: Instrument, venue: TradingVenue, x1: str,
+                date_from: datetime, date_until: datetime = None) -> List[Tuple[datetime, datetime]]:
+        """
+        Return the parts of a period which are not stored yet.
+
+        Parameters
+        ----------
+        instrument : Instrument
+            The instrument
+        venue : TradingVenue
+            The trading venue
+        x1 : str
+            The granularity of the data. Either `M1`, `H1` or `D1`
+        date_from : datetime
+            The start of the period
+        date_until : datetime, optional
+            The end of the period, by default now
+
+        Returns
+        -------
+        List[Tuple[datetime, datetime]]
+            The missing periods
+
+        """
+        start, end = self._period(x1, date_from, date_until)
+        meta = self._load_meta(self._key(instrument, venue, x1))
+        return [(_to_datetime(s), _to_datetime(e)) for s, e in _gaps(meta['covered'], start, end)]
+
+    @staticmethod
+    def _period(x1: str, date_from: datetime, date_until: datetime = None) -> Tuple[int, int]:
+        # the current bar is still changing, so it is never marked as stored
+        latest = datetime_to_timestamp_seconds(current_time()) - _SECONDS.get(x1, 60)
+        end = latest if date_until is None else min(datetime_to_timestamp_seconds(date_until), latest)
+        return datetime_to_timestamp_seconds(date_from), end
+
+    def get_data(self, instrument: Instrument, venue: TradingVenue, x1: str,
+                 date_from: datetime, date_until: datetime = None, as_df: bool = True) -> Union[np.ndarray, DataFrame, None]:
+        """
+        Get OHLC data, requesting only the parts of the period which are not stored yet.
+
+        Parameters
+        ----------
+        instrument : Instrument
+            The instrument to get data on
+        venue : TradingVenue
+            The trading venue
+        x1 : str
+            The granularity of the data. Either `M1`, `H1` or `D1`
+        date_from : datetime
+            The start of the period
+        date_until : datetime, optional
+            The end of the period, by default now
+        as_df : bool, optional
+            Return the data as a pandas dataframe, by default True
+
+        Returns
+        -------
+        Union[numpy.ndarray, pandas.DataFrame, None]
+            The bars ordered from oldest to newest, either as structured array
+            with the fields `t`, `o`, `h`, `l` and `c` or as pandas dataframe.
+            If there is no data, None is returned.
+
+        """
+        key = self._key(instrument, venue, x1)
+        start, end = self._period(x1, date_from, date_until)
+        grown = False
+        with self._series_lock(key):
+            meta = self._load_meta(key)
+            gaps = _gaps(meta['covered'], start, end)
+            for gap_start, gap_end in gaps:
+                bars = self._ohlc.get_history(
+                    instrument, venue, x1, date_from=_to_datetime(gap_start),
+                    date_until=_to_datetime(gap_end), as_df=False)
+                if bars:
+                    self._write_segment(key, meta, _bars_to_array(bars))
+                    grown = True
+                meta['covered'] = _merge(meta['covered'] + [[gap_start, gap_end]])
+            now = time.time()
+            if gaps:
+                meta['last_access'] = now
+                self._save_meta(key, meta)
+            self._touch(key, self._series_size(key, meta) if grown else None, now)
+            array = self._read(key, meta, start, datetime_to_timestamp_seconds(date_until or current_time()))
+        if grown and self.size > self.max_bytes:
+            self.evict(keep=key)
+
+        if len(array) == 0:
+            return None
+        if not as_df:
+            return array
+        return _array_to_df(array)
+
+    def compact(self):
+        """Merge the segments of every series into one file."""
+        for key in self._keys():
+            with self._series_lock(key):
+                meta = self._load_meta(key)
+                if len(meta['segments']) < 2:
+                    continue
+                array = self._read(key, meta)
+                old_segments = meta['segments']
+                meta['segments'] = [max(old_segments) + 1]
+                path = self._path(key, '%d.npy' % meta['segments'][0])
+                with open(path + '.tmp', 'wb') as file:
+                    np.save(file, array)
+                os.replace(path + '.tmp', path)
+                self._save_meta(key, meta)
+                for segment in old_segments:
+                    os.remove(self._path(key, '%d.npy' % segment))
+                self._touch(key, self._series_size(key, meta))
+
+    def _keys(self) -> List[str]:
+        return [os.path.basename(path)[:-len('.json')] for path in glob.glob(os.path.join(self.directory, '*.json'))]
+
+    def _series_size(self, key: str, meta: dict) -> int:
+        return sum(os.path.getsize(self._path(key, '%d.npy' % segment)) for segment in meta['segments'])
+
+    @property
+    def size(self) -> int:
+        """The size of all stored bars in bytes."""
+        with self._lock:
+            return int(sum(size for size, _ in self._load_index().values()))
+
+    def evict(self, keep: str = None):
+        """
+        Remove the least recently used series until the store fits into `max_bytes`.
+
+        Parameters
+        ----------
+        keep : str, optional
+            The key of a series which is never removed
+
+        """
+        with self._lock:
+            index = self._load_index()
+            candidates = sorted((entry[1], key) for key, entry in index.items() if key != keep)
+        for last_access, key in candidates:
+            if self.size <= self.max_bytes:
+                break
+            with self._series_lock(key):
+                with self._lock:
+                    entry = self._index.get(key)
+                if entry is None or entry[1] > last_access:
+                    # removed or used since the index was read
+                    continue
+                # the series may have been written since the index was read
+                meta = self._load_meta(key)
+                for segment in meta['segments']:
+                    try:
+                        os.remove(self._path(key, '%d.npy' % segment))
+                    except FileNotFoundError:
+                        pass
+                try:
+                    os.remove(self._path(key, 'json'))
+                except FileNotFoundError:
+                    pass
+                with self._lock:
+                    self._index.pop(key, None)
@@ -1,11 +1,18 @@
 """Module for placing, listing and deleting orders."""
 
+import threading
+import time
+from collections.abc import Mapping
+from concurrent.futures import Future, ThreadPoolExecutor
 from enum import Enum
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Union, Tuple
+from typing import Dict, Iterable, Iterator, List, Mapping as MappingType, Set, Union, Tuple
 
+from lemon_markets.config import DEFAULT_ORDER_WORKERS
+from lemon_markets.exceptions import LemonBatchException
 from lemon_markets.helpers.api_client import _ApiClient
+from lemon_markets.helpers.metrics import LatencyHistogram
 from lemon_markets.account import Account
 from lemon_markets.instrument import Instrument, Instruments, InstrumentType
 from lemon_markets.space import Space
@@ -41,6 +48,21 @@ class OrderStatus(Enum):
     EXPIRED = 'expired'
 
 
+OPEN_STATUSES = (OrderStatus.INACTIVE, OrderStatus.ACTIVATED, OrderStatus.IN_PROGRESS)
+TERMINAL_STATUSES = (OrderStatus.EXECUTED, OrderStatus.DELETED, OrderStatus.EXPIRED)
+
+# the number of placed orders whose first status change is awaited for the latency histogram
+_MAX_AWAITED_STATUS_CHANGES = 10000
+
+# up to this many orders which left the open statuses are requested one by one,
+# more are looked up in the pages of the terminal statuses
+_SINGLE_LOOKUPS = 3
+
+
+def _datetime(ts: Union[int, float, None]) -> Union[datetime, None]:
+    return None if ts is None else timestamp_seconds_to_datetime(ts)
+
+
 @dataclass()
 class Order:
     """
@@ -111,6 +133,10 @@ class Order:
             instrument=instrument,
             quantity=data.get('quantity'),
             valid_until=timestamp_seconds_to_datetime(data.get('valid_until')),
+            created_at=_datetime(data.get('created_at')),
+            processed_at=_datetime(data.get('processed_at')),
+            processed_quantity=data.get('processed_quantity'),
+            average_price=data.get('average_price'),
             side=data.get('side'),
             stop_price=data.get('stop_price'),
             limit_price=data.get('limit_price'),
@@ -141,12 +167,320 @@ class Order:
                              data.get('type'))
         self.status = status_
         self.average_price = data.get('average_price')
-        self.created_at = data.get('created_at')
+        self.created_at = _datetime(data.get('created_at'))
         self.type = InstrumentType(data.get('type'))
-        self.processed_at = data.get('processed_at')
+        self.processed_at = _datetime(data.get('processed_at'))
         self.processed_quantity = data.get('processed_quantity')
 
 
+def _order_data(instrument, valid_until, side, quantity, stop_price, limit_price) -> dict:
+    data = {
+        "isin": instrument.isin,
+        "valid_until": datetime_to_timestamp_seconds(valid_until),
+        "side": side, "quantity": quantity}
+    if stop_price is not None:
+        data['stop_price'] = stop_price
+    if limit_price is not None:
+        data['limit_price'] = limit_price
+    return data
+
+
+def _fetch_params(created_at_until, created_at_from, side, type, status) -> dict:
+    params = {}
+    if created_at_until is not None:
+        params['created_at_until'] = datetime_to_timestamp_seconds(
+            created_at_until)
+    if created_at_from is not None:
+        params['created_at_from'] = datetime_to_timestamp_seconds(created_at_from)
+    if side is not None:
+        params['side'] = side
+    if type is not None:
+        params['type'] = type
+    if status is not None:
+        params['status'] = status
+    return params
+
+
+def _isin(order: Order) -> Union[str, None]:
+    return None if order.instrument is None else order.instrument.isin
+
+
+class _StatusOrders(Mapping):
+    # read-only {uuid: Order} view of the orders with one status
+    def __init__(self, book: 'OrderBook', status: OrderStatus):     # noqa
+        self._book = book
+        self._status = status
+
+    def __getitem__(self, uuid: str) -> Order:
+        order = self._book.get(uuid)
+        if order is None or order.status != self._status:
+            raise KeyError(uuid)
+        return order
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._book.uuids(self._status))
+
+    def __len__(self) -> int:
+        return self._book.count(self._status)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+class _OrdersByStatus(Mapping):
+    # read-only {status name: {uuid: Order}} view, the former structure of Orders.orders
+    def __init__(self, book: 'OrderBook'):      # noqa
+        self._views = {status.name: _StatusOrders(book, status) for status in OrderStatus}
+
+    def __getitem__(self, name: str) -> _StatusOrders:
+        return self._views[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._views)
+
+    def __len__(self) -> int:
+        return len(self._views)
+
+    def __repr__(self) -> str:
+        return repr(dict(self.items()))
+
+
+class OrderBook:
+    """
+    The known orders, indexed by uuid, status, ISIN and side.
+
+    Adding, updating and removing an order and looking up orders by any of
+    the indexes take constant time, independent of the number of orders.
+    Every `Orders` object has its own order book.
+    """
+
+    def __init__(self):     # noqa
+        self._orders: Dict[str, Order] = {}
+        # the index keys of every order, to find them again after the order changed
+        self._keys: Dict[str, Tuple[OrderStatus, str, str]] = {}
+        self._by_status: Dict[OrderStatus, Set[str]] = {status: set() for status in OrderStatus}
+        self._by_isin: Dict[str, Set[str]] = {}
+        self._by_side: Dict[str, Set[str]] = {}
+        self._lock = threading.RLock()
+
+    def _unindex(self, uuid: str, keys: Tuple[OrderStatus, str, str]):
+        status, isin, side = keys
+        if status is not None:
+            self._by_status[status].discard(uuid)
+        for index, key in ((self._by_isin, isin), (self._by_side, side)):
+            uuids = index.get(key)
+            if uuids is not None:
+                uuids.discard(uuid)
+                if not uuids:
+                    del index[key]
+
+    def _add(self, order: Order):
+        uuid = order.uuid
+        status = order.status
+        keys = (status, _isin(order), order.side)
+        self._orders[uuid] = order
+        old_keys = self._keys.get(uuid)
+        if old_keys == keys:
+            return
+        if old_keys is not None:
+            self._unindex(uuid, old_keys)
+        self._keys[uuid] = keys
+        if status is not None:
+            self._by_status[status].add(uuid)
+        for index, key in ((self._by_isin, keys[1]), (self._by_side, keys[2])):
+            uuids = index.get(key)
+            if uuids is None:
+                index[key] = {uuid}
+            else:
+                uuids.add(uuid)
+
+    def add(self, order: Order) -> Order:
+        """
+        Add an order, or replace the order with the same uuid.
+
+        Also call it after changing an order which is already in the book,
+        to update the indexes.
+        """
+        with self._lock:
+            self._add(order)
+        return order
+
+    def add_many(self, orders: Iterable[Order]) -> List[Order]:
+        """Add several orders like `add` and return them as list."""
+        orders = list(orders)
+        with self._lock:
+            for order in orders:
+                self._add(order)
+        return orders
+
+    def update(self, order: Order, data: dict) -> Union[OrderStatus, None]:
+        """
+        Update an order from a request's data and add it to the book.
+
+        Returns
+        -------
+        Union[OrderStatus, None]
+            The status of the order before the update
+
+        """
+        with self._lock:
+            old_status = order.status
+            order.update_data(data)
+            self.add(order)
+        return old_status
+
+    def remove(self, uuid: str) -> Union[Order, None]:
+        """Remove an order by uuid and return it, or None if it is unknown."""
+        with self._lock:
+            keys = self._keys.pop(uuid, None)
+            if keys is not None:
+                self._unindex(uuid, keys)
+            return self._orders.pop(uuid, None)
+
+    def remove_status(self, *statuses: OrderStatus) -> List[Order]:
+        """Remove all orders with the given statuses and return them."""
+        with self._lock:
+            return [self.remove(uuid) for uuid in self.uuids(*statuses)]
+
+    def get(self, uuid: str) -> Union[Order, None]:
+        """Return an order by uuid, or None if it is unknown."""
+        return self._orders.get(uuid)
+
+    def uuids(self, *statuses: OrderStatus) -> Set[str]:
+        """Return the uuids of the orders with any of the given statuses."""
+        with self._lock:
+            return set().union(*(self._by_status[status] for status in statuses))
+
+    def count(self, status: OrderStatus) -> int:
+        """Return the number of orders with the given status."""
+        return len(self._by_status[status])
+
+    def _select(self, uuids: Iterable[str]) -> List[Order]:
+        return [self._orders[uuid] for uuid in uuids]
+
+    def with_status(self, *statuses: OrderStatus) -> List[Order]:
+        """Return the orders with any of the given statuses."""
+        with self._lock:
+            return self._select(self.uuids(*statuses))
+
+    def with_isin(self, isin: str) -> List[Order]:
+        """Return the orders of the instrument with the given ISIN."""
+        with self._lock:
+            return self._select(self._by_isin.get(isin, ()))
+
+    def with_side(self, side: str) -> List[Order]:
+        """Return the orders of the given side, `buy` or `sell`."""
+        with self._lock:
+            return self._select(self._by_side.get(side, ()))
+
+    def clear(self):
+        """Remove all orders."""
+        with self._lock:
+            self._orders.clear()
+            self._keys.clear()
+            for uuids in self._by_status.values():
+                uuids.clear()
+            self._by_isin.clear()
+            self._by_side.clear()
+
+    def __contains__(self, uuid: str) -> bool:       # noqa
+        return uuid in self._orders
+
+    def __len__(self) -> int:       # noqa
+        return len(self._orders)
+
+    def __iter__(self) -> Iterator[Order]:       # noqa
+        with self._lock:
+            return iter(list(self._orders.values()))
+
+
+@dataclass()
+class OrderDelta:
+    """
+    The orders changed since the last `Orders.sync_orders`.
+
+    Attributes
+    ----------
+    added : List[Order]
+        Orders which were not known before
+    changed : List[Order]
+        Known orders whose status, processed quantity or average price changed and which are still open
+    terminal : List[Order]
+        Known orders which were executed, deleted or expired since the last sync
+
+    """
+
+    added: List[Order] = field(default_factory=list)
+    changed: List[Order] = field(default_factory=list)
+    terminal: List[Order] = field(default_factory=list)
+
+    def __bool__(self) -> bool:       # noqa
+        return bool(self.added or self.changed or self.terminal)
+
+
+@dataclass()
+class OrderBatch:
+    """
+    Orders submitted by `Orders.submit_batch`.
+
+    Attributes
+    ----------
+    futures : List[concurrent.futures.Future]
+        One future per order, in the order of submission. It returns the
+        Order, or raises the exception of its create or activate request.
+
+    """
+
+    futures: List[Future] = field(default_factory=list)
+
+    @property
+    def done(self) -> bool:
+        """True once all orders were submitted or failed."""
+        return all(future.done() for future in self.futures)
+
+    def result(self, timeout: float = None) -> List[Order]:
+        """
+        Wait for all orders.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            The maximum time to wait in seconds, by default no limit
+
+        Returns
+        -------
+        List[Order]
+            The orders, in the order of submission
+
+        Raises
+        ------
+        LemonBatchException
+            Raised if any order failed, with the orders in `results` (None for
+            failed ones) and the exception per index in `errors`
+        concurrent.futures.TimeoutError
+            Raised if the orders were not submitted within `timeout`
+
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        results, errors = [], {}
+        for i, future in enumerate(self.futures):
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                results.append(future.result(remaining))
+            except Exception as e:
+                if not future.done():
+                    raise
+                results.append(None)
+                errors[i] = e
+        if errors:
+            raise LemonBatchException(results, errors)
+        return results
+
+
+def _progress(order: Order) -> tuple:
+    return order.status, order.processed_quantity, order.average_price
+
+
 class Orders(_ApiClient):
     """
     Access orders for this space.
@@ -160,20 +494,30 @@ class Orders(_ApiClient):
 
     Attributes
     ----------
+    book : OrderBook
+        The created and retrieved orders, indexed by uuid, status, ISIN and side
     orders : Mapping[str, Mapping[str, Order]]
-        The orders. In a dict grouped by state and uuid.
+        The orders. In a read-only dict grouped by state and uuid.
+    latency : Mapping[str, LatencyHistogram]
+        The durations of the stages of `place_order`: `create`, `activate` and
+        `status_change`, the time from the activation until the order was
+        first seen with another status
 
     """
 
     _space: Space
-    # Structures all orders in a dict containing a dict (the index is the uuid) of orders for each last known order status.
-    orders = {}
 
     def __init__(self, account: Account, space: Space):     # noqa
         self._space = space
         super().__init__(account=account)
-        for status in OrderStatus:
-            self.orders[status.name] = {}
+        self.book = OrderBook()
+        self.orders = _OrdersByStatus(self.book)
+        # created_at of the newest synced order in seconds, see sync_orders
+        self._watermark = None
+        self.latency = {stage: LatencyHistogram() for stage in ('create', 'activate', 'status_change')}
+        # start of the activation of orders placed by place_order, until their status changes
+        self._activated_at: Dict[str, float] = {}
+        self._activated_at_lock = threading.Lock()
 
     def create_order(self,
                      instrument: Instrument,
@@ -207,21 +551,150 @@ class Orders(_ApiClient):
 
         """
         endpoint = f"spaces/{self._space.uuid}/orders/"
-        data = {
-            "isin": instrument.isin,
-            "valid_until": datetime_to_timestamp_seconds(valid_until),
-            "side": side, "quantity": quantity}
-        if stop_price is not None:
-            data['stop_price'] = stop_price
-        if limit_price is not None:
-            data['limit_price'] = limit_price
-
+        data = _order_data(instrument, valid_until, side, quantity, stop_price, limit_price)
         data = self._request(endpoint=endpoint, method="POST", data=data)
-        order = Order._from_response(instrument, data)
-        status = order.status
-        self.orders[status.name].update({order.uuid: order})
+        return self.book.add(Order._from_response(instrument, data))
+
+    def warm_up(self):
+        """
+        Prepare `place_order`, so the first order does not wait for more than its own requests.
+
+        Requests the access token if necessary and opens a connection to the API.
+        """
+        self._fetch('get', f"{self._endpoint}spaces/{self._space.uuid}/", None, None).raise_for_status()
+
+    def place_order(self,
+                    instrument: Instrument,
+                    valid_until: datetime,
+                    side: str,
+                    quantity: int,
+                    stop_price: Union[int, float] = None,
+                    limit_price: Union[int, float] = None) -> Order:
+        """
+        Create an order and activate it right away.
+
+        The duration of both requests is recorded in `latency`, as is the time
+        until the order is first seen with a status other than `activated`
+        by `update_order`, `sync_orders` or an `OrderPoller`. Call `warm_up`
+        beforehand to keep the token request and the connection setup out of
+        the first order.
+
+        Parameters
+        ----------
+        instrument : Instrument
+            The instrument to buy/sell
+        valid_until : datetime
+            The time until which this order is valid
+        side : str
+            The side of the order. `buy` or `sell`
+        quantity : int
+            Quantity to order
+        stop_price : Union[int, float], optional
+            The price at which to activate the order
+        limit_price : Union[int, float], optional
+            The price limit while ordering
+
+        Returns
+        -------
+        Order
+            The activated order. Its status may already be past `activated`,
+            e.g. `executed`, if it was processed right away.
+
+        Raises
+        ------
+        ValueError
+            Raised if the order is still inactive after the activation
+
+        """
+        start = time.perf_counter()
+        order = self.create_order(instrument, valid_until, side, quantity, stop_price, limit_price)
+        created = time.perf_counter()
+        self.latency['create'].record(created - start)
+        with self._activated_at_lock:
+            if len(self._activated_at) >= _MAX_AWAITED_STATUS_CHANGES:
+                # orders which are never looked at again are not awaited forever
+                del self._activated_at[next(iter(self._activated_at))]
+            self._activated_at[order.uuid] = created
+        self._update_oder_data(order, '/activate/', "PUT")
+        self.latency['activate'].record(time.perf_counter() - created)
+        if order.status == OrderStatus.INACTIVE:
+            with self._activated_at_lock:
+                self._activated_at.pop(order.uuid, None)
+            raise ValueError('Order %s was not activated, its status is %s' % (order.uuid, order.status.value))
         return order
 
+    def _observe(self, order: Order):
+        # records the first status change of orders placed by place_order
+        if order.status in (OrderStatus.INACTIVE, OrderStatus.ACTIVATED):
+            return
+        with self._activated_at_lock:
+            activated_at = self._activated_at.pop(order.uuid, None)
+        if activated_at is not None:
+            self.latency['status_change'].record(time.perf_counter() - activated_at)
+
+    def _create_and_activate(self, order: MappingType, activate: bool) -> Order:
+        created = self.create_order(**order)
+        if activate and not self.activate_order(created):
+            raise ValueError('Order %s was not activated, its status is %s' % (created.uuid, created.status.value))
+        return created
+
+    def submit_batch(self, orders: Iterable[MappingType], activate: bool = True,
+                     max_workers: int = DEFAULT_ORDER_WORKERS) -> OrderBatch:
+        """
+        Create (and activate) several orders concurrently without waiting for them.
+
+        Every order is activated as soon as it is created. At most
+        `max_workers` orders are sent at once, within the rate limit of the
+        account. A failed order does not stop the others, an order whose
+        activation failed stays in the orders dict as inactive.
+
+        Parameters
+        ----------
+        orders : Iterable[Mapping]
+            The arguments of `create_order` per order, i.e. `instrument`,
+            `valid_until`, `side`, `quantity` and optionally `stop_price` and `limit_price`
+        activate : bool, optional
+            Activate the orders after creating them, by default True
+        max_workers : int, optional
+            The maximum number of orders sent concurrently, by default 20
+
+        Returns
+        -------
+        OrderBatch
+            One future per order
+
+        """
+        orders = list(orders)
+        batch = OrderBatch()
+        if not orders:
+            return batch
+        pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(orders))))
+        batch.futures = [pool.submit(self._create_and_activate, order, activate) for order in orders]
+        # the submitted orders are still sent, the threads end afterwards
+        pool.shutdown(wait=False)
+        return batch
+
+    def create_orders(self, orders: Iterable[MappingType], activate: bool = True,
+                      max_workers: int = DEFAULT_ORDER_WORKERS) -> List[Order]:
+        """
+        Create (and activate) several orders concurrently.
+
+        Like `submit_batch`, but waits until all orders are sent.
+
+        Returns
+        -------
+        List[Order]
+            The orders, in the order of `orders`
+
+        Raises
+        ------
+        LemonBatchException
+            Raised if any order failed, with the orders in `results` (None for
+            failed ones) and the exception per index in `errors`
+
+        """
+        return self.submit_batch(orders, activate=activate, max_workers=max_workers).result()
+
     def update_order(self, order: Order) -> Tuple[bool, OrderStatus]:
         """
         Update the order status.
@@ -241,10 +714,7 @@ class Orders(_ApiClient):
 
         """
         old_status = self._update_oder_data(order, '/', "GET")
-        new_status = OrderStatus(order.status.name)
-        self.orders[new_status].update({order.uuid: order})
-        status_changed = (old_status != new_status)
-        return status_changed, new_status
+        return old_status != order.status, order.status
 
     def activate_order(self, order: Order) -> bool:
         """
@@ -262,17 +732,14 @@ class Orders(_ApiClient):
 
         """
         self._update_oder_data(order, '/activate/', "PUT")
-        new_status = order.status.name
-        self.orders[new_status].update({order.uuid: order})
-        return new_status == 'ACTIVATED'
+        return order.status == OrderStatus.ACTIVATED
 
-    def _update_oder_data(self, order, arg1, method):
+    def _update_oder_data(self, order, arg1, method) -> OrderStatus:
         endpoint = f'spaces/{self._space.uuid}/orders/{order.uuid}{arg1}'
-        result = order.status.name
-        self.orders[result].pop(order.uuid)
         data = self._request(endpoint=endpoint, method=method)
-        order.update_data(data)
-        return result
+        old_status = self.book.update(order, data)
+        self._observe(order)
+        return old_status
 
     def delete_order(self, order: Order) -> Tuple[bool, OrderStatus]:
         """
@@ -301,7 +768,7 @@ class Orders(_ApiClient):
                      created_at_from: datetime = None,
                      side: str = None,
                      type: str = None,
-                     status: str = None):
+                     status: str = None) -> List[Order]:
         """
         Return orders by criteria.
 
@@ -318,61 +785,144 @@ class Orders(_ApiClient):
         status : str, optional
             Filter by status.
 
+        Returns
+        -------
+        List[Order]
+            The fetched orders
+
         """
         endpoint = f"spaces/{self._space.uuid}/orders/"
-        params = {}
-        if created_at_until is not None:
-            params['created_at_until'] = datetime_to_timestamp_seconds(
-                created_at_until)
-        if created_at_from is not None:
-            params['created_at_from'] = datetime_to_timestamp_seconds(created_at_from)
-        if side is not None:
-            params['side'] = side
-        if type is not None:
-            params['type'] = type
-        if status is not None:
-            params['status'] = status
-
+        params = _fetch_params(created_at_until, created_at_from, side, type, status)
         results = self._request_paged(endpoint=endpoint, params=params)
+        return self._add_orders(results)
+
+    def iter_orders(self,
+                    created_at_until: datetime = None,
+                    created_at_from: datetime = None,
+                    side: str = None,
+                    type: str = None,
+                    status: str = None) -> Iterator[Order]:
+        """
+        Iterate over orders by criteria, page by page.
 
-        # uuid's in old status
-        inactive_uuids = list(self.orders['INACTIVE'])
-        active_uuids = list(self.orders['ACTIVATED'])
-        in_progress_uuids = list(self.orders['IN_PROGRESS'])
-        executed_uuids = list(self.orders['EXECUTED'])
-        deleted_uuids = list(self.orders['DELETED'])
-        expired_uuids = list(self.orders['EXPIRED'])
+        Like `fetch_orders`, but only the current page is kept in memory
+        while the next one is requested. The orders are added to the orders dict
+        as they are yielded.
 
+        Yields
+        ------
+        Order
+            The fetched orders
+
+        """
+        endpoint = f"spaces/{self._space.uuid}/orders/"
+        params = _fetch_params(created_at_until, created_at_from, side, type, status)
+        for page in self._iter_pages(endpoint=endpoint, params=params, max_workers=1):
+            yield from self._add_orders(page)
+
+    def sync_orders(self, created_at_from: datetime = None) -> OrderDelta:
+        """
+        Bring the orders dict up to date incrementally.
+
+        The first call requests all orders, optionally created after
+        `created_at_from`. Later calls only request the orders created since
+        the newest known order and the orders which are still open, so their
+        cost depends on the number of new and open orders, not on the size of
+        the order history. Known orders are updated in place.
+
+        Parameters
+        ----------
+        created_at_from : datetime, optional
+            Only used by the first call: ignore older orders
+
+        Returns
+        -------
+        OrderDelta
+            The added, changed and terminal orders
+
+        """
+        endpoint = f"spaces/{self._space.uuid}/orders/"
+        if self._watermark is not None:
+            params = {'created_at_from': self._watermark}
+        else:
+            params = _fetch_params(None, created_at_from, None, None, None)
+        results = {o.get('uuid'): o for o in self._request_paged(endpoint=endpoint, params=params)}
+        stale = self.book.uuids(*OPEN_STATUSES) - set(results)
+        if stale:
+            # open orders outside of the first call's created_at_from are not synced,
+            # orders created since the newest known one come with the next call
+            results.update((o.get('uuid'), o) for o in self._request_open(stale) if o.get('uuid') in self.book)
+
+        before = {}
+        for uuid in results:
+            order = self.book.get(uuid)
+            if order is not None:
+                before[uuid] = _progress(order)
+
+        delta = OrderDelta()
+        for order, old_status in self._refresh_orders(list(results.values())):
+            if old_status is None:
+                delta.added.append(order)
+            elif order.status in TERMINAL_STATUSES:
+                if old_status not in TERMINAL_STATUSES:
+                    delta.terminal.append(order)
+            elif _progress(order) != before[order.uuid]:
+                delta.changed.append(order)
+
+        created = [o.get('created_at') for o in results.values() if o.get('created_at') is not None]
+        if created:
+            newest = int(max(created))
+            self._watermark = newest if self._watermark is None else max(self._watermark, newest)
+        return delta
+
+    def _request_open(self, uuids: Set[str]) -> List[dict]:
+        # The current data of all open orders, page by page for each open status,
+        # and of the orders in `uuids` which are not open anymore.
+        endpoint = f"spaces/{self._space.uuid}/orders/"
+        results = []
+        for status in OPEN_STATUSES:
+            results += self._request_paged(endpoint=endpoint, params={'status': status.value})
+        gone = set(uuids) - {o.get('uuid') for o in results}
+        if len(gone) > _SINGLE_LOOKUPS:
+            created = [getattr(self.book.get(uuid), 'created_at', None) for uuid in gone]
+            params = {} if None in created else {'created_at_from': datetime_to_timestamp_seconds(min(created))}
+            for status in TERMINAL_STATUSES:
+                page = self._request_paged(endpoint=endpoint, params=dict(params, status=status.value))
+                found = [o for o in page if o.get('uuid') in gone]
+                gone -= {o.get('uuid') for o in found}
+                results += found
+        for uuid in gone:
+            results.append(self._request(endpoint=f"{endpoint}{uuid}/"))
+        return results
+
+    def _add_orders(self, results: List[dict]) -> List[Order]:
+        instruments = Instruments(self._account).get_instruments(
+            o["instrument"].get("isin") for o in results)
+
+        added = self.book.add_many(Order._from_response(instruments[o["instrument"].get("isin")], o)
+                                   for o in results)
+        for order in added:
+            self._observe(order)
+        return added
+
+    def _refresh_orders(self, results: List[dict]) -> List[Tuple[Order, Union[OrderStatus, None]]]:
+        # Updates known orders in place, so references to them stay valid, and adds the others.
+        # Returns every order with its previous status, None for added orders.
+        refreshed = []
+        unknown = []
         for o in results:
-            uuid = o.get('uuid')
-            if uuid in inactive_uuids:
-                self.orders['INACTIVE'].pop(uuid)
-            if uuid in active_uuids:
-                self.orders['ACTIVATED'].pop(uuid)
-            if uuid in in_progress_uuids:
-                self.orders['IN_PROGRESS'].pop(uuid)
-            if uuid in executed_uuids:
-                self.orders['EXECUTED'].pop(uuid)
-            if uuid in deleted_uuids:
-                self.orders['DELETED'].pop(uuid)
-            if uuid in expired_uuids:
-                self.orders['EXPIRED'].pop(uuid)
-
-            isin = o["instrument"].get("isin")
-            instrument = Instruments(
-                self._account).list_instruments(
-                search=isin)[0]
-            order = Order._from_response(instrument, o)
-            self.orders[order.status.name].update({order.uuid: order})
+            order = self.book.get(o.get('uuid'))
+            if order is None:
+                unknown.append(o)
+                continue
+            refreshed.append((order, self.book.update(order, o)))
+            self._observe(order)
+        refreshed += [(order, None) for order in self._add_orders(unknown)]
+        return refreshed
 
     def clean_orders(self):
         """Remove executed, deleted and expired orders from the orders dict."""
-        executed_uuids = list(self.orders['EXECUTED'])
-        deleted_uuids = list(self.orders['DELETED'])
-        expired_uuids = list(self.orders['EXPIRED'])
-        for uuid in executed_uuids:
-            self.orders['EXECUTED'].pop(uuid)
-        for uuid in deleted_uuids:
-            self.orders['DELETED'].pop(uuid)
-        for uuid in expired_uuids:
-            self.orders['EXPIRED'].pop(uuid)
+        removed = self.book.remove_status(OrderStatus.EXECUTED, OrderStatus.DELETED, OrderStatus.EXPIRED)
+        with self._activated_at_lock:
+            for order in removed:
+                self._activated_at.pop(order.uuid, None)
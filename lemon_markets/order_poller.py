@@ -0,0 +1,359 @@
+"""Module for keeping the status of open orders up to date."""
+
+import asyncio
+import threading
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+from lemon_markets.config import DEFAULT_POLL_MIN_INTERVAL, DEFAULT_POLL_MAX_INTERVAL, \
+    DEFAULT_POLL_CLOSED_INTERVAL
+from lemon_markets.order import Order, Orders, OrderStatus, OPEN_STATUSES
+from lemon_markets.trading_venue import TradingVenue
+
+_OPEN_VALUES = {status.value for status in OPEN_STATUSES}
+
+
+@dataclass()
+class OrderTransition:
+    """
+    A change of the status of an order, or a fill.
+
+    Attributes
+    ----------
+    order : Order
+        The order, already updated
+    old_status : OrderStatus
+        The previous status, None if the order was not known before
+    new_status : OrderStatus
+        The current status
+    filled_quantity : int
+        The quantity processed since the order was last seen, 0 if none
+    processed_quantity : int
+        The quantity processed in total when the change was seen
+    average_price : float
+        The average price the order has been fulfilled at when the change was seen
+
+    """
+
+    order: Order
+    old_status: Optional[OrderStatus]
+    new_status: OrderStatus
+    filled_quantity: int = 0
+    processed_quantity: int = None
+    average_price: float = None
+
+
+def _seconds(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class OrderPoller:
+    """
+    Keeps the open orders of a space up to date, with a few requests per round.
+
+    Every round requests the orders with the status `inactive`, `activated`
+    and `in_progress` page by page, instead of one request per order. Orders
+    which left these statuses are looked up afterwards. The number of requests
+    therefore grows with the number of pages and of changed orders, not with
+    the number of open orders.
+
+    When running in the background, young orders are polled every
+    `min_interval` seconds. The interval grows with the age of the youngest
+    open order up to `max_interval`, and is `closed_interval` while the
+    trading venue is closed.
+
+    Parameters
+    ----------
+    orders : Orders
+        The orders of the space. Their order book is updated by the poller.
+    venue : TradingVenue, optional
+        The trading venue used to slow down while it is closed
+    callback : Callable[[OrderTransition], None], optional
+        Called for every status change and fill
+    min_interval : float, optional
+        The shortest time between two rounds in seconds, by default 1
+    max_interval : float, optional
+        The longest time between two rounds while the venue is open in seconds, by default 60
+    closed_interval : float, optional
+        The time between two rounds while the venue is closed in seconds, by default 300
+
+    """
+
+    def __init__(self, orders: Orders, venue: TradingVenue = None,       # noqa
+                 callback: Callable[[OrderTransition], None] = None,
+                 min_interval: float = DEFAULT_POLL_MIN_INTERVAL,
+                 max_interval: float = DEFAULT_POLL_MAX_INTERVAL,
+                 closed_interval: float = DEFAULT_POLL_CLOSED_INTERVAL):
+        self._orders = orders
+        self.venue = venue
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.closed_interval = closed_interval
+        self._callbacks: List[Callable[[OrderTransition], None]] = [] if callback is None else [callback]
+        self._created: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.errors = 0
+        self.last_error = None
+
+    def add_callback(self, callback: Callable[[OrderTransition], None]):
+        """Call `callback` for every status change and fill."""
+        self._callbacks.append(callback)
+
+    def remove_callback(self, callback: Callable[[OrderTransition], None]):
+        """Stop calling `callback`."""
+        self._callbacks.remove(callback)
+
+    def poll(self) -> List[OrderTransition]:
+        """
+        Update all open orders once.
+
+        Returns
+        -------
+        List[OrderTransition]
+            The status changes and fills found, also passed to the callbacks
+
+        """
+        with self._lock:
+            results = self._orders._request_open(self._orders.book.uuids(*OPEN_STATUSES))
+            transitions = self._apply(results)
+
+        for transition in transitions:
+            for callback in list(self._callbacks):
+                callback(transition)
+        return transitions
+
+    def _apply(self, results: List[dict]) -> List[OrderTransition]:
+        now = time.time()
+        for o in results:
+            uuid = o.get('uuid')
+            if o.get('status') in _OPEN_VALUES:
+                created = _seconds(o.get('created_at'))
+                self._created.setdefault(uuid, now if created is None else created)
+            else:
+                self._created.pop(uuid, None)
+        processed = {}
+        for o in results:
+            order = self._orders.book.get(o.get('uuid'))
+            if order is not None:
+                processed[order.uuid] = order.processed_quantity
+        transitions = []
+        for order, old_status in self._orders._refresh_orders(results):
+            filled = (order.processed_quantity or 0) - (processed.get(order.uuid) or 0)
+            if order.status != old_status or filled > 0:
+                transitions.append(OrderTransition(order, old_status, order.status, max(filled, 0),
+                                                   order.processed_quantity, order.average_price))
+        return transitions
+
+    def next_interval(self) -> float:
+        """
+        Return the time until the next round in seconds.
+
+        Returns
+        -------
+        float
+            `closed_interval` while the venue is closed, otherwise a tenth of the
+            age of the youngest open order, between `min_interval` and `max_interval`
+
+        """
+        if self.venue is not None and not self.venue.is_open:
+            return self.closed_interval
+        if not self._created:
+            return self.max_interval
+        age = time.time() - max(self._created.values())
+        return min(self.max_interval, max(self.min_interval, age / 10))
+
+    def start(self) -> 'OrderPoller':
+        """Poll in a background thread until `stop` is called."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop polling in the background."""
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                # keep polling, e.g. after a network error
+                self.errors += 1
+                self.last_error = e
+            self._stop.wait(self.next_interval())
+
+
+class OrderEventHub:
+    """
+    Delivers status changes and fills of the orders of several spaces to any number of subscribers.
+
+    Every watched `Orders` object is polled by one `OrderPoller`, all of them
+    in one background thread, no matter how many callbacks and iterators
+    subscribed. Subscribers receive an `OrderTransition` per status change
+    or fill. An exception raised by a callback does not stop the others, it
+    is counted in `callback_errors`.
+
+    Parameters
+    ----------
+    venue : TradingVenue, optional
+        The trading venue used to slow down while it is closed
+    min_interval : float, optional
+        The shortest time between two rounds per space in seconds, by default 1
+    max_interval : float, optional
+        The longest time between two rounds per space while the venue is open in seconds, by default 60
+    closed_interval : float, optional
+        The time between two rounds while the venue is closed in seconds, by default 300
+
+    """
+
+    def __init__(self, venue: TradingVenue = None,       # noqa
+                 min_interval: float = DEFAULT_POLL_MIN_INTERVAL,
+                 max_interval: float = DEFAULT_POLL_MAX_INTERVAL,
+                 closed_interval: float = DEFAULT_POLL_CLOSED_INTERVAL):
+        self.venue = venue
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.closed_interval = closed_interval
+        # the poller and the time of its next round per space uuid
+        self._pollers: Dict[str, OrderPoller] = {}
+        self._due: Dict[str, float] = {}
+        self._callbacks: List[Callable[[OrderTransition], None]] = []
+        self._queues = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.errors = 0
+        self.callback_errors = 0
+        self.last_error = None
+
+    def watch(self, orders: Orders) -> OrderPoller:
+        """
+        Poll the orders of a space, if they are not polled already.
+
+        Returns
+        -------
+        OrderPoller
+            The poller of the space
+
+        """
+        uuid = orders._space.uuid
+        with self._lock:
+            poller = self._pollers.get(uuid)
+            if poller is None:
+                poller = OrderPoller(orders, self.venue, self._publish, self.min_interval,
+                                     self.max_interval, self.closed_interval)
+                self._pollers[uuid] = poller
+                self._due[uuid] = time.monotonic()
+        self._wake.set()
+        return poller
+
+    def unwatch(self, orders: Orders):
+        """Stop polling the orders of a space."""
+        with self._lock:
+            self._pollers.pop(orders._space.uuid, None)
+            self._due.pop(orders._space.uuid, None)
+
+    def add_callback(self, callback: Callable[[OrderTransition], None]):
+        """Call `callback` for every status change and fill."""
+        self._callbacks.append(callback)
+
+    def remove_callback(self, callback: Callable[[OrderTransition], None]):
+        """Stop calling `callback`."""
+        self._callbacks.remove(callback)
+
+    async def events(self) -> AsyncIterator[OrderTransition]:
+        """
+        Iterate over the status changes and fills from now on.
+
+        Yields
+        ------
+        OrderTransition
+            The status changes and fills, in the order they were seen
+
+        """
+        entry = (asyncio.get_running_loop(), asyncio.Queue())
+        self._queues.append(entry)
+        try:
+            while True:
+                yield await entry[1].get()
+        finally:
+            self._queues.remove(entry)
+
+    def _publish(self, transition: OrderTransition):
+        for callback in list(self._callbacks):
+            try:
+                callback(transition)
+            except Exception as e:
+                self.callback_errors += 1
+                self.last_error = e
+        for loop, queue in list(self._queues):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, transition)
+            except RuntimeError:
+                # the event loop of the iterator is closed
+                pass
+
+    def poll(self) -> List[OrderTransition]:
+        """
+        Update the open orders of all watched spaces once.
+
+        Returns
+        -------
+        List[OrderTransition]
+            The status changes and fills found, also passed to the subscribers
+
+        """
+        with self._lock:
+            pollers = list(self._pollers.values())
+        transitions = []
+        for poller in pollers:
+            transitions += poller.poll()
+        return transitions
+
+    def start(self) -> 'OrderEventHub':
+        """Poll in a background thread until `stop` is called."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop polling in the background."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            now = time.monotonic()
+            with self._lock:
+                due = [(uuid, poller) for uuid, poller in self._pollers.items() if self._due[uuid] <= now]
+            for uuid, poller in due:
+                try:
+                    poller.poll()
+                except Exception as e:
+                    # keep polling the other spaces, e.g. after a network error
+                    self.errors += 1
+                    self.last_error = e
+                with self._lock:
+                    if uuid in self._due:
+                        self._due[uuid] = time.monotonic() + poller.next_interval()
+            with self._lock:
+                wait = min(self._due.values(), default=now + self.max_interval) - time.monotonic()
+            self._wake.wait(max(0.0, wait))
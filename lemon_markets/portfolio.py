@@ -57,9 +57,10 @@ class Portfolio(_ApiClient):
         endpoint = f"spaces/{self._space.uuid}/portfolio/"
         data_rows = self._request_paged(endpoint=endpoint)
 
+        instruments = Instruments(self._account).get_instruments(
+            data["instrument"].get("isin") for data in data_rows)
+
         self.positions = []
         for data in data_rows:
-            isin = data["instrument"].get("isin")
-            instrument = Instruments(
-                self._account).list_instruments(search=isin)[0]
+            instrument = instruments[data["instrument"].get("isin")]
             self.positions.append(Position._from_response(instrument=instrument, data=data))
@@ -0,0 +1,222 @@
+"""Module for deriving OHLC bars of longer intervals from minute bars."""
+
+import re
+from typing import List, Tuple, Union
+
+import numpy as np
+from pandas import DataFrame
+
+from lemon_markets.ohlc_store import BAR_DTYPE, _array_to_df, _bars_to_array
+from lemon_markets.trading_venue import TradingVenue
+
+_UNITS = {'M': 60, 'H': 60 * 60, 'D': 24 * 60 * 60}
+_INTERVAL = re.compile(r'^(?:([MHD])(\d+)|(\d+)([MHD]))$')
+
+
+def _interval_seconds(interval: Union[str, int]) -> int:
+    if isinstance(interval, int):
+        seconds = interval
+    else:
+        match = _INTERVAL.match(interval.strip().upper())
+        if match is None:
+            raise ValueError(f"Invalid interval: {interval}")
+        unit, count = (match.group(1), match.group(2)) if match.group(1) else (match.group(4), match.group(3))
+        seconds = int(count) * _UNITS[unit]
+    if seconds <= 0 or seconds % 60:
+        raise ValueError(f"Invalid interval: {interval}, must be a positive number of minutes")
+    return seconds
+
+
+def _sessions(venue: TradingVenue = None) -> Tuple[np.ndarray, np.ndarray]:
+    if venue is None:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    if venue.opening_days is None:
+        venue.update_opening_days()
+    days = sorted((int(day['opening_time']), int(day['closing_time'])) for day in venue.opening_days or []
+                  if day.get('opening_time') is not None and day.get('closing_time') is not None)
+    opens = np.fromiter((day[0] for day in days), dtype=np.int64, count=len(days))
+    closes = np.fromiter((day[1] for day in days), dtype=np.int64, count=len(days))
+    return opens, closes
+
+
+def _to_array(bars: Union[np.ndarray, List[dict], DataFrame]) -> np.ndarray:
+    if isinstance(bars, np.ndarray):
+        return bars
+    if isinstance(bars, DataFrame):
+        array = np.empty(len(bars), dtype=BAR_DTYPE)
+        index = bars.index.tz_convert('UTC').tz_localize(None) if bars.index.tz is not None else bars.index
+        array['t'] = np.asarray(index, dtype='datetime64[s]').astype(np.int64)
+        for field in BAR_DTYPE.names[1:]:
+            array[field] = bars[field].to_numpy()
+        return array
+    if not bars:
+        return np.empty(0, dtype=BAR_DTYPE)
+    return _bars_to_array(bars)
+
+
+def _buckets(t: np.ndarray, step: int, opens: np.ndarray, closes: np.ndarray) -> np.ndarray:
+    # bars within a known session are aligned to its opening time, all other
+    # bars to a grid through the opening time of day of the first session
+    origin = int(opens[0]) % min(step, _UNITS['D']) if len(opens) else 0
+    buckets = (t - origin) // step * step + origin
+    if len(opens):
+        i = np.searchsorted(opens, t, side='right') - 1
+        inside = (i >= 0) & (t < closes[np.maximum(i, 0)])
+        session_open = opens[i[inside]]
+        buckets[inside] = session_open + (t[inside] - session_open) // step * step
+    return buckets
+
+
+def _resample(array: np.ndarray, step: int, opens: np.ndarray, closes: np.ndarray) -> np.ndarray:
+    if len(array) == 0:
+        return array[:0]
+    if (np.diff(array['t']) < 0).any():
+        array = array[np.argsort(array['t'], kind='stable')]
+    buckets = _buckets(array['t'], step, opens, closes)
+    if (np.diff(buckets) < 0).any():
+        order = np.lexsort((array['t'], buckets))
+        array, buckets = array[order], buckets[order]
+
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(array)] - 1
+    result = np.empty(len(starts), dtype=array.dtype)
+    result['t'] = buckets[starts]
+    result['o'] = array['o'][starts]
+    result['h'] = np.maximum.reduceat(array['h'], starts)
+    result['l'] = np.minimum.reduceat(array['l'], starts)
+    result['c'] = array['c'][ends]
+    return result
+
+
+def resample(bars: Union[np.ndarray, List[dict], DataFrame], interval: Union[str, int],
+             venue: TradingVenue = None, as_df: bool = False) -> Union[np.ndarray, DataFrame]:
+    """
+    Combine minute bars into bars of a longer interval.
+
+    Parameters
+    ----------
+    bars : Union[numpy.ndarray, List[dict], pandas.DataFrame]
+        The minute bars, as returned by `OHLC.get_data`, `OHLC.get_history` or `OHLCStore.get_data`
+    interval : Union[str, int]
+        The interval of the new bars, e.g. `H1`, `D1`, `M15` or `15m`, or a number of seconds
+    venue : TradingVenue, optional
+        If set, the bars are aligned to the opening times of the venue's `opening_days`.
+        Otherwise they are aligned to multiples of the interval since the epoch (UTC).
+    as_df : bool, optional
+        Return the bars as a pandas dataframe, by default False
+
+    Returns
+    -------
+    Union[numpy.ndarray, pandas.DataFrame]
+        The new bars ordered from oldest to newest, either as structured array
+        with the fields `t`, `o`, `h`, `l` and `c` or as pandas dataframe.
+        `t` is the start of each bar.
+
+    """
+    result = _resample(_to_array(bars), _interval_seconds(interval), *_sessions(venue))
+    return _array_to_df(result) if as_df else result
+
+
+class Resampler:
+    """
+    Combine minute bars into bars of a longer interval as they arrive.
+
+    A bar is returned by `update` once it is complete, i.e. once the minute
+    bar of its last minute or a minute bar of a later interval arrived.
+
+    Parameters
+    ----------
+    interval : Union[str, int]
+        The interval of the new bars, e.g. `H1`, `D1`, `M15` or `15m`, or a number of seconds
+    venue : TradingVenue, optional
+        If set, the bars are aligned to the opening times of the venue's `opening_days`
+
+    """
+
+    def __init__(self, interval: Union[str, int], venue: TradingVenue = None):       # noqa
+        self.interval = _interval_seconds(interval)
+        self._opens, self._closes = _sessions(venue)
+        self._current = None
+        self._since = None
+        self._minutes = None
+
+    @property
+    def current(self) -> Union[np.ndarray, None]:
+        """The incomplete bar built so far, or None."""
+        return None if self._current is None else self._current.copy()
+
+    def _end(self, start: int) -> int:
+        end = start + self.interval
+        i = np.searchsorted(self._opens, start, side='right') - 1
+        if i >= 0 and start < self._closes[i]:
+            end = min(end, int(self._closes[i]))
+        return end
+
+    def update(self, bars: Union[np.ndarray, List[dict], DataFrame]) -> np.ndarray:
+        """
+        Add new minute bars.
+
+        Minute bars older than the current bar are ignored. A minute bar
+        received again, e.g. with an updated close, is taken into account;
+        it only sets the open or close of the current bar if it is its first
+        or last minute.
+
+        Parameters
+        ----------
+        bars : Union[numpy.ndarray, List[dict], pandas.DataFrame]
+            The new minute bars
+
+        Returns
+        -------
+        numpy.ndarray
+            The bars completed by the new minute bars, possibly empty
+
+        """
+        array = _to_array(bars)
+        if self._since is not None:
+            array = array[array['t'] >= self._since]
+        if len(array) == 0:
+            return np.empty(0, dtype=array.dtype if self._current is None else self._current.dtype)
+        last = int(array['t'].max())
+        result = _resample(array, self.interval, self._opens, self._closes)
+
+        minutes = None
+        if self._current is not None:
+            current = self._current[0]
+            if result['t'][0] == current['t']:
+                t = array['t'][array['t'] < result['t'][1]] if len(result) > 1 else array['t']
+                # an older minute received again must not replace the open or close
+                if t.min() > self._minutes[0]:
+                    result['o'][0] = current['o']
+                if t.max() < self._minutes[1]:
+                    result['c'][0] = current['c']
+                result['h'][0] = max(result['h'][0], current['h'])
+                result['l'][0] = min(result['l'][0], current['l'])
+                minutes = (min(int(t.min()), self._minutes[0]), max(int(t.max()), self._minutes[1]))
+            else:
+                result = np.concatenate([self._current.astype(result.dtype), result])
+
+        end = self._end(int(result['t'][-1]))
+        if last + _UNITS['M'] >= end:
+            self._current, self._since, self._minutes = None, end, None
+            return result
+        self._current = result[-1:].copy()
+        self._since = int(self._current['t'][0])
+        if minutes is None or len(result) > 1:
+            t = array['t'][array['t'] >= self._since]
+            minutes = (int(t.min()), int(t.max()))
+        self._minutes = minutes
+        return result[:-1]
+
+    def flush(self) -> np.ndarray:
+        """
+        Return the incomplete bar and start over.
+
+        Returns
+        -------
+        numpy.ndarray
+            The incomplete bar, or an empty array
+
+        """
+        current, self._current, self._minutes = self._current, None, None
+        return np.empty(0, dtype=BAR_DTYPE) if current is None else current
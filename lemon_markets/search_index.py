@@ -0,0 +1,173 @@
+"""Module for searching instruments locally."""
+
+import re
+import threading
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Set, Union
+
+from lemon_markets.instrument import Instrument, Instruments, InstrumentType
+
+_TOKEN = re.compile(r'[^0-9A-Z]+')
+
+
+def _normalize(text: str) -> str:
+    return (text or '').strip().upper()
+
+
+def _tokens(text: str) -> List[str]:
+    return [token for token in _TOKEN.split(_normalize(text)) if token]
+
+
+def _prefixed(keys: List[str], prefix: str) -> Iterable[str]:
+    # keys must be sorted
+    for i in range(bisect_left(keys, prefix), len(keys)):
+        if not keys[i].startswith(prefix):
+            break
+        yield keys[i]
+
+
+class InstrumentIndex:
+    """
+    An in-memory search index over instruments.
+
+    Searches match the isin, wkn, symbol, name and title of instruments.
+    Exact matches of an isin, wkn or symbol come first, then prefix matches
+    of any of the fields, then instruments whose name or title contains all
+    words of the search (the last one may be incomplete).
+
+    Parameters
+    ----------
+    instruments : Iterable[Instrument], optional
+        The instruments to index, e.g. an `InstrumentCatalog`
+    fallback : Instruments, optional
+        If set, searches without local results are sent to the server.
+        The instruments found are added to the index.
+
+    """
+
+    def __init__(self, instruments: Iterable[Instrument] = (), fallback: Instruments = None):       # noqa
+        self.fallback = fallback
+        self._lock = threading.Lock()
+        self._instruments: Dict[str, Instrument] = {}
+        self._entries: Dict[str, tuple] = {}
+        self._exact: Dict[str, Set[str]] = {}
+        self._words: Dict[str, Set[str]] = {}
+        self._keys: Dict[str, Set[str]] = {}
+        self._sorted_keys: List[str] = []
+        self._sorted_words: List[str] = []
+        self.add(instruments)
+
+    def add(self, instruments: Iterable[Instrument]):
+        """
+        Add or replace instruments in the index.
+
+        Parameters
+        ----------
+        instruments : Iterable[Instrument]
+            The instruments to add
+
+        """
+        with self._lock:
+            for instrument in instruments:
+                isin = instrument.isin
+                if isin in self._instruments:
+                    self._remove(isin)
+                exact = {_normalize(text) for text in (instrument.isin, instrument.wkn, instrument.symbol)} - {''}
+                keys = exact | {_normalize(instrument.name), _normalize(instrument.title)} - {''}
+                words = set(_tokens(instrument.name) + _tokens(instrument.title))
+                self._instruments[isin] = instrument
+                self._entries[isin] = exact, keys, words
+                for index, entries in zip((self._exact, self._keys, self._words), (exact, keys, words)):
+                    for key in entries:
+                        index.setdefault(key, set()).add(isin)
+            self._sorted_keys = sorted(self._keys)
+            self._sorted_words = sorted(self._words)
+
+    def _remove(self, isin: str):
+        for index, entries in zip((self._exact, self._keys, self._words), self._entries.pop(isin)):
+            for key in entries:
+                index[key].discard(isin)
+                if not index[key]:
+                    del index[key]
+        del self._instruments[isin]
+
+    def __len__(self) -> int:       # noqa
+        return len(self._instruments)
+
+    def get(self, isin: str) -> Instrument:
+        """Return the instrument with this isin, or None."""
+        return self._instruments.get(isin)
+
+    def search(self, search: str = None, type: Union[str, InstrumentType] = None, currency: str = None,
+               tradable: bool = None, limit: int = None) -> List[Instrument]:
+        """
+        Search instruments, like `Instruments.list_instruments`, but locally.
+
+        Parameters
+        ----------
+        search : str, optional
+            An isin, wkn, symbol, name or title, or a part of it
+        type : Union[str, InstrumentType], optional
+            A type (`stock`, `bond`, `fund` or `warrant`)
+        currency : str, optional
+            A specific currency
+        tradable : bool, optional
+            Search for tradable instruments
+        limit : int, optional
+            The maximum number of results
+
+        Returns
+        -------
+        List[Instrument]
+            The matching instruments, best matches first
+
+        """
+        if type is not None and not isinstance(type, InstrumentType):
+            type = InstrumentType(type)
+
+        def matches(instrument: Instrument) -> bool:
+            return ((type is None or instrument.type == type)
+                    and (currency is None or instrument.currency == currency)
+                    and (tradable is None or bool(instrument.tradable) == tradable))
+
+        with self._lock:
+            if search is None or not _normalize(search):
+                candidates = list(self._instruments)
+            else:
+                candidates = self._candidates(search)
+            results = []
+            for isin in candidates:
+                instrument = self._instruments[isin]
+                if matches(instrument):
+                    results.append(instrument)
+                    if limit is not None and len(results) >= limit:
+                        break
+
+        if not results and search and self.fallback is not None:
+            params = {key: value for key, value in (
+                ('type', None if type is None else type.value), ('currency', currency),
+                ('tradable', tradable)) if value is not None}
+            found = self.fallback.list_instruments(search=search, **params)
+            self.add(found)
+            results = found[:limit] if limit is not None else found
+        return results
+
+    def _candidates(self, search: str) -> List[str]:
+        query = _normalize(search)
+        # dicts keep the order of the best match
+        candidates = dict.fromkeys(sorted(self._exact.get(query, ())))
+        for key in _prefixed(self._sorted_keys, query):
+            candidates.update(dict.fromkeys(sorted(self._keys[key])))
+
+        words = _tokens(query)
+        if words:
+            found = None
+            for word in words[:-1]:
+                isins = self._words.get(word, set())
+                found = isins if found is None else found & isins
+            last = set()
+            for word in _prefixed(self._sorted_words, words[-1]):
+                last |= self._words[word]
+            found = last if found is None else found & last
+            candidates.update(dict.fromkeys(sorted(found)))
+        return list(candidates)
@@ -2,11 +2,10 @@
 
 from lemon_markets.helpers.api_client import _ApiClient
 from lemon_markets.account import Account
-from lemon_markets.helpers.time_helper import current_time
+from lemon_markets.helpers.cache import LoadingCache
 
 from enum import Enum
-from dataclasses import dataclass
-from datetime import datetime
+from dataclasses import dataclass, field
 
 
 class SpaceType(Enum):
@@ -60,8 +59,8 @@ class Space(_ApiClient):
 
     _account: Account = None
 
-    _latest_update: datetime = None
     _cash_storage_time: int = 10
+    _cache: LoadingCache = field(default=None, repr=False, compare=False)
 
     @classmethod
     def _from_response(cls, account: Account, data: dict):
@@ -75,8 +74,7 @@ class Space(_ApiClient):
             name=data.get('name'),
             _state=data.get('state'),
             type=type_,
-            _account=account,
-            _latest_update=current_time()
+            _account=account
         )
 
     def update_values(self, data: dict):
@@ -103,16 +101,21 @@ class Space(_ApiClient):
         self.name = data.get('name')
         self._state = data.get('state')
         self.type = type_
+        self._cache.set(None, self._state)
 
     def __post_init__(self):            # noqa
         super().__init__(account=self._account)
+        self._cache = LoadingCache(self._load_state, ttl=self._cash_storage_time)
+        if self._state is not None:
+            self._cache.set(None, self._state)
 
-    def _update_space_state(self):
-        diff_since_last_update = self._latest_update - current_time()
+    def _load_state(self, key=None) -> dict:
+        self.update_values(self._request(f"spaces/{self.uuid}/"))
+        return self._state
 
-        if diff_since_last_update.total_seconds() > self._cash_storage_time:
-            data = self._request(f"spaces/{self.uuid}/")
-            self.update_values(data)
+    def _update_space_state(self):
+        # returns right away unless the state was never loaded, expired data is updated in the background
+        self._cache.get()
 
     # TODO revise docstring
     def change_cash_time(self, new_cash_time_in_seconds: int):
@@ -126,6 +129,7 @@ class Space(_ApiClient):
 
         """
         self._cash_storage_time = new_cash_time_in_seconds
+        self._cache.ttl = new_cash_time_in_seconds
 
     @property
     def state(self) -> dict:
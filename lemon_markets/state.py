@@ -1,10 +1,9 @@
 """Module for showing the state of you account."""
 
 from typing import List
-from datetime import datetime
 
 from lemon_markets.helpers.api_client import _ApiClient
-from lemon_markets.helpers.time_helper import current_time
+from lemon_markets.helpers.cache import LoadingCache
 from lemon_markets.account import Account
 from lemon_markets.space import Space
 
@@ -36,48 +35,46 @@ class State(_ApiClient):
 
     """
 
-    _state: dict = None
-    _balance: float = None
-    _spaces: List[Space] = None
-
-    _latest_update: datetime = None
-    _cash_storage_time: int = 10
-
     def __init__(self, account: Account, cash_time_in_seconds: int = 10):       # noqa
         super().__init__(account)
-        self._cash_storage_time = cash_time_in_seconds
+        self._cache = LoadingCache(self._load, ttl=cash_time_in_seconds)
         self.get_state()
         self.get_spaces()
-        self._latest_update = current_time()
 
-    def get_state(self):
+    def _load(self, key: str):
+        if key == 'state':
+            data = self._request(endpoint='state/')
+            try:
+                balance = float(data.get('state').get('balance'))
+            except Exception:
+                raise Exception
+            return data, balance
+        data_rows = self._request_paged('spaces/')
+        return [Space._from_response(self._account, data) for data in data_rows]
+
+    def get_state(self) -> dict:
         """
         Get the state of a space.
 
+        The cashed state is returned right away. If it is older than the cash
+        time, it is updated in the background.
+
+        Returns
+        -------
+        dict
+            The state
+
         Raises
         ------
         Exception
             Raised if theres an internal request error
 
         """
-        diff_since_last_update = self._latest_update - current_time()
+        return self._cache.get('state')[0]
 
-        if diff_since_last_update.total_seconds() > self._cash_storage_time:
-            data = self._request(endpoint='state/')
-            try:
-                self._balance = float(data.get('state').get('balance'))
-                self._state = data
-            except Exception:
-                raise Exception
-
-    def get_spaces(self):
-        """Return a list of your spaces."""
-        diff_since_last_update = self._latest_update - current_time()
-
-        if diff_since_last_update.total_seconds() > self._cash_storage_time:
-            data_rows = self._request_paged('spaces/')
-            self._spaces = [Space._from_response(
-                self._account, data) for data in data_rows]
+    def get_spaces(self) -> List[Space]:
+        """Return a list of your spaces, updated in the background if older than the cash time."""
+        return self._cache.get('spaces')
 
     # TODO revise docstring
     def change_cash_time(self, new_cash_time_in_seconds: int):
@@ -90,7 +87,7 @@ class State(_ApiClient):
             The wished time data is cashed.
 
         """
-        self._cash_storage_time = new_cash_time_in_seconds
+        self._cache.ttl = new_cash_time_in_seconds
 
     @property
     def balance(self) -> float:
@@ -103,8 +100,7 @@ class State(_ApiClient):
             The balance of the account
 
         """
-        self.get_state()
-        return self._balance
+        return self._cache.get('state')[1]
 
     @property
     def state(self) -> dict:
@@ -117,8 +113,7 @@ class State(_ApiClient):
             The state
 
         """
-        self.get_state()
-        return self._state
+        return self.get_state()
 
     @property
     def spaces(self) -> List[Space]:
@@ -131,5 +126,4 @@ class State(_ApiClient):
             List of your spaces
 
         """
-        self.get_spaces()
-        return self._spaces
+        return self.get_spaces()
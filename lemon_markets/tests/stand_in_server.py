@@ -0,0 +1,168 @@
+# undocumented on rtd
+"""A local stand-in for the lemon.markets API used by tests and benchmarks."""
+
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Tuple
+from unittest import mock
+from urllib.parse import urlsplit, parse_qs, urlencode
+
+from lemon_markets.account import Account
+
+
+class StandInRequest:
+    """A request received by the stand-in server."""
+
+    def __init__(self, method: str, path: str, query: dict, headers, body: bytes, client=None):     # noqa
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+        self.body = body
+        self.client = client
+
+    def param(self, name: str, default=None):
+        """Return a single query parameter."""
+        values = self.query.get(name)
+        return values[0] if values else default
+
+
+class StandInServer:
+    """
+    A threaded HTTP/1.1 server with keep-alive serving json routes.
+
+    Handlers receive a `StandInRequest` and return a tuple of
+    `(status, body, headers)`, where body is json serializable (or None).
+    The server answers the oauth token endpoint by default.
+    """
+
+    def __init__(self, delay: float = 0.0):      # noqa
+        self.routes: Dict[Tuple[str, str], Callable] = {}
+        self.requests = []
+        self.delay = delay
+        self._lock = threading.Lock()
+        self.route('POST', '/oauth2/token', lambda request: (
+            200, {'access_token': 'token', 'token_type': 'bearer', 'expires_in': 3600}, {}))
+
+        server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _handle(self):
+                parts = urlsplit(self.path)
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                request = StandInRequest(
+                    self.command, parts.path, parse_qs(parts.query), self.headers, body,
+                    self.client_address)
+                with server._lock:
+                    server.requests.append(request)
+                handler = server.routes.get((self.command, parts.path))
+                if handler is None:
+                    status, payload, headers = 404, {'detail': 'Not found.'}, {}
+                else:
+                    if server.delay:
+                        threading.Event().wait(server.delay)
+                    status, payload, headers = handler(request)
+                content = b'' if payload is None else json.dumps(payload).encode()
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                if status != 304:
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                if status != 304:
+                    self.wfile.write(content)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _handle
+
+        class _Server(ThreadingHTTPServer):
+            request_queue_size = 1024
+
+        self._server = _Server(('127.0.0.1', 0), _Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        """Base url of the server, ending with a slash."""
+        host, port = self._server.server_address[:2]
+        return 'http://%s:%d/' % (host, port)
+
+    def route(self, method: str, path: str, handler: Callable):
+        """Register a handler for the method and path."""
+        self.routes[(method, path)] = handler
+
+    def json(self, method: str, path: str, payload, status: int = 200):
+        """Register a static json response."""
+        self.route(method, path, lambda request: (status, payload, {}))
+
+    def count(self, method: str = None, path: str = None) -> int:
+        """Count the received requests matching method and path."""
+        with self._lock:
+            return sum(
+                1 for r in self.requests
+                if (method is None or r.method == method) and (path is None or r.path == path))
+
+    def start(self) -> 'StandInServer':
+        """Start serving in a background thread."""
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the server."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):       # noqa
+        return self.start()
+
+    def __exit__(self, *exc):       # noqa
+        self.stop()
+
+
+def paged(results: list, request: StandInRequest, base_url: str, page_size: int = 100) -> dict:
+    """Build a limit/offset paginated response for the request."""
+    limit = int(request.param('limit', page_size))
+    offset = int(request.param('offset', 0))
+    next_ = None
+    if offset + limit < len(results):
+        query = {key: values[0] for key, values in request.query.items()}
+        query.update(limit=limit, offset=offset + limit)
+        next_ = '%s%s?%s' % (base_url.rstrip('/'), request.path, urlencode(query))
+    return {'count': len(results), 'next': next_, 'previous': None,
+            'results': results[offset:offset + limit]}
+
+
+def etagged(payload, request: StandInRequest) -> tuple:
+    """Answer with an ETag, or with 304 if the request already has the current version."""
+    etag = '"%s"' % hashlib.sha1(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+    if request.headers.get('If-None-Match') == etag:
+        return 304, None, {'ETag': etag}
+    return 200, payload, {'ETag': etag}
+
+
+def stand_in_account(server: StandInServer) -> Account:
+    """Create an account talking to the stand-in server."""
+    with mock.patch('lemon_markets.account.DEFAULT_AUTH_API_URL', server.url + 'oauth2/token'):
+        account = Account('client_id', 'client_secret')
+    account._DEFAULT_API_URL = server.url
+    account._DATA_API_URL = server.url
+    return account
+
+
+def instrument_data(isin: str = 'US88160R1014', **kwargs) -> dict:
+    """Build an instrument like the API returns it."""
+    data = {'isin': isin, 'wkn': 'A1CX3T', 'name': 'TESLA INC.', 'title': 'TESLA',
+            'type': 'stock', 'symbol': 'TSLA', 'currency': 'EUR', 'tradable': True,
+            'venues': [{'name': 'Börse München - Gettex', 'title': 'Gettex', 'mic': 'XMUN'}]}
+    data.update(kwargs)
+    return data
@@ -1,7 +1,12 @@
+import os
+import tempfile
+import time
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from os import getenv
 
 from lemon_markets.account import Account
+from lemon_markets.tests.stand_in_server import StandInServer, stand_in_account
 
 
 client_id = getenv('CLIENT_ID')
@@ -15,5 +20,58 @@ class _TestAccount(unittest.TestCase):
             'Incorrect acount token type.')
 
 
+class _TestTokenRefresh(unittest.TestCase):
+    def setUp(self):
+        self.server = StandInServer(delay=0.05).start()
+        self.server.route('POST', '/oauth2/token', lambda request: (
+            200, {'access_token': 'token', 'token_type': 'bearer', 'expires_in': 62}, {}))
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_background_refresh(self):
+        account = stand_in_account(self.server)
+        self.assertEqual(self.server.count('POST', '/oauth2/token'), 0)
+        self.assertEqual(account.access_token, 'token')
+        expires = account._access_token_expires
+        time.sleep(1.5)
+        self.assertEqual(self.server.count('POST', '/oauth2/token'), 2)
+        self.assertGreater(account._access_token_expires, expires)
+        self.assertEqual(account.token_refresh_latency.count, 2)
+        self.assertGreaterEqual(account.token_refresh_latency.percentile(50), 0.05)
+        account.stop_token_refresh()
+
+    def test_single_flight(self):
+        account = stand_in_account(self.server)
+        account.stop_token_refresh()
+        account._access_token_expires = 0
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            tokens = list(pool.map(lambda _: account.access_token, range(8)))
+        self.assertEqual(tokens, ['token'] * 8)
+        self.assertEqual(self.server.count('POST', '/oauth2/token'), 1)
+
+    def test_token_cache(self):
+        self.server.route('POST', '/oauth2/token', lambda request: (
+            200, {'access_token': 'token', 'token_type': 'bearer', 'expires_in': 3600}, {}))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'tokens.json')
+            for _ in range(3):
+                account = stand_in_account(self.server)
+                account._token_cache = path
+                self.assertEqual(account._authorization, {'Authorization': 'Bearer token'})
+                account.stop_token_refresh()
+            self.assertEqual(self.server.count('POST', '/oauth2/token'), 1)
+            if os.name == 'posix':
+                self.assertEqual(os.stat(path).st_mode & 0o777, 0o600)
+
+                # a file others can read is ignored
+                os.chmod(path, 0o644)
+                account = stand_in_account(self.server)
+                account._token_cache = path
+                account.access_token
+                account.stop_token_refresh()
+                self.assertEqual(self.server.count('POST', '/oauth2/token'), 2)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,87 @@
+# undocumented on rtd
+import asyncio
+import time
+import unittest
+
+from lemon_markets.aio import AsyncInstruments, AsyncOrders, AsyncTradingVenues
+from lemon_markets.helpers.session import close_async_session
+from lemon_markets.order import OrderStatus
+from lemon_markets.space import Space
+from lemon_markets.tests.stand_in_server import StandInServer, stand_in_account, paged, instrument_data
+
+INSTRUMENT = instrument_data()
+
+
+def _run(coroutine):
+    async def main():
+        try:
+            return await coroutine
+        finally:
+            await close_async_session()
+    return asyncio.run(main())
+
+
+class _TestAsyncClients(unittest.TestCase):
+    def setUp(self):
+        self.server = StandInServer().start()
+        self.account = stand_in_account(self.server)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_list_instruments(self):
+        results = [instrument_data('DE%010d' % i) for i in range(250)]
+        self.server.route('GET', '/instruments/', lambda r: (200, paged(results, r, self.server.url), {}))
+        instruments = _run(AsyncInstruments(self.account).list_instruments(type='stock'))
+        self.assertEqual([i.isin for i in instruments], [r['isin'] for r in results])
+        self.assertEqual(self.server.count('GET', '/instruments/'), 3)
+
+    def test_requests_run_concurrently(self):
+        self.server.delay = 0.1
+        self.server.route('GET', '/instruments/', lambda r: (200, paged([INSTRUMENT], r, self.server.url), {}))
+        client = AsyncInstruments(self.account)
+
+        async def fan_out():
+            return await asyncio.gather(*(client.list_instruments(search=str(i)) for i in range(20)))
+
+        start = time.perf_counter()
+        self.assertEqual(len(_run(fan_out())), 20)
+        self.assertLess(time.perf_counter() - start, 1.0)
+
+    def test_orders_and_venue(self):
+        space = Space(uuid='space', _account=self.account)
+        order = {'uuid': 'order', 'status': 'inactive', 'valid_until': 1700000000, 'side': 'buy',
+                 'quantity': 1, 'type': 'stock', 'instrument': {'isin': INSTRUMENT['isin']}}
+        self.server.route('GET', '/spaces/space/orders/', lambda r: (200, paged([order], r, self.server.url), {}))
+        self.server.route('GET', '/instruments/', lambda r: (200, paged([INSTRUMENT], r, self.server.url), {}))
+        self.server.json('PUT', '/spaces/space/orders/order/activate/', dict(order, status='activated'))
+        self.server.json('GET', '/venues/XMUN/opening-days', {'results': []})
+        orders = AsyncOrders(self.account, space)
+
+        async def scenario():
+            fetched = await orders.fetch_orders()
+            activated = await orders.activate_order(fetched[0])
+            venue = fetched[0].instrument.trading_venues[0]
+            return activated, await AsyncTradingVenues(self.account).is_open(venue)
+
+        self.assertEqual(_run(scenario()), (True, False))
+        self.assertIn('order', orders.orders[OrderStatus.ACTIVATED.name])
+        self.assertNotIn('order', orders.orders[OrderStatus.INACTIVE.name])
+
+    def test_token_refresh_in_two_event_loops(self):
+        self.server.delay = 0.05
+        self.server.route('GET', '/instruments/', lambda r: (200, paged([INSTRUMENT], r, self.server.url), {}))
+        client = AsyncInstruments(self.account)
+
+        async def fan_out():
+            return await asyncio.gather(*(client.list_instruments(search=str(i)) for i in range(5)))
+
+        # the expired token is renewed once per run, while the other requests wait for it
+        for run in range(2):
+            self.account._access_token_expires = 0
+            self.assertEqual(len(_run(fan_out())), 5)
+            self.assertEqual(self.server.count('POST', '/oauth2/token'), run + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+# undocumented on rtd
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from requests import HTTPError
+
+from lemon_markets.helpers.api_client import _ApiClient
+from lemon_markets.helpers.rate_limit import RateLimiter
+from lemon_markets.helpers.session import get_session, configure_session
+from lemon_markets.helpers.cache import ResponseCache
+from lemon_markets.tests.stand_in_server import StandInServer, stand_in_account, paged, etagged
+
+
+class _TestApiClient(unittest.TestCase):
+    def setUp(self):
+        self.server = StandInServer().start()
+        self.account = stand_in_account(self.server)
+        self.client = _ApiClient(self.account)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_session_is_shared(self):
+        self.assertIs(get_session(), get_session())
+        configure_session(pool_maxsize=4)
+        self.assertEqual(get_session().get_adapter(self.server.url)._pool_maxsize, 4)
+        configure_session()
+
+    def test_connection_is_reused(self):
+        self.server.json('GET', '/state/', {'state': {'balance': '1.0'}})
+        for _ in range(5):
+            self.assertEqual(self.client._request('state/'), {'state': {'balance': '1.0'}})
+        clients = {r.client for r in self.server.requests if r.path == '/state/'}
+        self.assertEqual(len(clients), 1)
+
+    def test_paged_with_predictable_pages(self):
+        rows = [{'n': n} for n in range(1050)]
+        self.server.delay = 0.05
+        self.server.route('GET', '/rows/', lambda r: (200, paged(rows, r, self.server.url), {}))
+        start = time.perf_counter()
+        self.assertEqual(self.client._request_paged('rows/', params={'q': 'x'}, max_workers=11), rows)
+        # 11 pages, the first one alone and the other ten concurrently
+        self.assertLess(time.perf_counter() - start, 0.4)
+        self.assertEqual({r.param('q') for r in self.server.requests if r.path == '/rows/'}, {'x'})
+
+    def test_paged_following_next_links(self):
+        rows = [{'n': n} for n in range(350)]
+
+        def unpredictable(request):
+            data = paged(rows, request, self.server.url)
+            del data['count']
+            return 200, data, {}
+
+        self.server.route('GET', '/rows/', unpredictable)
+        pages = list(self.client._iter_pages('rows/'))
+        self.assertEqual([len(page) for page in pages], [100, 100, 100, 50])
+        self.assertEqual(sum(pages, []), rows)
+
+    def test_retry_after_429(self):
+        responses = [(429, None, {'Retry-After': '0.1'}), (503, None, {}), (200, {'ok': True}, {})]
+        self.server.route('GET', '/state/', lambda r: responses.pop(0))
+        start = time.perf_counter()
+        self.assertEqual(self.client._request('state/'), {'ok': True})
+        self.assertGreaterEqual(time.perf_counter() - start, 0.1)
+        self.assertEqual(self.server.count('GET', '/state/'), 3)
+
+        # a POST is not retried after a server error, it may have been processed
+        self.server.route('POST', '/orders/', lambda r: (503, None, {}))
+        with self.assertRaises(HTTPError):
+            self.client._request('orders/', method='POST', data={})
+        self.assertEqual(self.server.count('POST', '/orders/'), 1)
+
+    def test_rate_limit(self):
+        self.account.rate_limiter = RateLimiter(rate=100, burst=5)
+        self.server.json('GET', '/state/', {})
+        self.assertEqual(self.account.rate_limiter.budget(1), 105)
+        start = time.perf_counter()
+        for _ in range(15):
+            self.client._request('state/')
+        # the first five at once, then one every 10 ms
+        self.assertGreaterEqual(time.perf_counter() - start, 0.09)
+        self.assertEqual(self.account.rate_limiter.available, 0)
+
+    def test_identical_gets_are_coalesced(self):
+        self.server.delay = 0.2
+        self.server.route('GET', '/spaces/space/', lambda r: (200, {'uuid': 'space', 'q': r.param('q')}, {}))
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda i: self.client._request('spaces/space/', params={'q': i % 2}), range(8)))
+        self.assertEqual([result['q'] for result in results], ['0', '1'] * 4)
+        # every caller gets its own object
+        self.assertEqual(len({id(result) for result in results}), 8)
+        self.assertEqual(self.server.count('GET', '/spaces/space/'), 2)
+        self.assertEqual(self.account.request_coalescing.joined, 6)
+
+    def test_conditional_requests(self):
+        state = {'state': {'balance': '1.0'}}
+        self.server.route('GET', '/state/', lambda r: etagged(state, r))
+        first = self.client._request('state/')
+        first['state']['balance'] = '0.0'
+        # served from the cache, as a new object
+        self.assertEqual(self.client._request('state/'), state)
+        self.assertEqual(self.account.response_cache.hits, 1)
+        etags = [r.headers.get('If-None-Match') for r in self.server.requests if r.path == '/state/']
+        self.assertEqual(etags[0], None)
+        self.assertTrue(etags[1])
+
+        state = {'state': {'balance': '2.0'}}
+        self.assertEqual(self.client._request('state/'), state)
+        self.assertEqual(self.account.response_cache.hits, 1)
+
+    def test_response_cache_is_bounded(self):
+        cache = ResponseCache(max_bytes=100)
+        for key in 'abc':
+            cache.set(key, '"%s"' % key, None, key, 40)
+        self.assertEqual((len(cache), cache.size), (2, 80))
+        self.assertIsNone(cache.get('a'))
+        cache.get('b')
+        cache.set('d', None, 'Tue, 01 Jun 2021 00:00:00 GMT', 'd', 40)
+        self.assertEqual((cache.get('b')[2], cache.get('c')), ('b', None))
+        cache.set('e', None, None, 'e', 101)
+        self.assertIsNone(cache.get('e'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+# undocumented on rtd
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from lemon_markets.helpers.cache import LoadingCache, TTLCache
+
+
+class _TestTTLCache(unittest.TestCase):
+    def test_lru_eviction(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual((cache.get('a'), cache.get('b'), cache.get('c')), (1, None, 3))
+
+    def test_expiry(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set('a', 1, ttl=0.01)
+        cache.set('b', 2)
+        time.sleep(0.02)
+        self.assertNotIn('a', cache)
+        self.assertIn('b', cache)
+
+
+class _TestLoadingCache(unittest.TestCase):
+    def setUp(self):
+        self.loads = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def _load(self, key):
+        self.loads += 1
+        self.release.wait()
+        return '%s%d' % (key, self.loads)
+
+    def test_single_flight(self):
+        cache = LoadingCache(self._load, ttl=60)
+        self.release.clear()
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            futures = [pool.submit(cache.get, 'a') for _ in range(8)]
+            time.sleep(0.05)
+            self.release.set()
+        self.assertEqual({future.result() for future in futures}, {'a1'})
+        self.assertEqual(self.loads, 1)
+
+    def test_stale_while_revalidate(self):
+        cache = LoadingCache(self._load, ttl=0.01)
+        self.assertEqual(cache.get('a'), 'a1')
+        time.sleep(0.02)
+        self.release.clear()
+        start = time.monotonic()
+        self.assertEqual(cache.get('a'), 'a1')
+        self.assertEqual(cache.get('a'), 'a1')
+        self.assertLess(time.monotonic() - start, 0.01)
+        self.release.set()
+        self.assertEqual(cache.refresh('a'), 'a2')
+        self.assertEqual(self.loads, 2)
+
+        cache.ttl = 60
+        cache.set('b', 'b', ttl=0.01)
+        time.sleep(0.02)
+        self.assertEqual(cache.get('b'), 'b')
+        for _ in range(100):
+            if cache.peek('b') != 'b':
+                break
+            time.sleep(0.01)
+        self.assertEqual((cache.peek('a'), cache.peek('b')), ('a2', 'b3'))
+
+    def test_own_ttl_survives_refreshes(self):
+        cache = LoadingCache(self._load, ttl=60)
+        cache.set('b', 'b', ttl=0.01)
+        # every refresh expires after the entry's own ttl again, not after the default
+        for expected in ('b1', 'b2'):
+            time.sleep(0.02)
+            cache.get('b')
+            for _ in range(100):
+                if cache.peek('b') == expected:
+                    break
+                time.sleep(0.01)
+            self.assertEqual(cache.peek('b'), expected)
+            self.assertEqual(cache._data['b'][2], 0.01)
+
+
+if __name__ == '__main__':
+    unittest.main()
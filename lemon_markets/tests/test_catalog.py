@@ -0,0 +1,53 @@
+# undocumented on rtd
+import os
+import tempfile
+import unittest
+
+from lemon_markets.catalog import InstrumentCatalog
+from lemon_markets.instrument import Instruments
+from lemon_markets.tests.stand_in_server import StandInServer, stand_in_account, paged, instrument_data
+
+
+class _TestInstrumentCatalog(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'catalog.sqlite')
+        self.server = StandInServer().start()
+        self.rows = [instrument_data('DE%010d' % i, symbol='S%d' % i) for i in range(250)]
+        self.server.route('GET', '/instruments/', lambda r: (200, paged(self.rows, r, self.server.url), {}))
+        self.account = stand_in_account(self.server)
+
+    def tearDown(self):
+        self.server.stop()
+        self.directory.cleanup()
+
+    def test_refresh_and_load_offline(self):
+        catalog = InstrumentCatalog(self.account, self.path, auto_refresh=False)
+        self.assertTrue(catalog.is_stale)
+        self.assertEqual(catalog.refresh(), (250, 0, 0))
+
+        self.rows[0] = dict(self.rows[0], tradable=False)
+        del self.rows[-1]
+        self.assertEqual(catalog.refresh(), (0, 1, 1))
+        requests = self.server.count('GET', '/instruments/')
+
+        reopened = InstrumentCatalog(stand_in_account(self.server), self.path)
+        self.assertFalse(reopened.is_stale)
+        self.assertEqual(len(reopened), 249)
+        self.assertIs(reopened.get('DE0000000000').tradable, False)
+        self.assertEqual(reopened.get('DE0000000001').trading_venues[0].mic, 'XMUN')
+        self.assertIsNone(reopened.get('DE0000000249'))
+        # the snapshot fills the instrument cache, no instrument request is needed
+        instrument = Instruments(reopened._account).get_instrument('DE0000000002')
+        self.assertEqual(instrument.symbol, 'S2')
+        self.assertEqual(self.server.count('GET', '/instruments/'), requests)
+
+    def test_background_refresh_when_stale(self):
+        catalog = InstrumentCatalog(self.account, self.path, max_age=60)
+        catalog.wait(5)
+        self.assertEqual(len(catalog), 250)
+        self.assertFalse(catalog.is_stale)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,6 +3,7 @@ from os import getenv
 
 from lemon_markets.account import Account
 from lemon_markets.instrument import Instruments
+from lemon_markets.tests.stand_in_server import StandInServer, stand_in_account, paged, instrument_data
 
 
 client_id = getenv('CLIENT_ID')
@@ -19,5 +20,63 @@ class _TestInstrument(unittest.TestCase):
         self.assertEqual(tsla.isin, 'US88160R1014')
 
 
+class _TestInstrumentPaging(unittest.TestCase):
+    def setUp(self):
+        self.server = StandInServer().start()
+        self.rows = [instrument_data('DE%010d' % i) for i in range(1050)]
+        self.server.route('GET', '/instruments/', lambda r: (200, paged(self.rows, r, self.server.url), {}))
+        self.instruments = Instruments(stand_in_account(self.server))
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_iter_instruments_is_lazy(self):
+        iterator = self.instruments.iter_instruments(type='stock')
+        self.assertEqual(next(iterator).isin, self.rows[0]['isin'])
+        # the first page and the prefetched second one
+        self.assertLessEqual(self.server.count('GET', '/instruments/'), 2)
+        self.assertEqual([i.isin for i in iterator], [r['isin'] for r in self.rows[1:]])
+
+    def test_lazy_instruments(self):
+        instruments = self.instruments.lazy_instruments(type='stock')
+        self.assertEqual(len(instruments), 1050)
+        self.assertEqual(instruments[-1].isin, self.rows[-1]['isin'])
+        self.assertEqual([i.isin for i in instruments[510:512]], [r['isin'] for r in self.rows[510:512]])
+        self.assertEqual(self.server.count('GET', '/instruments/'), 3)
+        with self.assertRaises(IndexError):
+            instruments[1050]
+
+
+class _TestInstrumentCache(unittest.TestCase):
+    def setUp(self):
+        self.server = StandInServer().start()
+        rows = [instrument_data('DE%010d' % i) for i in range(20)]
+
+        def search(request):
+            found = [r for r in rows if r['isin'] == request.param('search')]
+            return 200, paged(found, request, self.server.url), {}
+
+        self.server.route('GET', '/instruments/', search)
+        self.account = stand_in_account(self.server)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_get_instruments_deduplicates_and_caches(self):
+        isins = ['DE%010d' % (i % 10) for i in range(50)]
+        instruments = Instruments(self.account).get_instruments(isins)
+        self.assertEqual(sorted(instruments), sorted(set(isins)))
+        self.assertEqual(self.server.count('GET', '/instruments/'), 10)
+
+        # another client of the same account shares the cache
+        instrument = Instruments(self.account).get_instrument('DE0000000003')
+        self.assertIs(instrument, instruments['DE0000000003'])
+        self.assertEqual(self.server.count('GET', '/instruments/'), 10)
+
+    def test_unknown_isin(self):
+        with self.assertRaises(ValueError):
+            Instruments(self.account).get_instrument('XX0000000000')
+
+
 if __name__ == '__main__':
     unittest.main()
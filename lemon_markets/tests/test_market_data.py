@@ -0,0 +1,186 @@
+# undocumented on rtd
+import os
+import tempfile
+import unittest
+from unittest import mock
+from datetime import datetime, timedelta, timezone
+
+from pandas import DataFrame, to_datetime
+
+from lemon_markets.instrument import Instrument
+from lemon_markets.market_data import OHLC, _results_to_df
+from lemon_markets.ohlc_store import OHLCStore
+from lemon_markets.trading_venue import TradingVenue
+from lemon_markets.tests.stand_in_server import StandInServer, stand_in_account, paged
+
+START = datetime(2021, 6, 1, tzinfo=timezone.utc)
+PATH = '/trading-venues/XMUN/instruments/US88160R1014/data/ohlc/M1/'
+
+
+def minute_bars(request):
+    """Serve one bar per minute between date_from and date_until, both inclusive."""
+    date_from = int(request.param('date_from'))
+    date_until = int(request.param('date_until'))
+    bars = [{'t': t, 'o': 1.0, 'h': 2.0, 'l': 0.5, 'c': 1.5} for t in range(date_from - date_from % 60, date_until + 1, 60)]
+    return bars
+
+
+def previous_df(results: list, ordering: str = None) -> DataFrame:
+    """The conversion before _results_to_df, through DataFrame(results)."""
+    df = DataFrame(results)
+    to_tz = datetime.now().astimezone().tzinfo
+    df['t'] = to_datetime(df['t'], unit='s').dt.tz_localize(timezone.utc).dt.tz_convert(to_tz)
+    df.set_index('t', inplace=True)
+    df.sort_index(ascending=ordering != '-date', inplace=True)
+    return df
+
+
+class _TestResultsToDf(unittest.TestCase):
+    def setUp(self):
+        start = int(START.timestamp())
+        # shuffled, with an extra column
+        self.results = [{'o': 1.0 + i, 'h': 2.0 + i, 'l': 0.5 + i, 'c': 1.5 + i, 't': start + 60 * i, 'v': i}
+                        for i in (3, 0, 4, 1, 2)]
+
+    def _assert_equal(self, actual: DataFrame, expected: DataFrame):
+        self.assertTrue(actual.index.equals(expected.index))
+        self.assertEqual(list(actual.columns), list(expected.columns))
+        self.assertEqual(actual.values.tolist(), expected.values.tolist())
+
+    def test_orderings(self):
+        for ordering in (None, 'date', '-date'):
+            for results in (self.results, sorted(self.results, key=lambda bar: bar['t'])):
+                self._assert_equal(_results_to_df(results, ordering), previous_df(results, ordering))
+        self.assertTrue(_results_to_df(self.results, '-date').index.is_monotonic_decreasing)
+
+    def test_float32(self):
+        df = _results_to_df(self.results, dtype='float32')
+        self.assertEqual([str(dtype) for dtype in df.dtypes], ['float32'] * 4 + ['int64'])
+        self._assert_equal(df, previous_df(self.results))
+
+
+class _OHLCStandIn:
+    def setUp(self):
+        self.server = StandInServer().start()
+        for path in (PATH, PATH.replace('M1', 'H1')):
+            self.server.route('GET', path, lambda r: (200, paged(minute_bars(r), r, self.server.url, page_size=500), {}))
+        self.account = stand_in_account(self.server)
+        self.instrument = Instrument(isin='US88160R1014')
+        self.venue = TradingVenue(mic='XMUN', _account=self.account)
+
+    def tearDown(self):
+        self.server.stop()
+
+
+class _TestOHLC(_OHLCStandIn, unittest.TestCase):
+    def test_get_data_is_paged(self):
+        df = OHLC(self.account).get_data(self.instrument, self.venue, 'M1', date_from=START,
+                                         date_until=START + timedelta(hours=12))
+        self.assertEqual(len(df), 12 * 60 + 1)
+
+    def test_get_history(self):
+        df = OHLC(self.account).get_history(self.instrument, self.venue, 'M1', date_from=START,
+                                            date_until=START + timedelta(days=3))
+        self.assertEqual(len(df), 3 * 24 * 60 + 1)
+        self.assertTrue(df.index.is_monotonic_increasing)
+        self.assertTrue(df.index.is_unique)
+        self.assertEqual(df.index[0], START)
+
+        bars = OHLC(self.account).get_history(self.instrument, self.venue, 'M1', date_from=START,
+                                              date_until=START + timedelta(days=2), ordering='-date', as_df=False)
+        self.assertEqual(bars[0]['t'], int((START + timedelta(days=2)).timestamp()))
+
+    def test_get_history_naive(self):
+        date_from = datetime.now() - timedelta(hours=2)
+        df = OHLC(self.account).get_history(self.instrument, self.venue, 'M1', date_from=date_from)
+        self.assertIn(len(df), (2 * 60, 2 * 60 + 1))
+        self.assertEqual(df.index[0].timestamp(), date_from.timestamp() // 60 * 60)
+
+        date_until = datetime.now(timezone.utc)
+        df = OHLC(self.account).get_history(self.instrument, self.venue, 'M1', date_from=date_from,
+                                            date_until=date_until)
+        self.assertIn(len(df), (2 * 60, 2 * 60 + 1))
+
+    def test_get_data_many(self):
+        self.server.route('GET', PATH.replace('US88160R1014', 'US0378331005'),
+                          lambda r: (200, paged(minute_bars(r)[::2], r, self.server.url, page_size=500), {}))
+        instruments = [self.instrument, Instrument(isin='US0378331005'), Instrument(isin='DE0007100000')]
+        batch = OHLC(self.account).get_data_many(instruments, self.venue, 'M1', date_from=START,
+                                                 date_until=START + timedelta(hours=1))
+        self.assertEqual(sorted(batch.frames), ['US0378331005', 'US88160R1014'])
+        self.assertEqual(list(batch.errors), ['DE0007100000'])
+
+        panel = batch.panel()
+        self.assertEqual(panel.index.names, ['instrument', 't'])
+        self.assertEqual(len(panel.loc['US88160R1014']), 61)
+        self.assertEqual(len(panel.loc['US0378331005']), 31)
+
+        aligned = batch.aligned()
+        self.assertTrue(aligned['US0378331005'].index.equals(aligned['US88160R1014'].index))
+        self.assertEqual(int(aligned['US0378331005']['c'].isna().sum()), 30)
+
+
+class _TestOHLCStore(_OHLCStandIn, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = OHLCStore(OHLC(self.account), self.directory.name)
+
+    def tearDown(self):
+        super().tearDown()
+        self.directory.cleanup()
+
+    def _get(self, days_from, days_until, **kwargs):
+        return self.store.get_data(self.instrument, self.venue, 'M1', date_from=START + timedelta(days=days_from),
+                                   date_until=START + timedelta(days=days_until), **kwargs)
+
+    def test_only_gaps_are_requested(self):
+        self.assertEqual(len(self._get(1, 2)), 24 * 60 + 1)
+        self.assertEqual(self.store.missing(self.instrument, self.venue, 'M1', START, START + timedelta(days=3)),
+                         [(START, START + timedelta(days=1) - timedelta(seconds=1)),
+                          (START + timedelta(days=2, seconds=1), START + timedelta(days=3))])
+
+        bars = self._get(0, 3, as_df=False)
+        self.assertEqual(len(bars), 3 * 24 * 60 + 1)
+        self.assertTrue((bars['t'][1:] - bars['t'][:-1] == 60).all())
+
+        requests = self.server.count('GET', PATH)
+        df = self._get(0.5, 2.5)
+        self.assertEqual(self.server.count('GET', PATH), requests)
+        self.assertEqual(len(df), 2 * 24 * 60 + 1)
+        self.assertEqual(list(df.columns), ['o', 'h', 'l', 'c'])
+
+    def test_compact_and_evict(self):
+        self._get(0, 1)
+        self._get(1, 2)
+        size = self.store.size
+        self.store.compact()
+        self.assertEqual(len(os.listdir(self.directory.name)), 2)
+        self.assertEqual(len(self._get(0, 2, as_df=False)), 2 * 24 * 60 + 1)
+
+        # the least recently used series is removed
+        self.store.max_bytes = size
+        self.store.get_data(self.instrument, self.venue, 'H1', date_from=START, date_until=START + timedelta(days=1))
+        self.assertEqual(sorted(os.listdir(self.directory.name)), ['XMUN_US88160R1014_H1.0.npy', 'XMUN_US88160R1014_H1.json'])
+
+    def test_stored_reads_touch_one_series(self):
+        self._get(0, 1)
+        self.store.get_data(self.instrument, self.venue, 'H1', date_from=START, date_until=START + timedelta(days=1))
+        size = self.store.size
+
+        # neither the metadata is written nor the other series are listed
+        with mock.patch.object(self.store, '_save_meta', side_effect=AssertionError), \
+                mock.patch.object(self.store, '_keys', side_effect=AssertionError):
+            for _ in range(10):
+                self.assertEqual(len(self._get(0, 1, as_df=False)), 24 * 60 + 1)
+            self.assertEqual(self.store.size, size)
+
+        # a new store rebuilds the index from disk, the series are ordered by their last download
+        store = OHLCStore(OHLC(self.account), self.directory.name, max_bytes=size - 1)
+        self.assertEqual(store.size, size)
+        store.evict()
+        self.assertEqual(sorted(os.listdir(self.directory.name)), ['XMUN_US88160R1014_H1.0.npy', 'XMUN_US88160R1014_H1.json'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,207 @@
+# undocumented on rtd
+import time
+import unittest
+from unittest import mock
+from datetime import datetime
+from urllib.parse import parse_qs
+
+from lemon_markets.account import Account
+from lemon_markets.exceptions import LemonBatchException
+from lemon_markets.instrument import Instrument
+from lemon_markets.order import Order, OrderBook, OrderStatus, Orders
+from lemon_markets.space import Space
+from lemon_markets.tests.stand_in_server import StandInServer, stand_in_account, paged, instrument_data
+
+INSTRUMENT = instrument_data()
+
+
+def _order(uuid: str, isin: str = 'US88160R1014', side: str = 'buy', status=OrderStatus.INACTIVE) -> Order:
+    return Order(instrument=Instrument(isin=isin), quantity=1, side=side, uuid=uuid, status=status)
+
+
+class _TestOrderBook(unittest.TestCase):
+    def test_indexes(self):
+        book = OrderBook()
+        first = book.add(_order('a'))
+        book.add(_order('b', isin='DE0007664039', side='sell'))
+        book.add(_order('c', status=OrderStatus.EXECUTED))
+        self.assertIs(book.get('a'), first)
+        self.assertEqual(book.uuids(OrderStatus.INACTIVE), {'a', 'b'})
+        self.assertEqual({o.uuid for o in book.with_isin('US88160R1014')}, {'a', 'c'})
+        self.assertEqual([o.uuid for o in book.with_side('sell')], ['b'])
+
+        old_status = book.update(first, {'status': 'activated', 'type': 'stock'})
+        self.assertEqual(old_status, OrderStatus.INACTIVE)
+        self.assertEqual(book.uuids(OrderStatus.INACTIVE), {'b'})
+        self.assertEqual(book.uuids(OrderStatus.ACTIVATED, OrderStatus.EXECUTED), {'a', 'c'})
+
+        # replacing an order by uuid keeps one entry per uuid
+        book.add(_order('b', status=OrderStatus.DELETED))
+        self.assertEqual(len(book), 3)
+        self.assertEqual(book.with_side('sell'), [])
+        self.assertEqual([o.uuid for o in book.remove_status(OrderStatus.DELETED)], ['b'])
+        self.assertNotIn('b', book)
+        self.assertEqual(book.with_isin('DE0007664039'), [])
+
+    def test_orders_view(self):
+        # the access token is only requested with the first request
+        account = Account('client_id', 'client_secret', refresh_token_in_background=False)
+        first = Orders(account, Space(uuid='first', _account=account))
+        second = Orders(account, Space(uuid='second', _account=account))
+        first.book.add(_order('a'))
+        self.assertIs(first.orders[OrderStatus.INACTIVE.name]['a'], first.book.get('a'))
+        self.assertEqual(len(first.orders['INACTIVE']), 1)
+        self.assertEqual(dict(first.orders['EXECUTED']), {})
+        self.assertEqual(len(second.orders['INACTIVE']), 0)
+
+        first.book.update(first.book.get('a'), {'status': 'executed', 'type': 'stock'})
+        self.assertNotIn('a', first.orders['INACTIVE'])
+        first.clean_orders()
+        self.assertEqual(len(first.book), 0)
+
+
+def _order_data(uuid: str, status: str, created_at: int) -> dict:
+    return {'uuid': uuid, 'status': status, 'valid_until': 1700000000, 'created_at': created_at,
+            'side': 'buy', 'quantity': 1, 'type': 'stock', 'instrument': {'isin': INSTRUMENT['isin']}}
+
+
+class _TestSyncOrders(unittest.TestCase):
+    def setUp(self):
+        self.server = StandInServer().start()
+        self.account = stand_in_account(self.server)
+        # a long history of executed orders and a few open ones
+        self.history = {'order%d' % i: ['executed', 1600000000 + i] for i in range(1000)}
+        for i in range(1000, 1005):
+            uuid = 'order%d' % i
+            self.history[uuid] = ['activated', 1600000000 + i]
+            self.server.route('GET', '/spaces/space/orders/%s/' % uuid, lambda r, uuid=uuid: (
+                200, _order_data(uuid, *self.history[uuid]), {}))
+        self.server.route('GET', '/spaces/space/orders/', self._orders)
+        self.server.route('GET', '/instruments/', lambda r: (200, paged([INSTRUMENT], r, self.server.url), {}))
+        self.orders = Orders(self.account, Space(uuid='space', _account=self.account))
+
+    def tearDown(self):
+        self.server.stop()
+
+    def _orders(self, request):
+        status = request.param('status')
+        created_from = int(request.param('created_at_from', 0))
+        results = [_order_data(uuid, s, created) for uuid, (s, created) in self.history.items()
+                   if (status is None or s == status) and created >= created_from]
+        return 200, paged(results, request, self.server.url), {}
+
+    def test_sync_orders(self):
+        delta = self.orders.sync_orders()
+        self.assertEqual((len(delta.added), delta.changed, delta.terminal), (1005, [], []))
+        self.assertEqual(self.orders.book.get('order0').created_at.timestamp(), 1600000000)
+
+        # nothing changed: the newest order and the open ones are requested again
+        requests = self.server.count('GET')
+        self.assertFalse(self.orders.sync_orders())
+        self.assertEqual(self.server.count('GET') - requests, 1 + 3)
+
+        order = self.orders.book.get('order1000')
+        self.history['order1000'][0] = 'executed'
+        self.history['order1001'][0] = 'in_progress'
+        self.history['order2000'] = ['inactive', 1600002000]
+        requests = self.server.count('GET')
+        delta = self.orders.sync_orders()
+        self.assertEqual([o.uuid for o in delta.added], ['order2000'])
+        self.assertEqual([o.uuid for o in delta.changed], ['order1001'])
+        self.assertEqual(delta.terminal, [order])
+        self.assertEqual(order.status, OrderStatus.EXECUTED)
+        self.assertEqual(self.server.count('GET') - requests, 1 + 3 + 1)
+        self.assertEqual(self.orders._watermark, 1600002000)
+
+    def test_sync_orders_created_at_from(self):
+        delta = self.orders.sync_orders(created_at_from=datetime.fromtimestamp(1600001003))
+        self.assertEqual([o.uuid for o in delta.added], ['order1003', 'order1004'])
+
+        # order1003 is requested with the open orders, the older open ones are left out
+        self.history['order1003'][0] = 'in_progress'
+        delta = self.orders.sync_orders()
+        self.assertEqual((delta.added, [o.uuid for o in delta.changed]), ([], ['order1003']))
+        self.assertEqual(len(self.orders.book), 2)
+
+
+class _TestCreateOrders(unittest.TestCase):
+    def setUp(self):
+        self.server = StandInServer(delay=0.1).start()
+        self.account = stand_in_account(self.server)
+        self.instruments = [Instrument(isin='DE%010d' % i) for i in range(20)]
+        self.server.route('POST', '/spaces/space/orders/', self._create)
+        for instrument in self.instruments:
+            uuid = 'order-' + instrument.isin
+            self.server.json('PUT', '/spaces/space/orders/%s/activate/' % uuid,
+                             dict(_order_data(uuid, 'activated', 1600000000), instrument={'isin': instrument.isin}))
+        self.orders = Orders(self.account, Space(uuid='space', _account=self.account))
+
+    def tearDown(self):
+        self.server.stop()
+
+    def _create(self, request):
+        isin = parse_qs(request.body.decode())['isin'][0]
+        if isin == self.instruments[3].isin:
+            return 400, {'detail': 'Invalid order.'}, {}
+        return 201, dict(_order_data('order-' + isin, 'inactive', 1600000000), instrument={'isin': isin}), {}
+
+    def test_create_orders(self):
+        orders = [{'instrument': instrument, 'valid_until': datetime(2030, 1, 1), 'side': 'buy', 'quantity': 1}
+                  for instrument in self.instruments]
+        start = time.perf_counter()
+        with self.assertRaises(LemonBatchException) as context:
+            self.orders.create_orders(orders)
+        # 20 orders with two requests of 0.1 seconds each are not sent one after another
+        self.assertLess(time.perf_counter() - start, 1.0)
+
+        results, errors = context.exception.results, context.exception.errors
+        self.assertEqual(list(errors), [3])
+        self.assertIsNone(results[3])
+        self.assertEqual([o.uuid for o in results if o is not None],
+                         ['order-' + i.isin for n, i in enumerate(self.instruments) if n != 3])
+        self.assertTrue(all(o.status == OrderStatus.ACTIVATED for o in results if o is not None))
+        self.assertEqual(self.orders.book.count(OrderStatus.ACTIVATED), 19)
+
+        batch = self.orders.submit_batch(orders[4:6], activate=False)
+        self.assertEqual([o.status for o in batch.result()], [OrderStatus.INACTIVE] * 2)
+        self.assertTrue(batch.done)
+
+    def test_place_order(self):
+        isin = self.instruments[0].isin
+        self.server.json('GET', '/spaces/space/', {'uuid': 'space'})
+        self.server.json('GET', '/spaces/space/orders/order-%s/' % isin,
+                         dict(_order_data('order-' + isin, 'executed', 1600000000), instrument={'isin': isin}))
+        self.orders.warm_up()
+        self.assertEqual(self.server.count('POST', '/oauth2/token'), 1)
+
+        order = self.orders.place_order(self.instruments[0], datetime(2030, 1, 1), 'buy', 1)
+        self.assertEqual(order.status, OrderStatus.ACTIVATED)
+        for stage in ('create', 'activate'):
+            self.assertEqual(self.orders.latency[stage].count, 1)
+            self.assertGreaterEqual(self.orders.latency[stage].mean, 0.1)
+        self.assertEqual(self.orders.latency['status_change'].count, 0)
+
+        self.orders.update_order(order)
+        self.orders.update_order(order)
+        self.assertEqual(self.orders.latency['status_change'].count, 1)
+        self.assertEqual(self.server.count('POST', '/oauth2/token'), 1)
+        self.assertEqual(self.orders._activated_at, {})
+
+        # an activation which did not take is an error
+        isin = self.instruments[1].isin
+        self.server.json('PUT', '/spaces/space/orders/order-%s/activate/' % isin,
+                         dict(_order_data('order-' + isin, 'inactive', 1600000000), instrument={'isin': isin}))
+        with self.assertRaises(ValueError):
+            self.orders.place_order(self.instruments[1], datetime(2030, 1, 1), 'buy', 1)
+        self.assertEqual(self.orders._activated_at, {})
+
+    def test_awaited_status_changes_are_bounded(self):
+        with mock.patch('lemon_markets.order._MAX_AWAITED_STATUS_CHANGES', 2):
+            for instrument in self.instruments[4:8]:
+                self.orders.place_order(instrument, datetime(2030, 1, 1), 'buy', 1)
+        self.assertEqual(list(self.orders._activated_at),
+                         ['order-' + instrument.isin for instrument in self.instruments[6:8]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+# undocumented on rtd
+import asyncio
+import time
+import unittest
+
+from lemon_markets.order import Orders, OrderStatus
+from lemon_markets.order_poller import OrderEventHub, OrderPoller
+from lemon_markets.space import Space
+from lemon_markets.tests.stand_in_server import StandInServer, stand_in_account, paged, instrument_data
+
+INSTRUMENT = instrument_data()
+
+
+def _order(uuid: str, status: str) -> dict:
+    return {'uuid': uuid, 'status': status, 'valid_until': 1700000000, 'created_at': 1600000000,
+            'side': 'buy', 'quantity': 1, 'type': 'stock', 'instrument': {'isin': INSTRUMENT['isin']}}
+
+
+class _TestOrderPoller(unittest.TestCase):
+    def setUp(self):
+        self.server = StandInServer().start()
+        self.account = stand_in_account(self.server)
+        self.statuses = {'order%d' % i: 'inactive' for i in range(250)}
+        self.server.route('GET', '/spaces/space/orders/', self._orders)
+        self.server.route('GET', '/instruments/', lambda r: (200, paged([INSTRUMENT], r, self.server.url), {}))
+        for uuid in self.statuses:
+            self.server.route('GET', '/spaces/space/orders/%s/' % uuid,
+                              lambda r, uuid=uuid: (200, _order(uuid, self.statuses[uuid]), {}))
+        self.orders = Orders(self.account, Space(uuid='space', _account=self.account))
+
+    def tearDown(self):
+        self.server.stop()
+
+    def _orders(self, request):
+        status = request.param('status')
+        results = [_order(uuid, s) for uuid, s in self.statuses.items() if status is None or s == status]
+        return 200, paged(results, request, self.server.url), {}
+
+    def test_poll(self):
+        transitions = []
+        poller = OrderPoller(self.orders, callback=transitions.append)
+        self.assertEqual(len(poller.poll()), 250)
+        self.assertEqual(len(self.orders.orders[OrderStatus.INACTIVE.name]), 250)
+        order = self.orders.orders[OrderStatus.INACTIVE.name]['order0']
+
+        # unchanged orders: one request per page and open status
+        transitions.clear()
+        requests = self.server.count('GET')
+        self.assertEqual(poller.poll(), [])
+        self.assertEqual(self.server.count('GET') - requests, 3 + 2)
+
+        # few changed orders are requested one by one
+        self.statuses['order0'] = 'executed'
+        self.statuses['order1'] = 'activated'
+        poller.poll()
+        self.assertEqual(sorted((t.order.uuid, t.old_status, t.new_status) for t in transitions), [
+            ('order0', OrderStatus.INACTIVE, OrderStatus.EXECUTED),
+            ('order1', OrderStatus.INACTIVE, OrderStatus.ACTIVATED)])
+        self.assertIs(self.orders.orders[OrderStatus.EXECUTED.name]['order0'], order)
+        self.assertEqual(order.status, OrderStatus.EXECUTED)
+        self.assertEqual(self.server.count('GET', '/spaces/space/orders/order0/'), 1)
+
+        # many changed orders are looked up in the pages of the terminal statuses
+        for i in range(100, 200):
+            self.statuses['order%d' % i] = 'deleted'
+        transitions.clear()
+        requests = self.server.count('GET')
+        poller.poll()
+        self.assertEqual(len(transitions), 100)
+        self.assertEqual(len(self.orders.orders[OrderStatus.DELETED.name]), 100)
+        self.assertLess(self.server.count('GET') - requests, 10)
+
+    def test_next_interval(self):
+        poller = OrderPoller(self.orders, min_interval=1, max_interval=60)
+        self.assertEqual(poller.next_interval(), 60)
+        poller.poll()
+        # the orders were created long ago
+        self.assertEqual(poller.next_interval(), 60)
+        # a young order is polled often
+        poller._created['order0'] = time.time()
+        self.assertEqual(poller.next_interval(), 1)
+
+
+class _TestOrderEventHub(unittest.TestCase):
+    def setUp(self):
+        self.server = StandInServer().start()
+        self.account = stand_in_account(self.server)
+        self.server.route('GET', '/instruments/', lambda r: (200, paged([INSTRUMENT], r, self.server.url), {}))
+        self.data = {}
+        self.orders = []
+        for space in ('first', 'second'):
+            uuid = space + '_order'
+            self.data[uuid] = _order(uuid, 'activated')
+            self.server.route('GET', '/spaces/%s/orders/' % space, lambda r, uuid=uuid: (200, paged(
+                [self.data[uuid]] if self.data[uuid]['status'] == r.param('status') else [], r, self.server.url), {}))
+            self.server.route('GET', '/spaces/%s/orders/%s/' % (space, uuid),
+                              lambda r, uuid=uuid: (200, self.data[uuid], {}))
+            self.orders.append(Orders(self.account, Space(uuid=space, _account=self.account)))
+        self.hub = OrderEventHub(min_interval=0.01, max_interval=0.01)
+        for orders in self.orders:
+            self.assertIs(self.hub.watch(orders), self.hub.watch(orders))
+        self.hub.poll()
+
+    def tearDown(self):
+        self.hub.stop()
+        self.server.stop()
+
+    def test_callbacks(self):
+        received, failed = [], []
+        self.hub.add_callback(lambda t: failed.append(1 / 0))
+        self.hub.add_callback(received.append)
+
+        # a partial fill, the order stays in progress
+        self.data['first_order'].update(status='in_progress', processed_quantity=3, average_price=101.5)
+        self.hub.poll()
+        self.assertEqual([(t.order.uuid, t.old_status, t.new_status, t.filled_quantity, t.average_price)
+                          for t in received],
+                         [('first_order', OrderStatus.ACTIVATED, OrderStatus.IN_PROGRESS, 3, 101.5)])
+        self.data['first_order'].update(processed_quantity=5)
+        self.data['second_order'].update(status='executed', processed_quantity=1, average_price=99.0)
+        received.clear()
+        self.hub.poll()
+        self.assertEqual(sorted((t.order.uuid, t.new_status, t.filled_quantity, t.processed_quantity)
+                                for t in received),
+                         [('first_order', OrderStatus.IN_PROGRESS, 2, 5),
+                          ('second_order', OrderStatus.EXECUTED, 1, 1)])
+        self.assertEqual(self.hub.callback_errors, 3)
+        self.assertEqual(self.hub.poll(), [])
+
+    def test_events(self):
+        async def first_events():
+            events = self.hub.events()
+            waiting = asyncio.ensure_future(events.__anext__())
+            await asyncio.sleep(0)
+            self.hub.start()
+            self.data['second_order'].update(status='deleted')
+            transition = await asyncio.wait_for(waiting, 5)
+            await events.aclose()
+            return transition
+
+        transition = asyncio.run(first_events())
+        self.assertEqual((transition.order.uuid, transition.new_status), ('second_order', OrderStatus.DELETED))
+        self.assertEqual(self.hub._queues, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
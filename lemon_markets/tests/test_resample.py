@@ -0,0 +1,99 @@
+# undocumented on rtd
+import unittest
+
+import numpy as np
+
+from lemon_markets.ohlc_store import BAR_DTYPE
+from lemon_markets.resample import Resampler, resample
+from lemon_markets.trading_venue import TradingVenue
+from lemon_markets.tests.stand_in_server import StandInServer, stand_in_account
+
+# 2021-06-01 00:00 UTC
+DAY = 1622505600
+
+
+def minute_bars(start, end):
+    t = np.arange(start, end, 60)
+    array = np.empty(len(t), dtype=BAR_DTYPE)
+    array['t'] = t
+    array['o'] = np.arange(len(t), dtype=float)
+    array['h'] = array['o'] + 0.5
+    array['l'] = array['o'] - 0.5
+    array['c'] = array['o'] + 0.25
+    return array
+
+
+class _TestResample(unittest.TestCase):
+    def setUp(self):
+        self.server = StandInServer().start()
+        # open from 08:00 until 17:30 UTC
+        self.venue = TradingVenue(mic='XMUN', _account=stand_in_account(self.server), opening_days=[
+            {'day_iso': '2021-06-0%d' % (i + 1), 'opening_time': DAY + i * 86400 + 8 * 3600,
+             'closing_time': DAY + i * 86400 + 17 * 3600 + 1800} for i in range(3)])
+        self.bars = np.concatenate([minute_bars(DAY + i * 86400 + 8 * 3600, DAY + i * 86400 + 17 * 3600 + 1800)
+                                    for i in range(3)])
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_intervals(self):
+        h1 = resample(self.bars, 'H1')
+        self.assertEqual(len(h1), 3 * 10)
+        first = self.bars[:60]
+        self.assertEqual(tuple(h1[0]), (DAY + 8 * 3600, first['o'][0], first['h'].max(), first['l'].min(), first['c'][-1]))
+        self.assertEqual(len(resample(self.bars, '15m')), 3 * 38)
+        self.assertEqual(len(resample(self.bars, 300)), 3 * 114)
+        with self.assertRaises(ValueError):
+            resample(self.bars, '90s')
+
+    def test_venue_alignment(self):
+        d1 = resample(self.bars, 'D1', venue=self.venue)
+        self.assertEqual(list(d1['t']), [day['opening_time'] for day in self.venue.opening_days])
+        self.assertEqual(list(d1['c']), [self.bars['c'][569], self.bars['c'][1139], self.bars['c'][-1]])
+
+        # sessions starting at half past are aligned to them, not to the full hour
+        for day in self.venue.opening_days:
+            day['opening_time'] += 1800
+        h1 = resample(self.bars, 'H1', venue=self.venue)
+        self.assertEqual(h1['t'][1], DAY + 8 * 3600 + 1800)
+
+        df = resample([dict(zip(BAR_DTYPE.names, bar)) for bar in self.bars[:120]], 'H1', as_df=True)
+        self.assertEqual(list(df.columns), ['o', 'h', 'l', 'c'])
+        self.assertTrue((resample(df, 'H1') == resample(self.bars[:120], 'H1')).all())
+
+    def test_incremental(self):
+        resampler = Resampler('H1', venue=self.venue)
+        completed = [resampler.update(self.bars[i:i + 7]) for i in range(0, len(self.bars), 7)]
+        self.assertTrue((np.concatenate(completed) == resample(self.bars, 'H1', venue=self.venue)).all())
+        self.assertIsNone(resampler.current)
+
+        resampler = Resampler('15m')
+        self.assertEqual(len(resampler.update(self.bars[:20])), 1)
+        self.assertEqual(resampler.current['t'][0], DAY + 8 * 3600 + 900)
+        self.assertEqual(len(resampler.update(self.bars[18:20])), 0)
+        self.assertEqual(resampler.flush()['c'][0], self.bars['c'][19])
+
+    def test_revised_minute(self):
+        bars = np.zeros(3, dtype=BAR_DTYPE)
+        bars['t'] = [0, 60, 120]
+        bars['o'], bars['h'], bars['l'], bars['c'] = [1, 2, 3], [4, 5, 6], [1, 1, 1], [3, 5, 9]
+        resampler = Resampler('15m')
+        resampler.update(bars)
+        revised = bars[1:2].copy()
+        revised['c'], revised['h'], revised['l'] = 2.5, 7, 0.5
+        self.assertEqual(len(resampler.update(revised)), 0)
+        self.assertEqual(tuple(resampler.current[0]), (0, 1, 7, 0.5, 9))
+
+        revised = bars[:1].copy()
+        revised['o'] = 1.5
+        resampler.update(revised)
+        self.assertEqual(resampler.current['o'][0], 1.5)
+        self.assertEqual(resampler.current['c'][0], 9)
+        revised = bars[2:3].copy()
+        revised['c'] = 8
+        resampler.update(revised)
+        self.assertEqual(resampler.current['c'][0], 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
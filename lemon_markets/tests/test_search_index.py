@@ -0,0 +1,60 @@
+# undocumented on rtd
+import unittest
+
+from lemon_markets.instrument import Instrument, Instruments, InstrumentType
+from lemon_markets.search_index import InstrumentIndex
+from lemon_markets.tests.stand_in_server import StandInServer, stand_in_account, paged, instrument_data
+
+
+def _instrument(isin, wkn, symbol, name, type=InstrumentType.STOCK, currency='EUR', tradable=True):
+    return Instrument(isin=isin, wkn=wkn, symbol=symbol, name=name, title=name.split()[0],
+                      type=type, currency=currency, tradable=tradable, trading_venues=[])
+
+
+class _TestInstrumentIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = InstrumentIndex([
+            _instrument('US88160R1014', 'A1CX3T', 'TSLA', 'TESLA INC.'),
+            _instrument('US0378331005', '865985', 'APC', 'APPLE INC.'),
+            _instrument('IE00B4L5Y983', 'A0RPWH', 'EUNL', 'ISHARES CORE MSCI WORLD', type=InstrumentType.FUND),
+            _instrument('US5949181045', '870747', 'MSF', 'MICROSOFT CORP.', currency='USD', tradable=False),
+        ])
+
+    def _isins(self, *args, **kwargs):
+        return [i.isin for i in self.index.search(*args, **kwargs)]
+
+    def test_exact_and_prefix(self):
+        self.assertEqual(self._isins('tsla'), ['US88160R1014'])
+        self.assertEqual(self._isins('865985'), ['US0378331005'])
+        self.assertEqual(self._isins('US0378'), ['US0378331005'])
+        self.assertEqual(self._isins('appl'), ['US0378331005'])
+
+    def test_tokens(self):
+        self.assertEqual(self._isins('msci world'), ['IE00B4L5Y983'])
+        self.assertEqual(self._isins('core wor'), ['IE00B4L5Y983'])
+        self.assertEqual(self._isins('inc'), ['US0378331005', 'US88160R1014'])
+
+    def test_filters(self):
+        self.assertEqual(self._isins(type='fund'), ['IE00B4L5Y983'])
+        self.assertEqual(self._isins(currency='USD'), ['US5949181045'])
+        self.assertEqual(len(self._isins(tradable=True)), 3)
+        self.assertEqual(self._isins('inc', limit=1), ['US0378331005'])
+
+    def test_replace(self):
+        self.index.add([_instrument('US88160R1014', 'A1CX3T', 'TL0', 'TESLA INC.')])
+        self.assertEqual(self._isins('tsla'), [])
+        self.assertEqual(self._isins('tl0'), ['US88160R1014'])
+        self.assertEqual(len(self.index), 4)
+
+    def test_remote_fallback(self):
+        with StandInServer() as server:
+            server.route('GET', '/instruments/', lambda r: (200, paged(
+                [instrument_data('DE0007100000', symbol='DAI', name='DAIMLER AG')], r, server.url), {}))
+            self.index.fallback = Instruments(stand_in_account(server))
+            self.assertEqual(self._isins('daimler'), ['DE0007100000'])
+            self.assertEqual(self._isins('dai'), ['DE0007100000'])
+            self.assertEqual(server.count('GET', '/instruments/'), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+# undocumented on rtd
+import time
+import unittest
+
+from lemon_markets.state import State
+from lemon_markets.tests.stand_in_server import StandInServer, stand_in_account, paged
+
+
+class _TestState(unittest.TestCase):
+    def setUp(self):
+        self.server = StandInServer().start()
+        self.balance = 100
+        self.server.route('GET', '/state/', lambda r: (200, {'state': {'balance': str(self.balance)}}, {}))
+        self.server.route('GET', '/spaces/', lambda r: (200, paged([
+            {'uuid': 'space', 'name': 'space', 'type': 'strategy',
+             'state': {'balance': str(self.balance), 'cash_to_invest': '50'}}], r, self.server.url), {}))
+        self.server.route('GET', '/spaces/space/', lambda r: (200, {
+            'uuid': 'space', 'name': 'space', 'type': 'strategy',
+            'state': {'balance': str(self.balance), 'cash_to_invest': '50'}}, {}))
+        self.account = stand_in_account(self.server)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def _eventually(self, get, expected):
+        for _ in range(100):
+            if get() == expected:
+                break
+            time.sleep(0.01)
+        self.assertEqual(get(), expected)
+
+    def test_cash_time(self):
+        state = State(self.account, cash_time_in_seconds=60)
+        space = state.spaces[0]
+        for _ in range(100):
+            self.assertEqual((state.balance, space.balance, space.cash_to_invest), (100, 100, 50))
+        self.assertEqual(self.server.count('GET', '/state/'), 1)
+        self.assertEqual(self.server.count('GET', '/spaces/'), 1)
+        self.assertEqual(self.server.count('GET', '/spaces/space/'), 0)
+
+        # expired data is returned once more while it is updated in the background
+        self.balance = 200
+        state.change_cash_time(0)
+        space.change_cash_time(0)
+        self.assertEqual((state.balance, space.balance), (100, 100))
+        self._eventually(lambda: state.balance, 200)
+        self._eventually(lambda: space.balance, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
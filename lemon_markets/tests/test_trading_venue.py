@@ -0,0 +1,91 @@
+# undocumented on rtd
+import gc
+import time
+import unittest
+import weakref
+from datetime import datetime, timedelta
+
+from lemon_markets import trading_venue
+from lemon_markets.trading_venue import TradingVenue
+from lemon_markets.tests.stand_in_server import StandInServer, stand_in_account
+
+
+def opening_days(first, count):
+    """Open from 9:00 until 17:30 local time."""
+    days = []
+    for i in range(count):
+        day = first + timedelta(days=i)
+        opening = datetime(day.year, day.month, day.day, 9).astimezone()
+        days.append({'day_iso': day.isoformat(), 'opening_time': int(opening.timestamp()),
+                     'closing_time': int((opening + timedelta(hours=8, minutes=30)).timestamp())})
+    return days
+
+
+class _TestTradingCalendar(unittest.TestCase):
+    def setUp(self):
+        trading_venue._calendars.clear()
+        self.server = StandInServer().start()
+        self.today = datetime.now().date()
+        self.horizon = 5
+        self.server.route('GET', '/venues/XMUN/opening-days',
+                          lambda r: (200, {'results': opening_days(self.today, self.horizon)}, {}))
+        self.venue = TradingVenue(mic='XMUN', _account=stand_in_account(self.server))
+
+    def tearDown(self):
+        self.server.stop()
+        trading_venue._calendars.clear()
+
+    def _at(self, days, hour, minute=0):
+        day = self.today + timedelta(days=days)
+        return datetime(day.year, day.month, day.day, hour, minute).astimezone()
+
+    def test_lookups_without_requests(self):
+        calendar = self.venue.calendar
+        self.assertTrue(calendar.is_open(self._at(0, 12)))
+        for _ in range(1000):
+            self.venue.is_open
+        self.assertFalse(calendar.is_open(self._at(1, 8, 59)))
+        self.assertTrue(calendar.is_open(self._at(1, 17, 30)))
+        self.assertEqual(calendar.time_until_close(self._at(2, 17)), timedelta(minutes=30))
+        self.assertEqual(calendar.time_until_open(self._at(2, 8)), timedelta(hours=1))
+        self.assertEqual(self.server.count('GET', '/venues/XMUN/opening-days'), 1)
+        self.assertIs(TradingVenue(mic='XMUN', _account=self.venue._account).calendar, calendar)
+
+    def test_refresh(self):
+        calendar = self.venue.calendar
+        calendar.retry_interval = 0
+        self.assertIsNone(calendar.horizon)
+        calendar.refresh()
+        self.assertEqual(calendar.horizon, self.today + timedelta(days=4))
+
+        # close to the horizon, the answer is given right away and the days are updated in the background
+        self.horizon = 10
+        self.assertFalse(calendar.is_open(self._at(3, 20)))
+        for _ in range(100):
+            if calendar.horizon == self.today + timedelta(days=9):
+                break
+            time.sleep(0.01)
+        self.assertEqual(calendar.horizon, self.today + timedelta(days=9))
+
+        # beyond the horizon, the days are updated first
+        self.horizon = 20
+        self.assertTrue(calendar.is_open(self._at(15, 10)))
+        self.assertEqual(self.server.count('GET', '/venues/XMUN/opening-days'), 3)
+
+    def test_calendars_per_account(self):
+        calendar = self.venue.calendar
+        account = stand_in_account(self.server)
+        other = TradingVenue(mic='XMUN', _account=account).calendar
+        self.assertIsNot(other, calendar)
+        other.refresh()
+        self.assertEqual(self.server.count('GET', '/venues/XMUN/opening-days'), 1)
+
+        # the calendars keep neither the venues nor the accounts alive
+        account = weakref.ref(account)
+        gc.collect()
+        self.assertIsNone(account())
+        self.assertEqual(len(trading_venue._calendars), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,17 @@
 """Module for listing trading venues and their opening/closing times."""
 
+import threading
+import time
+import weakref
+from bisect import bisect_left
 from dataclasses import dataclass
-from datetime import timedelta
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
 
 from lemon_markets.helpers.api_client import _ApiClient
 from lemon_markets.account import Account
-from lemon_markets.helpers.time_helper import current_time, timestamp_seconds_to_datetime
+from lemon_markets.config import DEFAULT_CALENDAR_REFRESH_DAYS, DEFAULT_CALENDAR_RETRY_INTERVAL
+from lemon_markets.helpers.time_helper import current_time
 
 
 class TradingVenues(_ApiClient):
@@ -66,6 +72,11 @@ class TradingVenue(_ApiClient):  # TODO update openig checks for new AIP Strctur
     def __post_init__(self):            # noqa
         super().__init__(self._account, is_data=True)
 
+    @property
+    def calendar(self) -> 'TradingCalendar':
+        """The trading calendar of the venue, shared by all venues with the same mic."""
+        return TradingCalendar.of(self)
+
     @property
     def is_open(self) -> bool:
         """
@@ -77,28 +88,7 @@ class TradingVenue(_ApiClient):  # TODO update openig checks for new AIP Strctur
             True if the venue is open, False otherwise
 
         """
-        day = current_time().strftime("%Y-%m-%d")
-        if self.opening_days is None:
-            self.update_opening_days()
-
-        for data in self.opening_days:
-            if day == data.get('day_iso'):
-                return (
-                    timestamp_seconds_to_datetime(data.get("opening_time"))
-                    <= current_time()
-                    <= timestamp_seconds_to_datetime(data.get("closing_time"))
-                )
-
-        self.update_opening_days()
-        for data in self.opening_days:
-            if day == data.get('day_iso'):
-                return (
-                    timestamp_seconds_to_datetime(data.get("opening_time"))
-                    <= current_time()
-                    <= timestamp_seconds_to_datetime(data.get("closing_time"))
-                )
-
-        return False
+        return self.calendar.is_open()
 
     @property
     def time_until_close(self) -> timedelta:
@@ -111,22 +101,7 @@ class TradingVenue(_ApiClient):  # TODO update openig checks for new AIP Strctur
             Returns the time until close. Uninitialized if not available
 
         """
-        day = current_time().strftime("%Y-%m-%d")
-        if self.opening_days is None:
-            self.update_opening_days()
-
-        for data in self.opening_days:
-            if day == data.get('day_iso'):
-                return timestamp_seconds_to_datetime(
-                    data.get("closing_time")) - current_time()
-
-        self.update_opening_days()
-        for data in self.opening_days:
-            if day == data.get('day_iso'):
-                return timestamp_seconds_to_datetime(
-                    data.get("closing_time")) - current_time()
-
-        return timedelta()
+        return self.calendar.time_until_close()
 
     @property
     def time_until_open(self) -> timedelta:
@@ -139,24 +114,210 @@ class TradingVenue(_ApiClient):  # TODO update openig checks for new AIP Strctur
             Returns the time until open. Uninitialized if not available
 
         """
-        day = current_time().strftime("%Y-%m-%d")
-        if self.opening_days is None:
-            self.update_opening_days()
-
-        for data in self.opening_days:
-            if day == data.get('day_iso'):
-                return timestamp_seconds_to_datetime(
-                    data.get("opening_time")) - current_time()
-
-        self.update_opening_days()
-        for data in self.opening_days:
-            if day == data.get('day_iso'):
-                return timestamp_seconds_to_datetime(
-                    data.get("opening_time")) - current_time()
-
-        return timedelta()
+        return self.calendar.time_until_open()
 
     def update_opening_days(self):
         """Update the opening_days property of the TradingVenue instances."""
         self.opening_days = self._request(
             endpoint=f"venues/{self.mic}/opening-days").get("results")
+        TradingCalendar.of(self).update(self.opening_days)
+
+
+# the calendars per account and mic. Calendars only hold weak references to
+# venues, so they keep neither the venues nor the accounts alive.
+_calendars: 'weakref.WeakKeyDictionary[Account, Dict[str, TradingCalendar]]' = weakref.WeakKeyDictionary()
+_calendars_lock = threading.Lock()
+
+
+class TradingCalendar:
+    """
+    The opening times of a trading venue, prepared for fast lookups.
+
+    The opening days are parsed once and kept in sorted lists, so checking
+    whether the venue is open is a binary search without any requests.
+    When the known days are about to run out, they are updated in the
+    background. Use `TradingCalendar.of` or `TradingVenue.calendar` to get
+    the calendar shared by all venues of an account with the same mic.
+
+    Parameters
+    ----------
+    venue : TradingVenue
+        The venue used to update the opening days, replaced by the venue
+        passed to `TradingCalendar.of` most recently. Once it is gone, a new
+        venue of the same account and mic is used.
+    refresh_days : int, optional
+        Update the opening days in the background once fewer days than this are left, by default 2
+    retry_interval : int, optional
+        The minimum time between two automatic updates in seconds, by default 60
+
+    """
+
+    def __init__(self, venue: TradingVenue, refresh_days: int = DEFAULT_CALENDAR_REFRESH_DAYS,       # noqa
+                 retry_interval: int = DEFAULT_CALENDAR_RETRY_INTERVAL):
+        self._venue = weakref.ref(venue)
+        self._account = weakref.ref(venue._account)
+        self._mic = venue.mic
+        self.refresh_days = refresh_days
+        self.retry_interval = retry_interval
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._refreshed = None
+        # day ordinals, opening and closing timestamps, replaced at once by update
+        self._data: Tuple[list, list, list] = ([], [], [])
+        if venue.opening_days:
+            self.update(venue.opening_days)
+
+    @classmethod
+    def of(cls, venue: TradingVenue) -> 'TradingCalendar':
+        """
+        Return the calendar of a venue.
+
+        Parameters
+        ----------
+        venue : TradingVenue
+            The venue
+
+        Returns
+        -------
+        TradingCalendar
+            The calendar shared by all venues of the venue's account with the same mic
+
+        """
+        with _calendars_lock:
+            calendars = _calendars.get(venue._account)
+            if calendars is None:
+                calendars = _calendars[venue._account] = {}
+            calendar = calendars.get(venue.mic)
+            if calendar is None:
+                calendar = calendars[venue.mic] = cls(venue)
+            elif calendar._venue() is not venue:
+                # refresh through a venue which is still in use
+                calendar._venue = weakref.ref(venue)
+        return calendar
+
+    def update(self, opening_days: Iterable[dict]):
+        """
+        Add or replace opening days.
+
+        Parameters
+        ----------
+        opening_days : Iterable[dict]
+            The opening days as returned by the API, see `TradingVenue.opening_days`
+
+        """
+        with self._lock:
+            days = dict(zip(self._data[0], zip(self._data[1], self._data[2])))
+            for day in opening_days or []:
+                if day.get('opening_time') is None or day.get('closing_time') is None:
+                    continue
+                days[date.fromisoformat(day['day_iso']).toordinal()] = (
+                    float(day['opening_time']), float(day['closing_time']))
+            ordinals = sorted(days)
+            self._data = (ordinals, [days[o][0] for o in ordinals], [days[o][1] for o in ordinals])
+
+    def mark_refreshed(self):
+        """Note that the opening days were just requested, which delays the next automatic update by `retry_interval`."""
+        self._refreshed = time.monotonic()
+
+    @property
+    def horizon(self) -> Optional[date]:
+        """The last known opening day, or None."""
+        ordinals = self._data[0]
+        return date.fromordinal(ordinals[-1]) if ordinals else None
+
+    def refresh(self, background: bool = False):
+        """
+        Update the opening days of the venue.
+
+        Parameters
+        ----------
+        background : bool, optional
+            Update in a separate thread and return immediately, by default False
+
+        """
+        if background:
+            if not self._refresh_lock.locked():
+                threading.Thread(target=self.refresh, daemon=True).start()
+            return
+        with self._refresh_lock:
+            self.mark_refreshed()
+            venue = self._venue()
+            if venue is None:
+                account = self._account()
+                if account is None:
+                    return
+                venue = TradingVenue(mic=self._mic, _account=account)
+            venue.update_opening_days()
+
+    def _refresh_if_due(self, ordinal: int):
+        ordinals = self._data[0]
+        if ordinals and ordinal + self.refresh_days <= ordinals[-1]:
+            return
+        if self._refreshed is not None and time.monotonic() - self._refreshed < self.retry_interval:
+            return
+        # without an entry for today the answer would be wrong, so only wait in that case
+        self.refresh(background=bool(ordinals) and ordinal <= ordinals[-1])
+
+    def _session(self, at: datetime = None) -> Tuple[Optional[float], Optional[float], float]:
+        at = at or current_time()
+        ordinal = at.date().toordinal()
+        self._refresh_if_due(ordinal)
+        ordinals, opens, closes = self._data
+        i = bisect_left(ordinals, ordinal)
+        if i < len(ordinals) and ordinals[i] == ordinal:
+            return opens[i], closes[i], at.timestamp()
+        return None, None, at.timestamp()
+
+    def is_open(self, at: datetime = None) -> bool:
+        """
+        Check if the venue is open.
+
+        Parameters
+        ----------
+        at : datetime, optional
+            The point in time to check, by default now
+
+        Returns
+        -------
+        bool
+            True if the venue is open, False otherwise
+
+        """
+        opening, closing, now = self._session(at)
+        return opening is not None and opening <= now <= closing
+
+    def time_until_close(self, at: datetime = None) -> timedelta:
+        """
+        Get time until the venue closes on the same day.
+
+        Parameters
+        ----------
+        at : datetime, optional
+            The point in time to start from, by default now
+
+        Returns
+        -------
+        timedelta
+            The time until close, zero if the venue does not open on that day
+
+        """
+        opening, closing, now = self._session(at)
+        return timedelta() if closing is None else timedelta(seconds=closing - now)
+
+    def time_until_open(self, at: datetime = None) -> timedelta:
+        """
+        Get time until the venue opens on the same day.
+
+        Parameters
+        ----------
+        at : datetime, optional
+            The point in time to start from, by default now
+
+        Returns
+        -------
+        timedelta
+            The time until open, zero if the venue does not open on that day
+
+        """
+        opening, closing, now = self._session(at)
+        return timedelta() if opening is None else timedelta(seconds=opening - now)
@@ -24,4 +24,7 @@ if __name__ == '__main__':
             'pandas',
             'requests'
         ],
+        extras_require={
+            'async': ['aiohttp'],
+        },
     )